@@ -1,72 +1,51 @@
 import os
 import io
 import sys
+import time
+_IMPORT_START = time.perf_counter()
+import json
+import base64
+import hashlib
+import hmac
+import itertools
 import numpy as np
 import pandas as pd
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import joblib
-import cloudpickle
 import warnings
 warnings.filterwarnings("ignore")
-import matplotlib
-matplotlib.use('Agg')  # Prevent GUI-related warnings
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.piecharts import Pie
-from reportlab.graphics import renderPDF
-from reportlab.lib import colors
-from reportlab.lib.utils import ImageReader
-
-# =========================
-# EXTRA VISUALIZATION FUNCTION
-# =========================
-
-def generate_signal_chart(disease_type, data=None):
-    """Generate ECG-like or glucose marker chart image dynamically."""
-    import numpy as np
-    plt.figure(figsize=(4, 1.5))
-
-    if "heart" in disease_type.lower():
-        # Simulated ECG for heart patients
-        t = np.linspace(0, 2*np.pi, 200)
-        ecg = np.sin(5*t) * (np.sin(2*t) > 0)
-        plt.plot(t, ecg, color="#d60000", linewidth=1.8)
-        plt.title("ECG Trend", color="#0056A4", fontsize=9)
-        plt.axis('off')
-
-    elif "diabet" in disease_type.lower():
-        # Bar chart for diabetes markers
-        h = float(data.get("Hemoglobin (g/dL)", 0) or 0)
-        p = float(data.get("Urine Protein (mg/dL)", 0) or 0)
-        g = float(data.get("Urine Glucose (mg/dL)", 0) or 0)
-
-        labels = ["Hemoglobin", "Urine Protein", "Urine Glucose"]
-        values = [h, p, g]
-        colors = ["#0078FF", "#00A36C", "#E63946"]
-
-        plt.bar(labels, values, color=colors)
-        plt.title("Key Diabetes Marker Levels", color="#0056A4", fontsize=9)
-        plt.ylabel("Value")
-        plt.grid(axis="y", linestyle="--", alpha=0.4)
-
-    else:
-        # Default flat trend
-        x = np.arange(10)
-        y = np.ones(10) * 5
-        plt.plot(x, y, color="#0078FF", linewidth=2)
-        plt.title("Stability Trend", color="#0056A4", fontsize=9)
-        plt.axis('off')
-
-    plt.tight_layout()
-    img_path = os.path.join(BASE_DIR, "signal_chart.png")
-    plt.savefig(img_path, transparent=True)
-    plt.close()
-    return img_path
+from followup_store import open_followup_store
+from fast_scorer import compile_model, file_fingerprint, load_compiled, save_compiled
+from explainer import ExplanationCache, ModelExplainer
+from job_queue import JobQueue
+from model_registry import ModelRegistry, first_existing, load_model_file
+from model_schema import (COMMON_FEATURES, DIABETES_FEATURES, HEART_FAILURE_FEATURES, ordinal_map,
+                          BloodPressureTransformer, MODEL_FILES, COMPACT_MODEL_FILES, MODEL_DIR,
+                          safe_float, encode_ordinal, encode_bp, distinct_strings, safe_float_array,
+                          encode_ordinal_array, bp_readings_array, encode_bp_array, _batch_column,
+                          encode_feature_matrix, batch_disease_mask)
+from payload_decoder import PayloadDecoder
+from metrics import Metrics
+from prediction_cache import PredictionCache
+import request_timing
+from request_timing import SlowRequestProfiler, phase
+from staffing import StaffingEngine
+
+# report_pdf (matplotlib + reportlab) is only imported on first use; see
+# report_module().
 
+# =========================
+# MODEL REGISTRY & STARTUP TIMINGS
+# =========================
+# Models are registered below and built on first use, or all at import
+# when PRELOAD_MODELS=1 (set by gunicorn.conf.py, which also preloads the
+# app in the master so workers share the loaded models copy-on-write).
 
+MODELS = ModelRegistry()
+MODELS.timings["imports"] = round(time.perf_counter() - _IMPORT_START, 4)
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+PRELOAD_REPORTS = os.environ.get("PRELOAD_REPORTS", "0") == "1"
 
 # =========================
 # BASE & STAFFING CSV LOAD
@@ -76,53 +55,43 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STAFFING_PATH = os.path.join(BASE_DIR, "staffing_simulation_summary.csv")
 
 
-def load_staffing():
-    """
-    Load staffing_simulation_summary.csv with columns:
-    Date,Beds,Nurses,Doctors,Unit
-    """
-    try:
-        df = pd.read_csv(STAFFING_PATH)
-        expected_cols = {"Date", "Beds", "Nurses", "Doctors", "Unit"}
-        if not expected_cols.issubset(df.columns):
-            print(f"[WARN] Staffing CSV missing expected columns. Found: {df.columns.tolist()}")
-            return pd.DataFrame(columns=list(expected_cols))
-
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df.dropna(subset=["Date"])
-        print(f"[INFO] Loaded staffing CSV with {len(df)} rows.")
-        return df
-    except Exception as e:
-        print(f"[ERROR] Failed to load staffing CSV: {e}")
-        return pd.DataFrame(columns=["Date", "Beds", "Nurses", "Doctors", "Unit"])
-
-
-STAFFING_DF = None
+# Date,Readmissions,Beds_Required,Nurses_Needed,Doctors_Needed,
+# Support_Staff_Needed (optionally Unit), indexed once and reloaded
+# automatically when the file changes.
+with MODELS.phase("staffing_index"):
+    STAFFING_ENGINE = StaffingEngine(STAFFING_PATH)
 
 # =========================================================
-# FOLLOW-UP DATABASE (CSV) SETUP
+# FOLLOW-UP DATABASE SETUP
 # =========================================================
+# FOLLOWUP_STORE=sqlite (default) keeps follow-ups in an indexed SQLite
+# file and imports patient_followups.csv once on first start.
+# FOLLOWUP_STORE=csv keeps the legacy read-modify-write CSV.
 FOLLOWUP_PATH = os.path.join(BASE_DIR, "patient_followups.csv")
-
-# Ensure the file exists
-if not os.path.exists(FOLLOWUP_PATH):
-    pd.DataFrame(columns=[
-        "Patient ID", "Patient Name", "Problem Type",
-        "Readmission Probability", "Risk Label",
-        "Followup Channel", "Next Visit",
-        "Simulation Date", "Hospital Unit",
-        "Prediction Date", "Status"
-    ]).to_csv(FOLLOWUP_PATH, index=False)
+FOLLOWUP_DB_PATH = os.environ.get(
+    "FOLLOWUP_DB_PATH", os.path.join(BASE_DIR, "patient_followups.db")
+)
+with MODELS.phase("followup_store"):
+    FOLLOWUP_STORE = open_followup_store(
+        os.environ.get("FOLLOWUP_STORE", "sqlite"), FOLLOWUP_PATH, FOLLOWUP_DB_PATH
+    )
+print(f"[INFO] Follow-up store: {FOLLOWUP_STORE.name}")
 
 
 def save_followup_record(record):
-    """Append one patient follow-up record to CSV."""
-    df = pd.read_csv(FOLLOWUP_PATH)
-    df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
-    df.to_csv(FOLLOWUP_PATH, index=False)
+    """Store one patient follow-up record."""
+    FOLLOWUP_STORE.add(record)
     print(f"[INFO] Saved follow-up for {record.get('Patient Name')}")
 
 
+def save_followup_records(records):
+    """Store many follow-up records in a single write."""
+    if not records:
+        return
+    FOLLOWUP_STORE.add_many(records)
+    print(f"[INFO] Saved {len(records)} follow-ups")
+
+
 # =========================
 # FLASK APP CONFIG
 # =========================
@@ -131,128 +100,117 @@ app = Flask(__name__, static_folder="frontend", static_url_path="/")
 CORS(app)
 
 # =========================
-# FEATURES (DO NOT CHANGE)
-# =========================
-
-COMMON_FEATURES = [
-    "Age",
-    "Sex",
-    "Weight",
-    "Blood Pressure",
-    "Cholesterol",
-    "Insulin",
-    "Platelets",
-    "Diabetics",
-    "air_quality_index",
-    "social_event_count",
-]
-
-DIABETES_FEATURES = [
-    "Hemoglobin (g/dL)",
-    "WBC Count (10^9/L)",
-    "Platelet Count (10^9/L)",
-    "Urine Protein (mg/dL)",
-    "Urine Glucose (mg/dL)",
-]
-
-HEART_FAILURE_FEATURES = [
-    "ECG Result",
-    "Pulse Rate (bpm)",
-]
-
-ordinal_map = {
-    "Low": 1,
-    "Normal": 2,
-    "Moderate": 3,
-    "High": 4,
-    "low": 1,
-    "normal": 2,
-    "moderate": 3,
-    "high": 4,
-    "Borderline": 3,
-    "borderline": 3,
-    "Abnormal": 4,
-    "abnormal": 4,
-}
-
-# =========================
-# COMPAT FOR OLD PIPELINES
+# JSON
 # =========================
+# jsonify() and request.get_json() go through orjson when it is
+# installed (FAST_JSON=0 keeps Flask's json-module provider). Output is
+# the same JSON except that keys keep insertion order instead of being
+# sorted, and NaN is written as null. Request bodies orjson rejects
+# (NaN/Infinity literals) are retried with the json module.
+
+FAST_JSON = os.environ.get("FAST_JSON", "1") != "0"
+try:
+    import orjson
+
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    @staticmethod
+    def _default(o):
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return super().loads(s)
 
-class BloodPressureTransformer:
-    def fit(self, X, y=None):
-        return self
-
-    def transform(self, X):
-        return X
+    def response(self, *args, **kwargs):
+        if self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 
-sys.modules["__main__"].BloodPressureTransformer = BloodPressureTransformer
+if FAST_JSON and orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # =========================
 # MODEL LOADER
 # =========================
 
-def load_first_existing(paths):
-    for p in paths:
-        if os.path.exists(p):
-            try:
-                print(f"[MODEL] Loading via joblib: {p}")
-                return joblib.load(p)
-            except Exception as e:
-                print(f"[WARN] joblib.load failed for {p}: {e}")
-                print("[INFO] Trying cloudpickle fallback...")
-                with open(p, "rb") as f:
-                    return cloudpickle.load(f)
-    raise FileNotFoundError(f"No model file found in: {paths}")
-
-
-diabetes_model = load_first_existing(
-    [
-        "readmission_diabetes_RandomForest.pkl",
-        "readmission_diabetes_advanced.pkl",
-        "readmission_diabetes.pkl",
-    ]
+MODEL_KEYS = {"Diabetes": "diabetes", "Heart Disease": "heart_disease"}
+
+# Serving tier: train.py saves a calibrated compact model next to each
+# heavy one and records both test ROC-AUCs in training_summary.json.
+# MODEL_TIER=auto (default) serves the compact model for a disease when
+# its AUC is at most COMPACT_AUC_TOLERANCE below the heavy model's;
+# MODEL_TIER=heavy / compact force one tier (compact only where the file
+# exists). Versions without a compact model or a summary serve the heavy
+# model as before.
+MODEL_TIER = os.environ.get("MODEL_TIER", "auto").lower()
+COMPACT_AUC_TOLERANCE = float(os.environ.get("COMPACT_AUC_TOLERANCE", 0.01))
+
+
+def serving_tiers(generation):
+    """Tier ("compact" or "heavy") per model key for one model version."""
+    diseases = (generation.metadata() or {}).get("diseases", {})
+    tiers = {}
+    for key in MODEL_FILES:
+        tier, reason = "heavy", "no compact model"
+        info = diseases.get(key, {})
+        heavy_auc = info.get("models", {}).get(info.get("saved_model"), {}).get("metrics_test", {}).get("roc_auc")
+        compact_auc = info.get("compact", {}).get("metrics_test", {}).get("roc_auc")
+        if MODEL_TIER == "heavy":
+            reason = "MODEL_TIER=heavy"
+        elif os.path.exists(generation.path_for(COMPACT_MODEL_FILES[key])):
+            if MODEL_TIER == "compact":
+                tier, reason = "compact", "MODEL_TIER=compact"
+            elif heavy_auc is None or compact_auc is None:
+                reason = "no test AUCs in the training summary"
+            else:
+                reason = f"test AUC {compact_auc:.4f} vs {heavy_auc:.4f}"
+                if compact_auc >= heavy_auc - COMPACT_AUC_TOLERANCE:
+                    tier = "compact"
+        print(f"[INFO] Serving {tier} {key} model for version {generation.version} ({reason})")
+        tiers[key] = tier
+    return tiers
+
+
+def serving_files(generation, key):
+    """Candidate model files for `key` in the tier `generation` serves."""
+    if generation.get("serving_tiers")[key] == "compact":
+        return [generation.path_for(COMPACT_MODEL_FILES[key])]
+    return [generation.path_for(f) for f in MODEL_FILES[key]]
+
+
+MODELS.register("serving_tiers", serving_tiers)
+for _key in MODEL_FILES:
+    MODELS.register(_key, lambda gen, key=_key: load_model_file(serving_files(gen, key)))
+
+# Versioned models: MODEL_DIR/<version>/ with MODEL_DIR/CURRENT naming the
+# live one. Workers poll CURRENT every MODEL_WATCH_INTERVAL seconds and
+# switch after the new version passes warm_models(). Without MODEL_DIR
+# the .pkl files are read from the working directory as before.
+MODELS.use_directory(
+    MODEL_DIR,
+    watch_interval=float(os.environ.get("MODEL_WATCH_INTERVAL", 10)),
+    warm=lambda generation: warm_models(generation),
 )
 
-heart_model = load_first_existing(
-    [
-        "readmission_heart_disease_RandomForest.pkl",
-        "readmission_heart_disease_advanced.pkl",
-        "readmission_heart_disease.pkl",
-    ]
-)
-
-# =========================
-# HELPER FUNCTIONS
-# =========================
-
-def safe_float(value, default=0.0):
-    try:
-        if value is None:
-            return default
-        s = str(value).strip()
-        if s == "" or s.lower() in ["nan", "none", "null"]:
-            return default
-        return float(s)
-    except Exception:
-        return default
-
-
-def encode_ordinal(value, default=2):
-    if value is None:
-        return default
-    return ordinal_map.get(str(value).strip(), default)
-
-
-def encode_bp(bp_str):
-    try:
-        s, d = str(bp_str).split("/")
-        return float(s) / 120.0 + float(d) / 80.0
-    except Exception:
-        return 2.0
-
-
 def compute_severity_score(payload, disease):
     try:
         age = safe_float(payload.get("Age", 0))
@@ -339,15 +297,23 @@ def risk_category(adj_prob):
     return "High"
 
 
-def followup_plan(risk_score, problem_type):
+def followup_band(risk_score):
     if risk_score >= 0.7:
+        return "High"
+    elif risk_score >= 0.4:
+        return "Medium"
+    return "Low"
+
+
+def followup_plan_for_band(band):
+    if band == "High":
         return {
             "risk_band": "High",
             "channel": "Phone + SMS + App",
             "schedule": ["48 hours", "7 days", "14 days"],
             "note": "High risk of readmission. Arrange follow-up within 2 days.",
         }
-    elif risk_score >= 0.4:
+    elif band == "Medium":
         return {
             "risk_band": "Medium",
             "channel": "SMS + App",
@@ -362,12 +328,17 @@ def followup_plan(risk_score, problem_type):
             "note": "Low risk. Routine follow-up in 1–2 weeks.",
         }
 
+
+def followup_plan(risk_score, problem_type):
+    return followup_plan_for_band(followup_band(risk_score))
+
 # =========================
-# STAFFING SIMULATOR (CSV)
+# STAFFING SIMULATOR
 # =========================
 
 def staffing_simulator(risk_score, sim_date=None, hospital_unit=None):
-    if STAFFING_DF is None or STAFFING_DF.empty:
+    means = STAFFING_ENGINE.window_means(sim_date=sim_date, hospital_unit=hospital_unit)
+    if means is None:
         expected = round(risk_score * 10, 2)
         base = max(1, int(expected))
         return {
@@ -377,27 +348,9 @@ def staffing_simulator(risk_score, sim_date=None, hospital_unit=None):
             "suggested_doctors": max(1, base // 3 + 1),
         }
 
-    df = STAFFING_DF.copy()
-
-    if hospital_unit:
-        df = df[df["Unit"].astype(str).str.contains(str(hospital_unit), case=False, na=False)]
-
-    if sim_date:
-        try:
-            sim_dt = pd.to_datetime(sim_date, errors="coerce")
-            if not pd.isna(sim_dt):
-                df["date_diff"] = (df["Date"] - sim_dt).abs().dt.days
-                df = df.sort_values("date_diff")
-                df = df[df["date_diff"] <= 3]
-        except Exception as e:
-            print(f"[WARN] Bad sim_date: {e}")
-
-    if df.empty:
-        df = STAFFING_DF.copy()
-
-    beds_base = max(1, int(round(df["Beds"].mean())))
-    nurses_base = max(1, int(round(df["Nurses"].mean())))
-    doctors_base = max(1, int(round(df["Doctors"].mean())))
+    beds_base = max(1, int(round(means["beds"])))
+    nurses_base = max(1, int(round(means["nurses"])))
+    doctors_base = max(1, int(round(means["doctors"])))
 
     factor = 0.8 + risk_score * 0.8
     beds = max(1, int(round(beds_base * factor)))
@@ -406,61 +359,641 @@ def staffing_simulator(risk_score, sim_date=None, hospital_unit=None):
 
     expected = round(risk_score * 10, 2)
 
-    return {
+    result = {
         "expected_readmissions": expected,
         "suggested_beds": beds,
         "suggested_nurses": nurses,
         "suggested_doctors": doctors,
     }
+    if "support_staff" in means:
+        support_base = max(1, int(round(means["support_staff"])))
+        result["suggested_support_staff"] = max(1, int(round(support_base * factor)))
+    return result
 
 # =========================
 # BUILD FEATURE DATAFRAME
 # =========================
 
-def build_feature_df(payload):
+# Field schema for PayloadDecoder: (kind, value used when the key is
+# absent). A key that is present but blank still decodes to 0.0.
+FIELD_SCHEMA = {
+    "Age": ("number", 0),
+    "Sex": ("sex", "Male"),
+    "Weight": ("number", 0),
+    "Blood Pressure": ("bp", "120/80"),
+    "Cholesterol": ("number", 0),
+    "Insulin": ("ordinal", "Normal"),
+    "Platelets": ("number", 0),
+    "Diabetics": ("ordinal", "Normal"),
+    "air_quality_index": ("number", 50),
+    "social_event_count": ("number", 0),
+    "Hemoglobin (g/dL)": ("number", 13.5),
+    "WBC Count (10^9/L)": ("number", 7.0),
+    "Platelet Count (10^9/L)": ("number", 250),
+    "Urine Protein (mg/dL)": ("number", 10),
+    "Urine Glucose (mg/dL)": ("number", 5),
+    "ECG Result": ("ordinal", "Normal"),
+    "Pulse Rate (bpm)": ("number", 72),
+}
+PAYLOAD_DECODERS = {
+    "Diabetes": PayloadDecoder(COMMON_FEATURES + DIABETES_FEATURES, FIELD_SCHEMA, ordinal_map),
+    "Heart Disease": PayloadDecoder(COMMON_FEATURES + HEART_FAILURE_FEATURES, FIELD_SCHEMA, ordinal_map),
+}
+
+# STRICT_PAYLOADS=1 rejects single-patient requests with unreadable
+# fields (400 with the per-field errors) instead of scoring them with the
+# field's fallback value.
+STRICT_PAYLOADS = os.environ.get("STRICT_PAYLOADS", "0") == "1"
+
+
+def decode_patient(payload):
+    """(float64 feature vector, features, disease, {field: error}) for one patient."""
     problem_type = (payload.get("Problem Type") or "").strip()
-    problem_type_lower = problem_type.lower()
+    disease = "Diabetes" if "diab" in problem_type.lower() else "Heart Disease"
+    decoder = PAYLOAD_DECODERS[disease]
+    values, errors = decoder.decode(payload)
+    return values, decoder.features, disease, errors
 
-    if "diab" in problem_type_lower:
-        features = COMMON_FEATURES + DIABETES_FEATURES
-        model = diabetes_model
-        disease = "Diabetes"
-    else:
-        features = COMMON_FEATURES + HEART_FAILURE_FEATURES
-        model = heart_model
-        disease = "Heart Disease"
-
-    row = {}
-
-    row["Age"] = safe_float(payload.get("Age", 0))
-    sex_raw = (payload.get("Sex") or "Male").strip().lower()
-    row["Sex"] = 1.0 if sex_raw == "female" else 0.0
-    row["Weight"] = safe_float(payload.get("Weight", 0))
-    row["Blood Pressure"] = encode_bp(payload.get("Blood Pressure", "120/80"))
-    row["Cholesterol"] = safe_float(payload.get("Cholesterol", 0))
-    row["Insulin"] = float(encode_ordinal(payload.get("Insulin", "Normal")))
-    row["Platelets"] = safe_float(payload.get("Platelets", 0))
-    row["Diabetics"] = float(encode_ordinal(payload.get("Diabetics", "Normal")))
-    row["air_quality_index"] = safe_float(payload.get("air_quality_index", 50))
-    row["social_event_count"] = safe_float(payload.get("social_event_count", 0))
-
-    if disease == "Diabetes":
-        row["Hemoglobin (g/dL)"] = safe_float(payload.get("Hemoglobin (g/dL)", 13.5))
-        row["WBC Count (10^9/L)"] = safe_float(payload.get("WBC Count (10^9/L)", 7.0))
-        row["Platelet Count (10^9/L)"] = safe_float(payload.get("Platelet Count (10^9/L)", 250))
-        row["Urine Protein (mg/dL)"] = safe_float(payload.get("Urine Protein (mg/dL)", 10))
-        row["Urine Glucose (mg/dL)"] = safe_float(payload.get("Urine Glucose (mg/dL)", 5))
-    else:
-        row["ECG Result"] = float(encode_ordinal(payload.get("ECG Result", "Normal")))
-        row["Pulse Rate (bpm)"] = safe_float(payload.get("Pulse Rate (bpm)", 72))
 
-    full_features = COMMON_FEATURES + (
+def build_feature_row(payload):
+    """Encoded float values for one patient, in model feature order.
+
+    Returns (values, features, model, disease).
+    """
+    values, features, disease, _ = decode_patient(payload)
+    return values, features, MODELS.lazy(MODEL_KEYS[disease]), disease
+
+
+def build_feature_df(payload):
+    values, features, model, disease = build_feature_row(payload)
+    X = pd.DataFrame([values], columns=features).astype("float64")
+
+    return X, model, disease
+
+# =========================
+# BUILD FEATURE MATRIX (BATCH)
+# =========================
+
+def build_feature_matrix(frame, disease):
+    """(X, model, features) for every row of `frame` (all one disease).
+
+    The encoding is model_schema.encode_feature_matrix; the model is the
+    registry's lazy handle for the disease.
+    """
+    X, features = encode_feature_matrix(frame, disease)
+    model = MODELS.lazy("diabetes" if disease == "Diabetes" else "heart_disease")
+    return X, model, features
+
+
+def predict_batch(frame):
+    """Raw model probability and disease for every row of `frame`.
+
+    Rows are split by disease and each model's predict_proba is called
+    exactly once.
+    """
+    model_prob = np.zeros(len(frame), dtype="float64")
+    diseases = np.empty(len(frame), dtype=object)
+    is_diab = batch_disease_mask(frame)
+
+    for disease, mask in (("Diabetes", is_diab), ("Heart Disease", ~is_diab)):
+        if not mask.any():
+            continue
+        X, model, features = build_feature_matrix(frame[mask], disease)
+        model_prob[mask] = predict_matrix(X, model, features, disease)
+        diseases[mask] = disease
+
+    return model_prob, diseases
+
+
+def frame_records(frame):
+    """Row dicts of `frame` without NaN cells, so payload defaults still apply."""
+    return [
+        {k: v for k, v in row.items() if not (isinstance(v, float) and v != v)}
+        for row in frame.to_dict(orient="records")
+    ]
+
+
+# =========================
+# VECTORIZED RISK SCORING
+# =========================
+# Array versions of compute_severity_score, adjusted_risk_score,
+# risk_category and followup_band for batch scoring and offline
+# rescoring. Each takes a DataFrame of payload columns (missing columns
+# and NaN cells get the payload defaults) and returns one value per row,
+# identical to calling the scalar function on frame_records(frame).
+
+def _batch_numeric(frame, name, default):
+    return safe_float_array(_batch_column(frame, name, default))
+
+
+def _batch_text_flags(frame, name, default, needles):
+    """One bool array per needle: is it a substring of str(value).lower()?"""
+    codes, text = distinct_strings(_batch_column(frame, name, default))
+    text = text.str.lower()
+    return [text.str.contains(needle, regex=False).to_numpy()[codes] for needle in needles]
+
+
+def compute_severity_array(frame, diseases):
+    """compute_severity_score for every row; `diseases` is one name or one per row."""
+    age = _batch_numeric(frame, "Age", 0)
+    chol = _batch_numeric(frame, "Cholesterol", 0)
+    aqi = _batch_numeric(frame, "air_quality_index", 50)
+    events = _batch_numeric(frame, "social_event_count", 0)
+    hgb = _batch_numeric(frame, "Hemoglobin (g/dL)", 13.5)
+    wbc = _batch_numeric(frame, "WBC Count (10^9/L)", 7.0)
+    uprot = _batch_numeric(frame, "Urine Protein (mg/dL)", 10)
+    uglu = _batch_numeric(frame, "Urine Glucose (mg/dL)", 5)
+    pulse = _batch_numeric(frame, "Pulse Rate (bpm)", 72)
+    (insulin_high,) = _batch_text_flags(frame, "Insulin", "Normal", ["high"])
+    (diab_high,) = _batch_text_flags(frame, "Diabetics", "Normal", ["high"])
+    ecg_abnormal, ecg_borderline = _batch_text_flags(frame, "ECG Result", "Normal", ["abnormal", "borderline"])
+
+    # Unparseable readings score nothing, as in the scalar try/except.
+    systolic, diastolic = bp_readings_array(_batch_column(frame, "Blood Pressure", "120/80"))
+
+    score = np.select([age >= 75, age >= 60], [2.0, 1.0], 0.0)
+    score += np.select(
+        [(systolic >= 160) | (diastolic >= 100), (systolic >= 140) | (diastolic >= 90)], [2.0, 1.0], 0.0
+    )
+    score += np.select([chol >= 260, chol >= 220], [2.0, 1.0], 0.0)
+    score += np.where(insulin_high, 1.0, 0.0)
+    score += np.where(diab_high, 2.0, 0.0)
+    score += np.where(uprot >= 30, 1.0, 0.0)
+    score += np.where(uglu >= 20, 1.0, 0.0)
+    score += np.where(wbc >= 11, 1.0, 0.0)
+    score += np.where(hgb < 10, 1.0, 0.0)
+
+    heart = np.broadcast_to(np.asarray(diseases, dtype=object) == "Heart Disease", score.shape)
+    ecg_points = np.select([ecg_abnormal, ecg_borderline], [2.0, 1.0], 0.0)
+    score += np.where(heart, ecg_points + np.where(pulse >= 100, 1.0, 0.0), 0.0)
+
+    score += np.where(aqi >= 120, 1.0, 0.0)
+    score += np.where(events >= 3, 0.5, 0.0)
+    return score
+
+
+def adjusted_risk_array(model_prob, frame, diseases):
+    """adjusted_risk_score for every row of `frame`."""
+    sev_norm = np.clip(compute_severity_array(frame, diseases), 0.0, 8.0) / 8.0
+    combined = 0.4 * np.asarray(model_prob, dtype="float64") + 0.6 * sev_norm
+    return np.clip(combined, 0.0, 1.0)
+
+
+def risk_category_array(adj_prob):
+    adj_prob = np.asarray(adj_prob, dtype="float64")
+    return np.select([adj_prob < 0.40, adj_prob < 0.70], ["Low", "Medium"], "High").astype(object)
+
+
+def followup_band_array(risk_score):
+    risk_score = np.asarray(risk_score, dtype="float64")
+    return np.select([risk_score >= 0.7, risk_score >= 0.4], ["High", "Medium"], "Low").astype(object)
+
+
+# =========================
+# FAST SCORING PATH
+# =========================
+# Models are flattened into NumPy arrays once at startup (fast_scorer)
+# and only used if they reproduce predict_proba exactly on rows from
+# final_dataset_realistic.csv. FAST_SCORING=0 turns the fast path off.
+#
+# With MODEL_MMAP=1 (default) a verified scorer is saved next to its
+# pickle as <name>.fast.joblib and later loaded memory-mapped, tied to the
+# pickle by its sha256. Workers then share the node tables through the
+# page cache, and the sklearn pickle itself is only loaded if needed.
+
+FAST_SCORING = os.environ.get("FAST_SCORING", "1") != "0"
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "1") != "0"
+DATASET_PATH = os.path.join(BASE_DIR, "final_dataset_realistic.csv")
+
+
+def load_probe_rows(disease, n=256):
+    """Encoded rows of one disease from the shipped dataset for parity checks."""
+    try:
+        df = pd.read_csv(DATASET_PATH, nrows=4 * n)
+        df = df[batch_disease_mask(df) == (disease == "Diabetes")].head(n)
+        if not df.empty:
+            return build_feature_matrix(df, disease)[0]
+    except Exception as e:
+        print(f"[WARN] Could not read probe rows from dataset: {e}")
+    features = COMMON_FEATURES + (
         DIABETES_FEATURES if disease == "Diabetes" else HEART_FAILURE_FEATURES
     )
-    values = [safe_float(row.get(col, 0.0), 0.0) for col in full_features]
-    X = pd.DataFrame([values], columns=full_features).astype("float64")
+    return np.random.default_rng(0).normal(50.0, 25.0, size=(n, len(features)))
 
-    return X, model, disease
+
+def load_fast_scorer(disease, generation):
+    """Memory-mapped compiled scorer if up to date, otherwise compile (and save) one."""
+    key = MODEL_KEYS[disease]
+    features = COMMON_FEATURES + (
+        DIABETES_FEATURES if disease == "Diabetes" else HEART_FAILURE_FEATURES
+    )
+    source = first_existing(serving_files(generation, key))
+    artifact = os.path.splitext(source)[0] + ".fast.joblib" if source else None
+
+    if MODEL_MMAP and source:
+        fingerprint = file_fingerprint(source)
+        scorer = load_compiled(artifact, fingerprint)
+        if scorer is not None:
+            print(f"[INFO] Fast scoring enabled for {scorer.kind} (memory-mapped {artifact})")
+            return scorer
+
+    scorer = compile_model(generation.get(key), features, load_probe_rows(disease))
+    if scorer is not None and MODEL_MMAP and source:
+        try:
+            save_compiled(scorer, artifact, fingerprint)
+            scorer = load_compiled(artifact, fingerprint) or scorer
+        except OSError as e:
+            print(f"[WARN] Could not save compiled scorer {artifact}: {e}")
+    return scorer
+
+
+if FAST_SCORING:
+    for _disease in MODEL_KEYS:
+        MODELS.register(f"fast:{_disease}", lambda gen, d=_disease: load_fast_scorer(d, gen))
+
+
+def fast_scorer_for(disease):
+    """Compiled scorer for `disease`, or None to use predict_proba."""
+    return MODELS.get(f"fast:{disease}") if FAST_SCORING else None
+
+
+def report_module():
+    """report_pdf (matplotlib + reportlab), imported on first use."""
+    module = sys.modules.get("report_pdf")
+    if module is None:
+        with MODELS.phase("import:report_pdf"):
+            import report_pdf as module
+    return module
+
+
+def predict_matrix(X, model, features, disease):
+    """Positive-class probabilities for a float64 feature matrix."""
+    scorer = fast_scorer_for(disease)
+    if scorer is not None:
+        return scorer.predict_proba1(X)
+    return model.predict_proba(pd.DataFrame(X, columns=features))[:, 1]
+
+
+# =========================
+# PREDICTION CACHE
+# =========================
+# Single-patient scores are cached on the encoded feature vector and the
+# model files' fingerprint (see prediction_cache). PREDICTION_CACHE_SIZE=0
+# turns the in-process LRU off; PREDICTION_CACHE_DB adds the SQLite tier
+# shared by all workers.
+
+PREDICTION_CACHE = PredictionCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)),
+    db_path=os.environ.get("PREDICTION_CACHE_DB") or None,
+    ttl_seconds=int(os.environ.get("PREDICTION_CACHE_TTL", 24 * 3600)),
+)
+
+
+def model_cache_tag(generation):
+    """Short hash of the model files a generation serves."""
+    h = hashlib.sha1(generation.version.encode())
+    for key in MODEL_FILES:
+        source = first_existing(serving_files(generation, key))
+        h.update((file_fingerprint(source) if source else "-").encode())
+    return h.hexdigest()[:16]
+
+
+MODELS.register("cache_tag", model_cache_tag)
+
+
+class PayloadError(ValueError):
+    """Unreadable fields in a single-patient payload (STRICT_PAYLOADS=1)."""
+
+    def __init__(self, errors):
+        super().__init__(f"Invalid fields: {', '.join(errors)}")
+        self.errors = errors
+
+
+def predict_model_prob(payload):
+    """Raw model probability for one patient; returns (model_prob, disease, field_errors)."""
+    with phase("feature"):
+        values, features, disease, errors = decode_patient(payload)
+    if errors and STRICT_PAYLOADS:
+        raise PayloadError(errors)
+
+    with phase("model"):
+        key = None
+        if PREDICTION_CACHE.enabled:
+            key = PREDICTION_CACHE.key(MODELS.get("cache_tag"), disease, values)
+            cached = PREDICTION_CACHE.get(key)
+            if cached is not None:
+                return cached, disease, errors
+
+        scorer = fast_scorer_for(disease)
+        if scorer is not None:
+            prob = float(scorer.predict_proba1(values[None, :])[0])
+        else:
+            X = pd.DataFrame([values], columns=features)
+            prob = float(MODELS.get(MODEL_KEYS[disease]).predict_proba(X)[0, 1])
+
+        if key is not None:
+            PREDICTION_CACHE.put(key, prob)
+        return prob, disease, errors
+
+# =========================
+# EXPLANATIONS
+# =========================
+# /api/explain and the report's "Key Risk Factors" section use one
+# ModelExplainer per disease and model version (explainer.py), built on
+# first use from EXPLAIN_BACKGROUND_ROWS rows of the shipped dataset.
+# warm_models() never builds it and /api/predict never calls it, so the
+# predict path keeps its compiled scorer and latency; a cold explainer
+# only slows the first explanation. Results are cached on the prediction
+# cache's key (model tag, disease, encoded feature vector);
+# EXPLAIN_CACHE_SIZE=0 turns that off. REPORT_EXPLANATIONS=0 leaves the
+# section out of reports.
+
+EXPLAIN_BACKGROUND_ROWS = int(os.environ.get("EXPLAIN_BACKGROUND_ROWS", 100))
+EXPLAIN_TOP = int(os.environ.get("EXPLAIN_TOP", 5))
+EXPLAIN_MAX_BATCH = int(os.environ.get("EXPLAIN_MAX_BATCH", 1000))
+REPORT_EXPLANATIONS = os.environ.get("REPORT_EXPLANATIONS", "1") != "0"
+EXPLANATION_CACHE = ExplanationCache(maxsize=int(os.environ.get("EXPLAIN_CACHE_SIZE", 4096)))
+
+
+def load_background_rows(disease, n=EXPLAIN_BACKGROUND_ROWS):
+    """A fixed random sample of one disease's encoded rows from the shipped dataset."""
+    try:
+        df = pd.read_csv(DATASET_PATH)
+        df = df[batch_disease_mask(df) == (disease == "Diabetes")]
+        if not df.empty:
+            return build_feature_matrix(df.sample(n=min(n, len(df)), random_state=0), disease)[0]
+    except Exception as e:
+        print(f"[WARN] Could not read background rows from dataset: {e}")
+    return load_probe_rows(disease, n)
+
+
+def load_explainer(disease, generation):
+    """ModelExplainer for the model `generation` serves for `disease`, or None."""
+    features = COMMON_FEATURES + (
+        DIABETES_FEATURES if disease == "Diabetes" else HEART_FAILURE_FEATURES
+    )
+    try:
+        explainer = ModelExplainer(generation.get(MODEL_KEYS[disease]), features,
+                                   load_background_rows(disease))
+    except Exception as e:
+        print(f"[WARN] Explanations unavailable for {disease}: {e}")
+        return None
+    print(f"[INFO] {disease} explainer ready ({explainer.method}, version {generation.version})")
+    return explainer
+
+
+for _disease in MODEL_KEYS:
+    MODELS.register(f"explainer:{_disease}", lambda gen, d=_disease: load_explainer(d, gen))
+
+
+def explanation_result(payload, disease, explainer, phi, base, top, errors=None):
+    """The /api/explain result for one patient: the `top` largest contributions."""
+    model_value = base + float(phi.sum())
+    order = np.argsort(-np.abs(phi), kind="stable")
+    if top > 0:
+        order = order[:top]
+    probability = model_value if explainer.output == "probability" else 1.0 / (1.0 + np.exp(-model_value))
+    result = {
+        "patient_id": payload.get("Patient ID", "N/A"),
+        "disease_type": disease,
+        "method": explainer.method,
+        "output": explainer.output,
+        "base_value": round(base, 6),
+        "model_value": round(model_value, 6),
+        "model_probability": round(float(probability), 4),
+        "contributions": [
+            {
+                "feature": explainer.features[j],
+                "value": payload.get(explainer.features[j], FIELD_SCHEMA[explainer.features[j]][1]),
+                "contribution": round(float(phi[j]), 6),
+            }
+            for j in order
+        ],
+    }
+    if errors:
+        result["field_errors"] = errors
+    return result
+
+
+def explain_patients(payloads, top=EXPLAIN_TOP, strict=False):
+    """Explanation results for a list of payloads, in order.
+
+    Cache misses are explained in one call per disease. With strict=True
+    a payload with unreadable fields raises PayloadError.
+    """
+    decoded = [decode_patient(p) for p in payloads]
+    if strict:
+        for _, _, _, errors in decoded:
+            if errors:
+                raise PayloadError(errors)
+
+    tag = MODELS.get("cache_tag") if EXPLANATION_CACHE.enabled else None
+    results = [None] * len(payloads)
+    for disease in MODEL_KEYS:
+        rows = [i for i, d in enumerate(decoded) if d[2] == disease]
+        if not rows:
+            continue
+        explainer = MODELS.get(f"explainer:{disease}")
+        if explainer is None:
+            raise RuntimeError(f"Explanations are not available for the {disease} model")
+
+        explained, keys, todo = {}, {}, []
+        for i in rows:
+            if tag is not None:
+                keys[i] = PREDICTION_CACHE.key(tag, disease, decoded[i][0])
+                cached = EXPLANATION_CACHE.get(keys[i])
+                if cached is not None:
+                    explained[i] = cached
+                    continue
+            todo.append(i)
+        if todo:
+            phi, base = explainer.explain(np.vstack([decoded[i][0] for i in todo]))
+            for row, i in enumerate(todo):
+                explained[i] = (phi[row].copy(), float(base[row]))
+                if i in keys:
+                    EXPLANATION_CACHE.put(keys[i], explained[i])
+
+        for i in rows:
+            phi, base = explained[i]
+            results[i] = explanation_result(payloads[i], disease, explainer, phi, base, top, decoded[i][3])
+    return results
+
+
+def report_explanations(payloads):
+    """Explanations for report pages, or Nones when they are off or fail."""
+    if REPORT_EXPLANATIONS and payloads:
+        try:
+            with phase("explain"):
+                return explain_patients(payloads)
+        except Exception as e:
+            print(f"[WARN] Report explanations unavailable: {e}")
+    return [None] * len(payloads)
+
+
+def warm_models(generation, canary_rows=64):
+    """Load what requests will need from `generation` and score a canary batch.
+
+    Raises if the version cannot score, so a broken model is never swapped in.
+    """
+    with MODELS.pinned(generation):
+        if PREDICTION_CACHE.enabled:
+            generation.get("cache_tag")
+        for disease, key in MODEL_KEYS.items():
+            # The sklearn models are only needed where there is no compiled scorer.
+            if fast_scorer_for(disease) is None:
+                generation.get(key)
+            features = COMMON_FEATURES + (
+                DIABETES_FEATURES if disease == "Diabetes" else HEART_FAILURE_FEATURES
+            )
+            canary = load_probe_rows(disease, canary_rows)
+            probs = predict_matrix(canary, MODELS.lazy(key), features, disease)
+            if not np.all(np.isfinite(probs)) or probs.min() < 0.0 or probs.max() > 1.0:
+                raise ValueError(f"{disease} model {generation.version} returned invalid probabilities")
+    print(f"[INFO] Model version {generation.version} warmed ({canary_rows} canary rows per disease)")
+
+
+if PRELOAD_MODELS:
+    warm_models(MODELS.current())
+if PRELOAD_REPORTS:
+    report_module()
+print(f"[INFO] Startup phases (s): {MODELS.timings}")
+
+
+@app.before_request
+def pin_model_version():
+    # Each request uses the model version that was live when it started.
+    MODELS.ensure_watcher()
+    MODELS.pin()
+
+
+@app.after_request
+def record_model_version(response):
+    response.headers["X-Model-Version"] = MODELS.current().version
+    return response
+
+
+# =========================
+# METRICS & PROFILING
+# =========================
+# Every request's duration and phases (request_timing) feed the
+# Prometheus histograms served by GET /metrics (METRICS=0 turns them
+# off). gunicorn.conf.py sets METRICS_DIR so the workers' counts are
+# summed. SERVER_TIMING=1 also returns the phases in a Server-Timing
+# header, and PROFILE_SAMPLE_RATE > 0 profiles a sample of requests,
+# keeping those slower than PROFILE_SLOW_MS.
+
+METRICS = Metrics(
+    directory=os.environ.get("METRICS_DIR") or None,
+    flush_interval=float(os.environ.get("METRICS_FLUSH_INTERVAL", 5)),
+    enabled=os.environ.get("METRICS", "1") != "0",
+)
+PROFILER = SlowRequestProfiler(
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+    slow_ms=float(os.environ.get("PROFILE_SLOW_MS", 500)),
+    directory=os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "profiles")),
+)
+
+
+@app.before_request
+def start_request_timing():
+    if request_timing.ENABLED or METRICS.enabled or PROFILER.enabled:
+        request_timing.start()
+    if PROFILER.enabled:
+        PROFILER.start()
+
+
+@app.after_request
+def record_request_timing(response):
+    timing = request_timing.finish()
+    if timing is None:
+        return response
+    phases, seconds = timing
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if request_timing.ENABLED:
+        response.headers["Server-Timing"] = request_timing.header(phases, seconds)
+    if PROFILER.enabled:
+        dump = PROFILER.stop(route, seconds)
+        if dump:
+            print(f"[WARN] Slow request {request.method} {route} ({seconds * 1000:.0f}ms), profile: {dump}")
+            METRICS.inc("readmission_profiled_requests_total", (("route", route),))
+    if METRICS.enabled:
+        METRICS.observe_request(route, request.method, response.status_code, seconds, phases)
+    return response
+
+
+@app.teardown_request
+def stop_profiler(exc):
+    # A request that failed before after_request must not keep profiling.
+    PROFILER.discard()
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    if not METRICS.enabled:
+        return jsonify({"error": "Metrics are disabled (METRICS=0)"}), 404
+    return app.response_class(METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.teardown_request
+def unpin_model_version(exc):
+    MODELS.unpin()
+
+
+# Rows are scored SCORE_CHUNK_ROWS at a time, so a cohort never holds
+# more than one chunk of scored rows in memory ahead of its consumer.
+SCORE_CHUNK_ROWS = max(1, int(os.environ.get("SCORE_CHUNK_ROWS", 256)))
+
+
+def score_chunks(frame, chunk_rows=SCORE_CHUNK_ROWS):
+    """Batch-score `frame` chunk_rows rows at a time, yielding one list per
+    chunk of (data, disease, adj_prob, risk, followup, staffing) tuples.
+    """
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows].reset_index(drop=True)
+        model_prob, diseases = predict_batch(chunk)
+        adj = adjusted_risk_array(model_prob, chunk, diseases)
+        risks = risk_category_array(adj)
+        bands = followup_band_array(adj)
+        rows = []
+        for data, disease, adj_prob, risk, band in zip(frame_records(chunk), diseases, adj.tolist(), risks, bands):
+            staffing = staffing_simulator(
+                adj_prob,
+                sim_date=data.get("Simulation Date"),
+                hospital_unit=data.get("Hospital Unit"),
+            )
+            rows.append((data, disease, adj_prob, risk, followup_plan_for_band(band), staffing))
+        yield rows
+
+
+def score_frame(frame):
+    """Batch-score `frame`, yielding one tuple per row in input order:
+    (data, disease, adj_prob, risk, followup, staffing).
+    """
+    for rows in score_chunks(frame):
+        yield from rows
+
+
+def read_batch_frame(req):
+    """Parse a batch request body (JSON array, CSV or NDJSON) into a DataFrame."""
+    upload = req.files.get("file")
+    if upload is not None:
+        name = (upload.filename or "").lower()
+        if name.endswith((".ndjson", ".jsonl")):
+            return pd.read_json(upload.stream, lines=True, dtype=False)
+        return pd.read_csv(upload.stream)
+
+    mimetype = (req.mimetype or "").lower()
+    if mimetype in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        return pd.read_json(io.BytesIO(req.get_data()), lines=True, dtype=False)
+    if mimetype in ("text/csv", "application/csv"):
+        return pd.read_csv(io.BytesIO(req.get_data()))
+
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("patients")
+    if not isinstance(data, list):
+        return None
+    return pd.DataFrame(data)
 
 # =========================
 # ROUTES
@@ -478,15 +1011,16 @@ def api_predict():
         if not data:
             return jsonify({"error": "No input data"}), 400
 
-        X, model, disease = build_feature_df(data)
-        model_prob = float(model.predict_proba(X)[0, 1])
-        adj_prob = adjusted_risk_score(model_prob, data, disease)
-        risk = risk_category(adj_prob)
-        followup = followup_plan(adj_prob, disease)
+        model_prob, disease, field_errors = predict_model_prob(data)
+        with phase("severity"):
+            adj_prob = adjusted_risk_score(model_prob, data, disease)
+            risk = risk_category(adj_prob)
+            followup = followup_plan(adj_prob, disease)
 
         sim_date = data.get("Simulation Date")
         hospital_unit = data.get("Hospital Unit")
-        staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
+        with phase("staffing"):
+            staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
 
         final_pred = "Yes" if adj_prob >= 0.5 else "No"
 
@@ -505,23 +1039,122 @@ def api_predict():
             "Prediction Date": datetime.now().strftime("%Y-%m-%d"),
             "Status": "Pending"
         }
-        save_followup_record(record)
-
-        return jsonify(
-            {
-                "disease_type": disease,
-                "readmission_probability": round(adj_prob, 4),
-                "prediction": final_pred,
-                "risk_label": risk,
-                "followup_plan": followup,
-                "staffing": staffing,
-            }
-        )
+        with phase("storage"):
+            save_followup_record(record)
+
+        result = {
+            "disease_type": disease,
+            "readmission_probability": round(adj_prob, 4),
+            "prediction": final_pred,
+            "risk_label": risk,
+            "followup_plan": followup,
+            "staffing": staffing,
+            "model_version": MODELS.current().version,
+        }
+        if field_errors:
+            result["field_errors"] = field_errors
+        return jsonify(result)
+    except PayloadError as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
     except Exception as e:
         print(f"[ERROR] Prediction failed: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    try:
+        frame = read_batch_frame(request)
+        if frame is None or frame.empty:
+            return jsonify({"error": "No input data"}), 400
+
+        results = predict_batch_results(frame)
+        return jsonify({
+            "count": len(results),
+            "model_version": MODELS.current().version,
+            "results": results,
+        })
+    except Exception as e:
+        print(f"[ERROR] Batch prediction failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def predict_batch_results(frame, on_row=None):
+    """Per-patient /api/predict results for `frame`; saves their follow-ups.
+
+    on_row(i, total) is called after each row (used for job progress).
+    """
+    from datetime import datetime
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    results = []
+    records = []
+    total = len(frame)
+    for i, (data, disease, adj_prob, risk, followup, staffing) in enumerate(score_frame(frame)):
+        sim_date = data.get("Simulation Date")
+        hospital_unit = data.get("Hospital Unit")
+
+        records.append({
+            "Patient ID": data.get("Patient ID", "N/A"),
+            "Patient Name": data.get("Patient Name", "N/A"),
+            "Problem Type": disease,
+            "Readmission Probability": round(adj_prob, 4),
+            "Risk Label": risk,
+            "Followup Channel": followup["channel"],
+            "Next Visit": followup["schedule"][0],
+            "Simulation Date": sim_date or "N/A",
+            "Hospital Unit": hospital_unit or "N/A",
+            "Prediction Date": today,
+            "Status": "Pending"
+        })
+        results.append({
+            "patient_id": data.get("Patient ID", "N/A"),
+            "disease_type": disease,
+            "readmission_probability": round(adj_prob, 4),
+            "prediction": "Yes" if adj_prob >= 0.5 else "No",
+            "risk_label": risk,
+            "followup_plan": followup,
+            "staffing": staffing,
+        })
+        if on_row is not None:
+            on_row(i + 1, total)
+
+    save_followup_records(records)
+    return results
+
+
+@app.route("/api/explain", methods=["POST"])
+def api_explain():
+    """Per-feature contributions to the model's score for one patient, or for
+    a list of them (a JSON array or {"patients": [...]}). ?top=N returns the
+    N largest contributions (0 for all features).
+    """
+    try:
+        data = request.get_json(silent=True)
+        single = isinstance(data, dict) and "patients" not in data
+        payloads = [data] if single else (data.get("patients") if isinstance(data, dict) else data)
+        if not payloads or not isinstance(payloads, list) or not all(isinstance(p, dict) for p in payloads):
+            return jsonify({"error": "No input data"}), 400
+        if len(payloads) > EXPLAIN_MAX_BATCH:
+            return jsonify({"error": f"At most {EXPLAIN_MAX_BATCH} patients per request"}), 413
+
+        top = request.args.get("top", EXPLAIN_TOP, type=int)
+        with phase("explain"):
+            results = explain_patients(payloads, top, strict=single and STRICT_PAYLOADS)
+        if single:
+            return jsonify({**results[0], "model_version": MODELS.current().version})
+        return jsonify({
+            "count": len(results),
+            "model_version": MODELS.current().version,
+            "results": results,
+        })
+    except PayloadError as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
+    except Exception as e:
+        print(f"[ERROR] Explanation failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/simulate_staffing", methods=["POST"])
 def api_simulate_staffing():
     try:
@@ -529,22 +1162,114 @@ def api_simulate_staffing():
         if not data:
             return jsonify({"error": "No input data"}), 400
 
-        X, model, disease = build_feature_df(data)
-        model_prob = float(model.predict_proba(X)[0, 1])
-        adj_prob = adjusted_risk_score(model_prob, data, disease)
+        model_prob, disease, field_errors = predict_model_prob(data)
+        with phase("severity"):
+            adj_prob = adjusted_risk_score(model_prob, data, disease)
 
         sim_date = data.get("Simulation Date")
         hospital_unit = data.get("Hospital Unit")
-        staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
+        with phase("staffing"):
+            staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
+
+        result = {
+            "simulation_date": sim_date or "N/A",
+            "hospital_unit": hospital_unit or "N/A",
+            "risk_score": round(adj_prob, 4),
+            "staffing": staffing,
+            "model_version": MODELS.current().version,
+        }
+        if field_errors:
+            result["field_errors"] = field_errors
+        return jsonify(result)
+    except PayloadError as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
+    except Exception as e:
+        print(f"[ERROR] Staffing simulation failed: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(
-            {
-                "simulation_date": sim_date or "N/A",
-                "hospital_unit": hospital_unit or "N/A",
-                "risk_score": round(adj_prob, 4),
-                "staffing": staffing,
-            }
+
+def staffing_forecast_args(args):
+    """Shared query parameters of the forecast endpoints; raises ValueError if invalid."""
+    try:
+        start = pd.Timestamp(args["start"]) if args.get("start") else pd.Timestamp.today()
+        start = start.normalize()
+        horizon = max(1, min(int(args.get("horizon", 14)), 365))
+        history_weeks = max(1, min(int(args.get("history_weeks", 8)), 104))
+        window = max(1, min(int(args.get("window", 30)), 365))
+    except Exception:
+        raise ValueError("Invalid start, horizon, history_weeks or window")
+
+    # Patients predicted up to `window` days before start can still be readmitted.
+    cohort = FOLLOWUP_STORE.pending_cohort(start - pd.Timedelta(days=window))
+    unit = args.get("unit")
+    if unit:
+        cohort = cohort[cohort["unit"].astype(str).str.lower() == unit.strip().lower()]
+    return start, horizon, cohort, {"history_weeks": history_weeks, "window_days": window}
+
+
+@app.route("/api/staffing/forecast", methods=["GET"])
+def api_staffing_forecast():
+    """Day-by-day beds / staff forecast per unit from the pending cohort.
+
+    Query parameters (all optional): start (default today), horizon in
+    days (default 14, max 365), unit, history_weeks (weekday baseline
+    span, default 8) and window (days after prediction a readmission is
+    expected in, default 30).
+    """
+    try:
+        try:
+            start, horizon, cohort, options = staffing_forecast_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        forecast = STAFFING_ENGINE.forecast(start, horizon, cohort, **options)
+        if forecast is None:
+            return jsonify({"error": "No staffing history available"}), 503
+        return jsonify(forecast)
+    except Exception as e:
+        print(f"[ERROR] Staffing forecast failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+SIMULATION_WORKERS = int(os.environ.get("SIMULATION_WORKERS", max(1, min(4, (os.cpu_count() or 1)))))
+_simulation_pool = None
+
+
+def get_simulation_pool():
+    global _simulation_pool
+    if _simulation_pool is None and SIMULATION_WORKERS > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        _simulation_pool = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS)
+    return _simulation_pool
+
+
+@app.route("/api/staffing/simulate", methods=["GET"])
+def api_staffing_simulate():
+    """Monte Carlo staffing demand per unit and day.
+
+    Takes the /api/staffing/forecast parameters plus scenarios (default
+    10000, max 100000), percentiles (comma separated, default
+    50,90,95,99) and seed.
+    """
+    try:
+        args = request.args
+        try:
+            start, horizon, cohort, options = staffing_forecast_args(args)
+            scenarios = max(100, min(int(args.get("scenarios", 10000)), 100000))
+            percentiles = tuple(float(q) for q in args.get("percentiles", "50,90,95,99").split(","))
+            if not all(0 <= q <= 100 for q in percentiles):
+                raise ValueError("percentiles must be between 0 and 100")
+            seed = int(args["seed"]) if args.get("seed") else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        result = STAFFING_ENGINE.simulate(
+            start, horizon, cohort, scenarios=scenarios, percentiles=percentiles,
+            seed=seed, executor=get_simulation_pool(), **options
         )
+        if result is None:
+            return jsonify({"error": "No staffing history available"}), 503
+        return jsonify(result)
     except Exception as e:
         print(f"[ERROR] Staffing simulation failed: {e}")
         return jsonify({"error": str(e)}), 500
@@ -557,164 +1282,26 @@ def api_report():
         if not data:
             return jsonify({"error": "No input data"}), 400
 
-        X, model, disease = build_feature_df(data)
-        model_prob = float(model.predict_proba(X)[0, 1])
-        adj_prob = adjusted_risk_score(model_prob, data, disease)
-        risk = risk_category(adj_prob)
-        followup = followup_plan(adj_prob, disease)
+        model_prob, disease, _ = predict_model_prob(data)
+        with phase("severity"):
+            adj_prob = adjusted_risk_score(model_prob, data, disease)
+            risk = risk_category(adj_prob)
+            followup = followup_plan(adj_prob, disease)
 
         sim_date = data.get("Simulation Date")
         hospital_unit = data.get("Hospital Unit")
-        staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
-
-                # ================== PDF DESIGN START ==================
-                # ================== PDF DESIGN START ==================
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        # --- Header ---
-        c.setFillColorRGB(0, 0.33, 0.64)
-        c.rect(0, height - 60, width, 60, fill=True, stroke=False)
-        c.setFillColor(colors.white)
-        c.setFont("Helvetica-Bold", 20)
-        c.drawString(40, height - 40, "UMKC Hospital Analytics")
-
-        logo_path = os.path.join(BASE_DIR, "umkc_logo.png")
-        if os.path.exists(logo_path):
-            c.drawImage(logo_path, width - 140, height - 55, width=90, height=45, mask='auto')
-
-        y = height - 100
-        c.setFillColor(colors.HexColor("#0056A4"))
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(40, y, "Patient Readmission Risk Report")
-        y -= 20
-
-        # --- Patient & Admission Details ---
-                # --- Patient & Admission Details ---
-        box_top = y
-        box_height = 130
-        c.setFillColor(colors.lightgrey)
-        c.roundRect(35, box_top - box_height, width - 70, box_height, 10, fill=True, stroke=False)
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-
-        # Left column (general info)
-        c.drawString(50, box_top - 15, f"Patient Name: {data.get('Patient Name', 'N/A')}")
-        c.drawString(50, box_top - 30, f"Admission Date: {data.get('Admission Date', 'N/A')}")
-        c.drawString(50, box_top - 45, f"Simulation Date: {data.get('Simulation Date', 'N/A')}")
-        c.drawString(50, box_top - 60, f"Age: {data.get('Age', 'N/A')} | Sex: {data.get('Sex', 'N/A')} | Weight: {data.get('Weight', 'N/A')} kg")
-        c.drawString(50, box_top - 75, f"Blood Pressure: {data.get('Blood Pressure', 'N/A')} | Cholesterol: {data.get('Cholesterol', 'N/A')}")
-        c.drawString(50, box_top - 90, f"Insulin: {data.get('Insulin', 'N/A')} | Diabetics Status: {data.get('Diabetics', 'N/A')}")
-
-        # Right column (hospital + cardiac/diabetes markers)
-        c.drawString(280, box_top - 15, f"Patient ID: {data.get('Patient ID', 'N/A')}")
-        c.drawString(280, box_top - 30, f"Discharge Date: {data.get('Discharge Date', 'N/A')}")
-        c.drawString(280, box_top - 45, f"Hospital / Unit: {data.get('Hospital Unit', 'N/A')}")
-
-        if "heart" in disease.lower():
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(280, box_top - 65, "Cardiac Overview")
-            c.setFont("Helvetica", 9)
-            c.drawString(280, box_top - 80, f"ECG Result: {data.get('ECG Result', 'N/A')}")
-            c.drawString(280, box_top - 95, f"Pulse Rate: {data.get('Pulse Rate (bpm)', 'N/A')} bpm")
-        elif "diabet" in disease.lower():
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(280, box_top - 65, "Key Diabetes Markers")
-            c.setFont("Helvetica", 9)
-            c.drawString(280, box_top - 80, f"Hemoglobin: {data.get('Hemoglobin (g/dL)', 'N/A')}")
-            c.drawString(280, box_top - 95, f"Urine Protein: {data.get('Urine Protein (mg/dL)', 'N/A')}")
-            c.drawString(280, box_top - 110, f"Urine Glucose: {data.get('Urine Glucose (mg/dL)', 'N/A')}")
-
-        y = box_top - box_height - 10  # move below gray box
-
-
-        # --- Risk Summary ---
-        c.setFont("Helvetica-Bold", 13)
-        c.setFillColor(colors.HexColor("#0056A4"))
-        c.drawString(40, y, "Risk Summary")
-        y -= 18
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        c.drawString(50, y, f"Disease Type: {disease}")
-        y -= 15
-        c.drawString(50, y, f"Predicted Readmission: {'Yes' if adj_prob >= 0.5 else 'No'}")
-        y -= 15
-        c.drawString(50, y, f"Readmission Probability: {adj_prob:.4f} ({risk})")
-        y -= 20
-
-        # --- Clinical Visualization ---
-        c.setFont("Helvetica-Bold", 13)
-        c.setFillColor(colors.HexColor("#0056A4"))
-        c.drawString(40, y, "Clinical Visualization")
-        y -= 10
-
-        prob = max(0.0, min(adj_prob, 1.0))
-        d = Drawing(120, 100)
-        pie = Pie()
-        pie.x = 20
-        pie.y = 10
-        pie.width = 100
-        pie.height = 100
-        pie.data = [prob, 1 - prob]
-        pie.labels = [f"Risk {prob:.2f}", f"Safe {1 - prob:.2f}"]
-        pie.slices[0].fillColor = colors.red
-        pie.slices[1].fillColor = colors.green
-        d.add(pie)
-        renderPDF.draw(d, c, 60, y - 110)
-
-        chart_path = generate_signal_chart(disease, data)
-        c.drawImage(ImageReader(chart_path), 250, y - 80, width=250, height=90)
-        y -= 140
-
-        # --- Follow-up Plan ---
-        c.setFont("Helvetica-Bold", 13)
-        c.setFillColor(colors.HexColor("#0056A4"))
-        c.drawString(40, y, "Follow-up & Care Plan")
-        y -= 20
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        c.drawString(50, y, f"Channel: {followup['channel']}")
-        y -= 15
-        c.drawString(50, y, f"Schedule: {', '.join(followup['schedule'])}")
-        y -= 15
-        c.drawString(50, y, f"Note: {followup['note']}")
-        y -= 25
-
-        # --- Staffing Suggestion ---
-        c.setFont("Helvetica-Bold", 13)
-        c.setFillColor(colors.HexColor("#0056A4"))
-        c.drawString(40, y, "Resource Simulation Summary")
-        y -= 20
-        c.setFont("Helvetica", 10)
-        c.setFillColor(colors.black)
-        c.drawString(50, y, f"Expected Readmissions: {staffing['expected_readmissions']}")
-        y -= 15
-        c.drawString(50, y, f"Beds: {staffing['suggested_beds']} | Nurses: {staffing['suggested_nurses']} | Doctors: {staffing['suggested_doctors']}")
-        y -= 50
-
-        # --- Signature Line ---
-        c.setStrokeColor(colors.black)
-        c.line(width/2 - 100, y, width/2 + 100, y)
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawCentredString(width / 2, y - 15, "Physician-in-Charge Signature")
-
-        # --- Footer ---
-        c.setFillColorRGB(0, 0.33, 0.64)
-        c.rect(0, 0, width, 55, fill=True, stroke=False)
-        c.setFillColor(colors.white)
-        c.setFont("Helvetica", 9)
-        c.drawCentredString(width / 2, 30, "© 2025 UMKC Hospital Analytics | AI-Driven Readmission Predictor")
-        c.setFont("Helvetica", 8.5)
-        c.drawCentredString(width / 2, 16, "UMKC Hospital Unit, Kansas City, Missouri, 64111")
-
-        c.showPage()
-        c.save()
-        buffer.seek(0)
-        # ================== PDF DESIGN END ==================
-
-        # ================== PDF DESIGN END ==================
-
+        with phase("staffing"):
+            staffing = staffing_simulator(adj_prob, sim_date=sim_date, hospital_unit=hospital_unit)
+
+        explanation = report_explanations([data])[0]
+        reports = report_module()
+        job = (data, disease, adj_prob, risk, followup, staffing, explanation)
+        with phase("pdf"):
+            if REPORT_OFFLOAD:
+                pdf = get_report_pool().submit(reports.render_report_job, job).result()
+            else:
+                pdf = reports.render_report_pdf(*job)
+        buffer = io.BytesIO(pdf)
 
         return send_file(
             buffer,
@@ -722,20 +1309,374 @@ def api_report():
             download_name="readmission_report.pdf",
             mimetype="application/pdf",
         )
+    except PayloadError as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
     except Exception as e:
         print(f"[ERROR] Report generation failed: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+def encode_cursor(after):
+    raw = json.dumps([after[0], int(after[1])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    date, row_id = json.loads(raw)
+    return str(date), int(row_id)
+
+
+# =========================
+# BULK REPORTS
+# =========================
+# Patients are scored a chunk at a time (score_chunks), pages are
+# rendered in a process pool with at most REPORT_MAX_IN_FLIGHT pages
+# outstanding, and written to the response as they complete, so memory
+# stays flat however large the cohort is.
+
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", max(1, min(4, (os.cpu_count() or 1)))))
+REPORT_MAX_IN_FLIGHT = 2 * REPORT_WORKERS
+# REPORT_OFFLOAD=1 (set by asgi.py) also renders single /api/report PDFs
+# in this pool, keeping ReportLab off the GIL of the serving threads.
+REPORT_OFFLOAD = os.environ.get("REPORT_OFFLOAD", "0") == "1"
+_report_pool = None
+
+
+def get_report_pool():
+    global _report_pool
+    if _report_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _report_pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    return _report_pool
+
+
+def render_reports(jobs):
+    """Render report_pdf argument tuples in the pool; yields PDFs in input order."""
+    from collections import deque
+
+    pool = get_report_pool()
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(report_module().render_report_job, job))
+        if len(pending) >= REPORT_MAX_IN_FLIGHT:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands everything written to it to the caller."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def report_rows(frame):
+    """report_pdf argument tuples for every row of `frame`: the score_frame
+    row plus the patient's explanation, with one explain call per chunk.
+    """
+    for scored in score_chunks(frame):
+        explanations = report_explanations([row[0] for row in scored])
+        for row, explanation in zip(scored, explanations):
+            yield row + (explanation,)
+
+
+def report_zip_name(i, data):
+    """ZIP entry name for the i-th report (from 1): <n>_<Patient ID>.pdf."""
+    pid = "".join(ch for ch in str(data.get("Patient ID", "")) if ch.isalnum() or ch in "-_")
+    return f"{i:05d}_{pid or 'patient'}.pdf"
+
+
+def stream_report_zip(jobs):
+    import zipfile
+    from collections import deque
+
+    # Names of the submitted, not yet written pages; render_reports keeps
+    # input order, so the oldest name belongs to the next PDF.
+    names = deque()
+
+    def named(jobs):
+        for i, job in enumerate(jobs, start=1):
+            names.append(report_zip_name(i, job[0]))
+            yield job
+
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for pdf in render_reports(named(jobs)):
+            zf.writestr(names.popleft(), pdf)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_report_merged(jobs):
+    merger = report_module().PdfMergeStream()
+    yield merger.header()
+    for pdf in render_reports(jobs):
+        yield merger.add(pdf)
+    yield merger.finish()
+
+
+@app.route("/api/report/bulk", methods=["POST"])
+def api_report_bulk():
+    """Reports for a whole cohort, as a ZIP of PDFs (default) or ?format=pdf
+    for a single merged PDF. Accepts the same bodies as /api/predict/batch.
+    """
+    try:
+        fmt = request.args.get("format", "zip").lower()
+        if fmt not in ("zip", "pdf"):
+            return jsonify({"error": "format must be zip or pdf"}), 400
+
+        frame = read_batch_frame(request)
+        if frame is None or frame.empty:
+            return jsonify({"error": "No input data"}), 400
+
+        # The first chunk is scored here, so a bad cohort still gets a 500
+        # instead of a truncated download.
+        rows = report_rows(frame)
+        jobs = itertools.chain([next(rows)], rows)
+
+        if fmt == "pdf":
+            body = stream_report_merged(jobs)
+            mimetype = "application/pdf"
+            filename = "readmission_reports.pdf"
+        else:
+            body = stream_report_zip(jobs)
+            mimetype = "application/zip"
+            filename = "readmission_reports.zip"
+
+        return app.response_class(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+    except Exception as e:
+        print(f"[ERROR] Bulk report generation failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# =========================
+# BACKGROUND JOBS
+# =========================
+# Heavy report and batch work can be submitted as a job instead of being
+# done inside the request, so it is not bound by gunicorn's --timeout.
+# The queue is a SQLite table shared by all workers; each worker process
+# runs JOB_WORKERS threads that pick up queued jobs.
+
+JOB_QUEUE = JobQueue(
+    db_path=os.environ.get("JOBS_DB_PATH", os.path.join(BASE_DIR, "jobs.db")),
+    result_dir=os.environ.get("JOBS_RESULT_DIR", os.path.join(BASE_DIR, "job_results")),
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    ttl_seconds=int(os.environ.get("JOB_RESULT_TTL", 24 * 3600)),
+)
+
+
+def run_predict_batch_job(job):
+    frame = pd.DataFrame(job.load_input())
+    results = predict_batch_results(
+        frame, on_row=lambda i, total: job.progress(i / total, f"Scored {i}/{total}")
+    )
+    return {"count": len(results), "model_version": MODELS.current().version, "results": results}
+
+
+def run_report_job(job):
+    data = job.load_input()
+    job.progress(0.0, "Scoring", force=True)
+    model_prob, disease, _ = predict_model_prob(data)
+    adj_prob = adjusted_risk_score(model_prob, data, disease)
+    followup = followup_plan(adj_prob, disease)
+    staffing = staffing_simulator(
+        adj_prob, sim_date=data.get("Simulation Date"), hospital_unit=data.get("Hospital Unit")
+    )
+    job.progress(0.5, "Rendering", force=True)
+    path = job.result_path(".pdf")
+    with job.keepalive(), open(path, "wb") as f:
+        f.write(report_module().render_report_pdf(
+            data, disease, adj_prob, risk_category(adj_prob), followup, staffing,
+            report_explanations([data])[0],
+        ))
+    job.progress(1.0, "Rendered", force=True)
+    return {"file": path, "mimetype": "application/pdf", "name": "readmission_report.pdf"}
+
+
+def run_report_bulk_job(job):
+    fmt = job.params.get("format", "zip")
+    job.progress(0.0, "Scoring", force=True)
+    frame = pd.DataFrame(job.load_input())
+    total = len(frame)
+
+    def tracked():
+        for i, row in enumerate(report_rows(frame)):
+            job.progress(i / total, f"Rendering {i + 1}/{total}")
+            yield row
+
+    if fmt == "pdf":
+        chunks = stream_report_merged(tracked())
+        path, mimetype, name = job.result_path(".pdf"), "application/pdf", "readmission_reports.pdf"
+    else:
+        chunks = stream_report_zip(tracked())
+        path, mimetype, name = job.result_path(".zip"), "application/zip", "readmission_reports.zip"
+
+    # Scoring and explaining a chunk happen between two progress calls.
+    with job.keepalive(), open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return {"file": path, "mimetype": mimetype, "name": name}
+
+
+def with_pinned_models(handler):
+    """Run a job handler on the model version that is live when it starts."""
+    def run(job):
+        with MODELS.pinned():
+            return handler(job)
+    return run
+
+
+JOB_QUEUE.register("predict_batch", with_pinned_models(run_predict_batch_job))
+JOB_QUEUE.register("report", with_pinned_models(run_report_job))
+JOB_QUEUE.register("report_bulk", with_pinned_models(run_report_bulk_job))
+
+
+@app.before_request
+def start_job_workers():
+    JOB_QUEUE.ensure_workers()
+
+
+@app.route("/api/jobs/<kind>", methods=["POST"])
+def api_submit_job(kind):
+    """Queue a job: predict_batch, report_bulk (?format=zip|pdf) or report."""
+    try:
+        if kind not in JOB_QUEUE.handlers:
+            return jsonify({"error": f"Unknown job kind: {kind}"}), 404
+
+        params = {}
+        if kind == "report":
+            input_data = request.get_json(silent=True)
+            if not isinstance(input_data, dict) or not input_data:
+                return jsonify({"error": "No input data"}), 400
+        else:
+            frame = read_batch_frame(request)
+            if frame is None or frame.empty:
+                return jsonify({"error": "No input data"}), 400
+            input_data = frame_records(frame)
+            if kind == "report_bulk":
+                params["format"] = request.args.get("format", "zip").lower()
+                if params["format"] not in ("zip", "pdf"):
+                    return jsonify({"error": "format must be zip or pdf"}), 400
+
+        job_id = JOB_QUEUE.submit(kind, input_data, params)
+        resp = jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/jobs/{job_id}",
+            "result_url": f"/api/jobs/{job_id}/result",
+        })
+        resp.status_code = 202
+        resp.headers["Location"] = f"/api/jobs/{job_id}"
+        return resp
+    except Exception as e:
+        print(f"[ERROR] Job submission failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    status = JOB_QUEUE.status(job_id)
+    if status is None:
+        return jsonify({"error": f"No job {job_id}"}), 404
+    return jsonify(status)
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def api_job_result(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({"error": f"No job {job_id}"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"error": "Job not finished", "status": job["status"]}), 409
+    if job["status"] != "done" or not job["result_file"] or not os.path.exists(job["result_file"]):
+        return jsonify({"error": "No result", "status": job["status"], "detail": job["error"]}), 410
+    return send_file(
+        job["result_file"],
+        as_attachment=job["result_mimetype"] != "application/json",
+        download_name=job["result_name"],
+        mimetype=job["result_mimetype"],
+    )
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def api_cancel_job(job_id):
+    status = JOB_QUEUE.status(job_id)
+    if status is None:
+        return jsonify({"error": f"No job {job_id}"}), 404
+    if not JOB_QUEUE.cancel(job_id):
+        return jsonify({"error": f"Job already {status['status']}"}), 409
+    return jsonify(JOB_QUEUE.status(job_id))
+
+
 @app.route("/api/followups", methods=["GET"])
 def api_get_followups():
+    """Pending follow-ups, newest first.
+
+    Query parameters (all optional): unit, risk, problem_type, from, to
+    (Prediction Date range, default the last 6 months), limit and cursor.
+    The body stays a JSON array; when more rows remain, the next page's
+    cursor is returned in the X-Next-Cursor header. Responses carry an
+    ETag so unchanged polls are answered with 304 from the store version
+    alone.
+    """
     try:
-        df = pd.read_csv(FOLLOWUP_PATH)
-        df["Prediction Date"] = pd.to_datetime(df["Prediction Date"], errors="coerce")
-        cutoff = pd.Timestamp.today() - pd.DateOffset(months=6)
-        df_recent = df[(df["Prediction Date"] >= cutoff) & (df["Status"] != "Completed")]
-        records = df_recent.sort_values("Prediction Date", ascending=False).to_dict(orient="records")
-        return jsonify(records)
+        args = request.args
+        try:
+            today = pd.Timestamp.today().normalize()
+            since = pd.Timestamp(args["from"]) if args.get("from") else today - pd.DateOffset(months=6)
+            until = pd.Timestamp(args["to"]) if args.get("to") else None
+            limit = int(args["limit"]) if args.get("limit") else None
+            after = decode_cursor(args["cursor"]) if args.get("cursor") else None
+        except Exception:
+            return jsonify({"error": "Invalid from, to, limit or cursor"}), 400
+        if limit is not None:
+            limit = max(1, min(limit, 1000))
+
+        filters = {
+            "unit": args.get("unit"),
+            "risk_label": args.get("risk"),
+            "problem_type": args.get("problem_type"),
+        }
+
+        key = json.dumps(
+            [FOLLOWUP_STORE.version(), str(since.date()), str(until.date()) if until is not None else None,
+             filters, limit, args.get("cursor")],
+            sort_keys=True,
+        )
+        etag = hashlib.sha1(key.encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            resp = app.response_class(status=304)
+            resp.set_etag(etag)
+            return resp
+
+        with phase("storage"):
+            records, next_after = FOLLOWUP_STORE.query_pending(
+                since, until=until, after=after, limit=limit, **filters
+            )
+        resp = jsonify(records)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        if next_after is not None:
+            resp.headers["X-Next-Cursor"] = encode_cursor(next_after)
+        return resp
     except Exception as e:
         print(f"[ERROR] Could not fetch follow-ups: {e}")
         return jsonify({"error": str(e)}), 500
@@ -750,13 +1691,11 @@ def api_complete_followup():
         if not pid:
             return jsonify({"error": "Patient ID required"}), 400
 
-        df = pd.read_csv(FOLLOWUP_PATH)
-        mask = df["Patient ID"].astype(str) == str(pid)
-        if not mask.any():
+        with phase("storage"):
+            completed = FOLLOWUP_STORE.complete(pid)
+        if not completed:
             return jsonify({"error": f"No record found for Patient ID {pid}"}), 404
 
-        df.loc[mask, "Status"] = "Completed"
-        df.to_csv(FOLLOWUP_PATH, index=False)
         print(f"[INFO] Marked {pid} as Completed")
 
         return jsonify({"message": f"Patient {pid} marked as completed"})
@@ -764,6 +1703,57 @@ def api_complete_followup():
         print(f"[ERROR] Complete follow-up failed: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/cache/stats", methods=["GET"])
+def api_cache_stats():
+    """Counters of this worker process only. The signal chart cache is null
+    until this process has imported report_pdf, and never includes reports
+    rendered in the report process pool.
+    """
+    reports = sys.modules.get("report_pdf")
+    return jsonify({
+        "scope": "process",
+        "pid": os.getpid(),
+        "signal_chart": reports.signal_chart_cache_stats() if reports is not None else None,
+        "prediction": PREDICTION_CACHE.stats(),
+        "explanation": EXPLANATION_CACHE.stats(),
+    })
+
+
+@app.route("/api/models", methods=["GET"])
+def api_models():
+    """Registered models, whether (and in which process) they are loaded, and startup phase timings."""
+    info = MODELS.info()
+    info["serving_tiers"] = MODELS.get("serving_tiers")
+    return jsonify(info)
+
+
+@app.route("/api/models/activate", methods=["POST"])
+def api_models_activate():
+    """Warm and switch to a model version, then point CURRENT at it for the other workers.
+
+    Requires the X-Admin-Token header to match MODEL_ADMIN_TOKEN; disabled
+    when that is not set.
+    """
+    token = os.environ.get("MODEL_ADMIN_TOKEN")
+    if not token:
+        return jsonify({"error": "Model activation is disabled (MODEL_ADMIN_TOKEN not set)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        return jsonify({"error": "Invalid admin token"}), 403
+
+    version = (request.get_json(silent=True) or {}).get("version")
+    if not version:
+        return jsonify({"error": "version is required"}), 400
+    if version not in MODELS.versions():
+        return jsonify({"error": f"Unknown model version: {version}"}), 404
+    try:
+        MODELS.activate(version)
+        MODELS.write_pointer(version)
+        MODELS.pin()
+        return jsonify(MODELS.info())
+    except Exception as e:
+        print(f"[ERROR] Model activation failed: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=False, use_reloader=False)
 
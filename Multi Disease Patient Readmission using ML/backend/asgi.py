@@ -0,0 +1,275 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================
+# ASGI SERVING MODE
+# =========================
+# Serves the Flask app from an ASGI server instead of gunicorn sync
+# workers:
+#
+#     uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+#     GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+#
+# Each request runs on the thread pool of its lane, so report rendering
+# can only ever occupy the report lane's threads and /api/predict keeps
+# its own. A lane admits at most threads + queue requests; beyond that
+# it answers 429 with a Retry-After estimated from the lane's recent
+# service time, without touching Flask. In this mode /api/report renders
+# the PDF in app.py's report process pool (REPORT_OFFLOAD), so ReportLab
+# and matplotlib do not hold the GIL the predict threads need.
+#
+# Lane sizes per process (threads / queue):
+#     api      ASGI_API_THREADS (8)     ASGI_API_QUEUE (64)      everything else
+#     report   ASGI_REPORT_THREADS (2)  ASGI_REPORT_QUEUE (4)    /api/report, /api/report/bulk
+#     batch    ASGI_BATCH_THREADS (2)   ASGI_BATCH_QUEUE (4)     /api/predict/batch, /api/staffing/simulate,
+#                                                                /api/explain
+
+os.environ.setdefault("REPORT_OFFLOAD", "1")
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+class Lane:
+    """A bounded thread pool plus an admission limit for a group of routes."""
+
+    def __init__(self, name, threads, queue):
+        self.name = name
+        self.threads = max(1, threads)
+        self.limit = self.threads + max(0, queue)
+        self.pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix=f"asgi-{name}")
+        self.in_flight = 0
+        self.service_seconds = 0.0  # moving average of completed requests
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            if self.service_seconds == 0.0:
+                self.service_seconds = seconds
+            else:
+                self.service_seconds += 0.2 * (seconds - self.service_seconds)
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free (1..60)."""
+        waves = (self.in_flight - self.threads + 1) / self.threads
+        return max(1, min(60, math.ceil(self.service_seconds * max(waves, 1.0))))
+
+
+def default_lanes():
+    return {
+        "api": Lane("api", _env_int("ASGI_API_THREADS", 8), _env_int("ASGI_API_QUEUE", 64)),
+        "report": Lane("report", _env_int("ASGI_REPORT_THREADS", 2), _env_int("ASGI_REPORT_QUEUE", 4)),
+        "batch": Lane("batch", _env_int("ASGI_BATCH_THREADS", 2), _env_int("ASGI_BATCH_QUEUE", 4)),
+    }
+
+
+ROUTE_LANES = {
+    "/api/report": "report",
+    "/api/report/bulk": "report",
+    "/api/predict/batch": "batch",
+    "/api/staffing/simulate": "batch",
+    "/api/explain": "batch",
+}
+
+
+class WsgiLanes:
+    """ASGI application running a WSGI app on per-lane thread pools.
+
+    on_reject(lane, route) is called for every 429; route is the key of
+    `routes` the path matched, or "other" for default-lane paths.
+    """
+
+    def __init__(self, wsgi_app, lanes, routes=None, default_lane="api", on_reject=None):
+        self.wsgi_app = wsgi_app
+        self.lanes = lanes
+        self.routes = ROUTE_LANES if routes is None else routes
+        self.default_lane = default_lane
+        self.on_reject = on_reject
+
+    def route_for(self, path):
+        """Key of self.routes that `path` matches, or "other"."""
+        path = path.rstrip("/") or "/"
+        return path if path in self.routes else "other"
+
+    def lane_for(self, path):
+        return self.lanes[self.routes.get(self.route_for(path), self.default_lane)]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for lane in self.lanes.values():
+                    lane.pool.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        lane = self.lane_for(scope["path"])
+        if not lane.try_acquire():
+            if self.on_reject is not None:
+                self.on_reject(lane, self.route_for(scope["path"]))
+            await self._reject(lane, scope, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            body = bytearray()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    break
+
+            loop = asyncio.get_running_loop()
+
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            environ = build_environ(scope, bytes(body))
+            await loop.run_in_executor(lane.pool, run_wsgi, self.wsgi_app, environ, send_sync)
+        finally:
+            lane.release(time.perf_counter() - started)
+
+    async def _reject(self, lane, scope, send):
+        body = json.dumps({
+            "error": f"Too many concurrent requests for {scope['path']}; retry later",
+            "lane": lane.name,
+        }).encode()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(lane.retry_after()).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+
+# =========================
+# WSGI BRIDGE
+# =========================
+
+def build_environ(scope, body):
+    """PEP 3333 environ for an ASGI http scope and its full request body."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_LENGTH":
+            continue
+        key = name if name == "CONTENT_TYPE" else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ, send_sync, chunk_size=64 * 1024):
+    """Call the WSGI app on this thread and forward its response.
+
+    The whole response, including a streamed body, is produced on one
+    thread so Flask's request context stays valid. Small chunks are
+    coalesced to keep event-loop round trips down.
+    """
+    state = {}
+
+    def start_response(status, headers, exc_info=None):
+        state["status"] = int(status.split(" ", 1)[0])
+        state["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    def start():
+        if not state.get("started"):
+            state["started"] = True
+            send_sync({"type": "http.response.start", "status": state["status"], "headers": state["headers"]})
+
+    try:
+        result = wsgi_app(environ, start_response)
+    except Exception as e:
+        print(f"[ERROR] Unhandled error in {environ['PATH_INFO']}: {e}")
+        body = json.dumps({"error": str(e)}).encode()
+        send_sync({"type": "http.response.start", "status": 500,
+                   "headers": [(b"content-type", b"application/json")]})
+        send_sync({"type": "http.response.body", "body": body})
+        return
+
+    try:
+        pending = []
+        size = 0
+        for chunk in result:
+            if not chunk:
+                continue
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                start()
+                send_sync({"type": "http.response.body", "body": b"".join(pending), "more_body": True})
+                pending, size = [], 0
+        start()
+        send_sync({"type": "http.response.body", "body": b"".join(pending)})
+    finally:
+        close = getattr(result, "close", None)
+        if close is not None:
+            close()
+
+
+# =========================
+# APPLICATION
+# =========================
+
+def _record_rejection(lane, route):
+    # Labelled by route table key, not the raw path, so the series stay bounded.
+    flask_module = sys.modules.get("app")
+    if flask_module is not None and flask_module.METRICS.enabled:
+        flask_module.METRICS.inc("readmission_rejected_requests_total",
+                                 (("lane", lane.name), ("route", route)))
+
+
+def create_app(lanes=None, routes=None):
+    from app import app as flask_app
+
+    return WsgiLanes(flask_app, lanes or default_lanes(), routes, on_reject=_record_rejection)
+
+
+app = create_app()
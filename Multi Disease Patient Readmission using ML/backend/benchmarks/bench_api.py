@@ -0,0 +1,324 @@
+"""End-to-end latency and throughput of the API routes.
+
+Replays synthetic patients (rows sampled from final_dataset_realistic.csv)
+against /api/predict, /api/simulate_staffing, /api/report, /api/followups
+and /api/followup/complete. For each route it reports throughput,
+p50/p95/p99 latency and the mean time per phase from the app's
+Server-Timing header (feature, model, severity, staffing, explain, pdf,
+chart, storage; "other" is the rest of the server time: routing, JSON,
+the response).
+
+Targets:
+  (default)    the app in-process through the Flask test client
+  --gunicorn   a local gunicorn started with gunicorn.conf.py (--workers)
+  --url URL    a server that is already running; start it with
+               SERVER_TIMING=1 for the phase breakdown. Note that it
+               writes follow-ups into that server's store.
+
+The first two use a temporary follow-up database. Results are saved as
+JSON (default benchmarks/results/<commit>.json). --compare BASELINE.json
+prints the change against an earlier run and exits with 1 when a route's
+p50 or p95 latency grew, or its throughput fell, by more than
+--threshold.
+
+    cd backend && python benchmarks/bench_api.py [--requests 200] [--concurrency 4]
+    cd backend && python benchmarks/bench_api.py --gunicorn --workers 4 --compare results/abc1234.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import request_timing  # noqa: E402
+from request_timing import parse_header  # noqa: E402
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+PHASES = ["feature", "model", "severity", "staffing", "explain", "pdf", "chart", "storage"]
+PAYLOAD_COLUMNS = [
+    "Problem Type", "Age", "Sex", "Weight", "Blood Pressure", "Cholesterol", "Insulin", "Platelets",
+    "Diabetics", "air_quality_index", "social_event_count", "Hemoglobin (g/dL)", "WBC Count (10^9/L)",
+    "Platelet Count (10^9/L)", "Urine Protein (mg/dL)", "Urine Glucose (mg/dL)", "ECG Result",
+    "Pulse Rate (bpm)", "Patient Name", "Admission Date",
+]
+
+
+def synthetic_patients(n, seed):
+    """n JSON payloads drawn from the dataset, each with its own Patient ID."""
+    df = pd.read_csv(os.path.join(BACKEND_DIR, "final_dataset_realistic.csv"), usecols=PAYLOAD_COLUMNS)
+    rng = np.random.default_rng(seed)
+    rows = df.iloc[rng.integers(0, len(df), size=n)].reset_index(drop=True)
+    rows["Simulation Date"] = rows.pop("Admission Date").str[:10]
+    rows["Patient ID"] = [f"BENCH-{seed}-{i}" for i in range(n)]
+    return json.loads(rows.to_json(orient="records"))
+
+
+# =========================
+# TARGETS
+# =========================
+
+class TestClientTarget:
+    """The app in this process, one Flask test client per thread."""
+
+    def __init__(self, followup_db):
+        request_timing.ENABLED = True
+        os.environ["FOLLOWUP_DB_PATH"] = followup_db
+        os.chdir(BACKEND_DIR)
+        import app
+
+        self.app = app.app
+        self.local = threading.local()
+        self.description = "flask test client"
+
+    def request(self, method, path, body=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        t0 = time.perf_counter()
+        resp = client.open(path, method=method, json=body)
+        resp.get_data()
+        return resp.status_code, resp.headers.get("Server-Timing"), time.perf_counter() - t0
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    def __init__(self, base_url, description=None, process=None):
+        self.base_url = base_url.rstrip("/")
+        self.description = description or base_url
+        self.process = process
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"} if data else {})
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                resp.read()
+                status, timing = resp.status, resp.headers.get("Server-Timing")
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, timing = e.code, e.headers.get("Server-Timing")
+        return status, timing, time.perf_counter() - t0
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+
+
+def start_gunicorn(workers, followup_db):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, SERVER_TIMING="1", FOLLOWUP_DB_PATH=followup_db,
+               GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(workers))
+    try:
+        process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                                   cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+    except OSError as e:
+        raise SystemExit(f"[ERROR] Could not start gunicorn: {e}")
+    target = HttpTarget(f"http://127.0.0.1:{port}", f"gunicorn, {workers} workers", process)
+
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("[ERROR] gunicorn exited during startup (is it installed? pip install gunicorn)")
+        try:
+            if target.request("GET", "/api/models")[0] == 200:
+                return target
+        except OSError:
+            pass
+        time.sleep(0.5)
+    target.close()
+    raise SystemExit("[ERROR] gunicorn did not become ready within 120s")
+
+
+# =========================
+# RUN & REPORT
+# =========================
+
+def route_plan(args):
+    """(name, method, [(path, body), ...]) in run order; complete follows predict."""
+    predict = synthetic_patients(args.requests, seed=1)
+    problem_types = [None, "Diabetes", "Heart Disease"]
+    risks = [None, "High", "Medium", "Low"]
+    followup_paths = []
+    for i in range(args.requests):
+        query = {"limit": 100}
+        if problem_types[i % 3]:
+            query["problem_type"] = problem_types[i % 3]
+        if risks[(i // 3) % 4]:
+            query["risk"] = risks[(i // 3) % 4]
+        followup_paths.append("/api/followups?" + urllib.parse.urlencode(query))
+    return [
+        ("predict", "POST", [("/api/predict", p) for p in predict]),
+        ("simulate_staffing", "POST",
+         [("/api/simulate_staffing", p) for p in synthetic_patients(args.requests, seed=2)]),
+        ("report", "POST", [("/api/report", p) for p in synthetic_patients(args.report_requests, seed=3)]),
+        ("followups", "GET", [(path, None) for path in followup_paths]),
+        ("followup_complete", "POST",
+         [("/api/followup/complete", {"Patient ID": p["Patient ID"]}) for p in predict]),
+    ]
+
+
+def run_route(target, method, calls, concurrency):
+    def one(call):
+        path, body = call
+        return target.request(method, path, body)
+
+    t0 = time.perf_counter()
+    if concurrency <= 1:
+        results = [one(call) for call in calls]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, calls))
+    wall = time.perf_counter() - t0
+
+    latency_ms = np.array([r[2] for r in results]) * 1000
+    timings = [parse_header(r[1]) for r in results if r[0] < 400 and r[1]]
+    phases = {}
+    if timings:
+        for name in PHASES:
+            phases[name] = float(np.mean([t.get(name, 0.0) for t in timings]))
+        server = float(np.mean([t.get("total", 0.0) for t in timings]))
+        phases["other"] = max(0.0, server - sum(phases.values()))
+        phases = {name: round(ms, 4) for name, ms in phases.items() if ms > 0}
+    return {
+        "requests": len(results),
+        "errors": int(sum(r[0] >= 400 for r in results)),
+        "throughput_rps": round(len(results) / wall, 2),
+        "latency_ms": {
+            "mean": round(float(latency_ms.mean()), 4),
+            "p50": round(float(np.percentile(latency_ms, 50)), 4),
+            "p95": round(float(np.percentile(latency_ms, 95)), 4),
+            "p99": round(float(np.percentile(latency_ms, 99)), 4),
+        },
+        "server_phases_ms": phases,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_results(results):
+    print(f"\n{'route':<18} {'n':>5} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  "
+          f"server phases (mean ms)")
+    for name, r in results["routes"].items():
+        lat = r["latency_ms"]
+        phases = "  ".join(f"{k} {v:.2f}" for k, v in r["server_phases_ms"].items())
+        print(f"{name:<18} {r['requests']:>5} {r['errors']:>4} {r['throughput_rps']:>8.1f} "
+              f"{lat['p50']:>8.2f} {lat['p95']:>8.2f} {lat['p99']:>8.2f}  {phases}")
+
+
+def compare(results, baseline, threshold):
+    """Print changes against `baseline`; returns the regressed routes."""
+    print(f"\nvs {baseline.get('commit')} ({baseline.get('timestamp')}), threshold {threshold:.0%}:")
+    for key in ("target", "concurrency", "machine"):
+        if baseline.get(key) != results.get(key):
+            print(f"[WARN] Baseline {key} differs: {baseline.get(key)!r} vs {results.get(key)!r}")
+    regressions = []
+    for name, r in results["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base:
+            continue
+        changes, worse = [], False
+        for pct in ("p50", "p95"):
+            ratio = r["latency_ms"][pct] / max(base["latency_ms"][pct], 1e-9)
+            changes.append(f"{pct} {ratio - 1:+.1%}")
+            worse |= ratio > 1 + threshold
+        ratio = r["throughput_rps"] / max(base["throughput_rps"], 1e-9)
+        changes.append(f"req/s {ratio - 1:+.1%}")
+        worse |= ratio < 1 / (1 + threshold)
+        print(f"  {name:<18} {'  '.join(changes)}{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--report-requests", type=int, default=50, help="requests to /api/report")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per route first")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads")
+    parser.add_argument("--gunicorn", action="store_true", help="start a local gunicorn")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--output", help="results JSON (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-api-")
+    followup_db = os.path.join(workdir, "followups.db")
+    if args.url:
+        target = HttpTarget(args.url)
+    elif args.gunicorn:
+        target = start_gunicorn(args.workers, followup_db)
+    else:
+        target = TestClientTarget(followup_db)
+
+    commit, dirty = git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": target.description,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()}, {os.cpu_count()} CPUs",
+        "routes": {},
+    }
+    try:
+        for name, method, calls in route_plan(args):
+            if name != "followup_complete":
+                for path, body in calls[:args.warmup]:
+                    target.request(method, path, body)
+            results["routes"][name] = run_route(target, method, calls, args.concurrency)
+    finally:
+        target.close()
+
+    print_results(results)
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'results'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n[INFO] Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            if compare(results, json.load(f), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
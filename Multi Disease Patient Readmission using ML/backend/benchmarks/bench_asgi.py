@@ -0,0 +1,140 @@
+"""/api/predict latency while /api/report is under load, sync-style vs ASGI lanes.
+
+Drives asgi.py in-process (no server or sockets) in two layouts:
+
+  shared   one pool of --workers threads for every route and PDFs rendered
+           in the request thread: what gunicorn --workers N sync workers
+           do, where every busy report holds a worker
+  lanes    asgi.default_lanes() with reports rendered in the report
+           process pool (REPORT_OFFLOAD), i.e. `uvicorn asgi:app`
+
+For each layout, --predict-clients closed-loop clients call /api/predict
+for --seconds, first alone and then while --report-clients clients post
+/api/report back to back (a client that gets a 429 waits Retry-After).
+Prints predict p50/p95/p99, reports completed and 429s.
+
+    cd backend && python benchmarks/bench_asgi.py [--seconds 10] [--report-clients 8]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("FOLLOWUP_DB_PATH", os.path.join(tempfile.mkdtemp(), "followups.db"))
+os.environ.setdefault("METRICS", "0")
+
+import asgi  # noqa: E402
+import app as flask_module  # noqa: E402
+from bench_api import synthetic_patients  # noqa: E402
+
+
+async def call(asgi_app, method, path, body=None):
+    """(status, headers, seconds) for one request through the ASGI app."""
+    data = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "server": ("bench", 80), "client": ("127.0.0.1", 0),
+    }
+    sent = False
+    response = {"status": None, "headers": {}}
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": data, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif not message.get("more_body"):
+            done.set()
+
+    t0 = time.perf_counter()
+    await asgi_app(scope, receive, send)
+    return response["status"], response["headers"], time.perf_counter() - t0
+
+
+async def predict_client(asgi_app, patients, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        status, _, seconds = await call(asgi_app, "POST", "/api/predict", patients[i % len(patients)])
+        if status == 200:
+            latencies.append(seconds)
+        i += 1
+
+
+async def report_client(asgi_app, patients, stop, counts):
+    i = 0
+    while not stop.is_set():
+        status, headers, _ = await call(asgi_app, "POST", "/api/report", patients[i % len(patients)])
+        i += 1
+        if status == 429:
+            counts["rejected"] += 1
+            await asyncio.sleep(float(headers.get("retry-after", 1)))
+        elif status == 200:
+            counts["done"] += 1
+
+
+async def scenario(asgi_app, patients, seconds, predict_clients, report_clients):
+    stop = asyncio.Event()
+    latencies, counts = [], {"done": 0, "rejected": 0}
+    tasks = [asyncio.create_task(predict_client(asgi_app, patients, stop, latencies))
+             for _ in range(predict_clients)]
+    tasks += [asyncio.create_task(report_client(asgi_app, patients, stop, counts))
+              for _ in range(report_clients)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    ms = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        "predicts": len(latencies), "p50": np.percentile(ms, 50), "p95": np.percentile(ms, 95),
+        "p99": np.percentile(ms, 99), "reports": counts["done"], "rejected": counts["rejected"],
+    }
+
+
+async def run(args):
+    patients = synthetic_patients(256, seed=3)
+    layouts = {
+        "shared": (asgi.WsgiLanes(flask_module.app, {"api": asgi.Lane("api", args.workers, 10000)}, routes={}),
+                   False),
+        "lanes": (asgi.WsgiLanes(flask_module.app, asgi.default_lanes()), True),
+    }
+    print(f"{'layout':<8} {'report load':<12} {'predicts':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'reports':>8} {'429s':>6}")
+    for name, (asgi_app, offload) in layouts.items():
+        flask_module.REPORT_OFFLOAD = offload
+        await call(asgi_app, "POST", "/api/report", patients[0])  # warm up PDF imports / pool
+        for report_clients in (0, args.report_clients):
+            r = await scenario(asgi_app, patients, args.seconds, args.predict_clients, report_clients)
+            print(f"{name:<8} {report_clients:<12} {r['predicts']:>9} {r['p50']:>8.2f} {r['p95']:>8.2f} "
+                  f"{r['p99']:>8.2f} {r['reports']:>8} {r['rejected']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each scenario")
+    parser.add_argument("--workers", type=int, default=4, help="threads in the shared layout")
+    parser.add_argument("--predict-clients", type=int, default=2)
+    parser.add_argument("--report-clients", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
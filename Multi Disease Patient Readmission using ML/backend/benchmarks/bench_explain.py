@@ -0,0 +1,122 @@
+"""Per-patient explanations: additivity, explain latency and predict latency.
+
+First checks, on every row of final_dataset_realistic.csv, that each
+explanation adds up: base value + contributions equals the model's
+output for the row (the predict path's probability, or its log-odds for
+log-odds explainers).
+
+Then times, with the explanation cache off, explain_patients() for one
+patient and per patient in batches of --batch, a cache hit, and
+/api/predict through the Flask test client before the explainers are
+built, after, and while a thread keeps explaining batches (a busy
+/api/explain on the same process).
+
+    cd backend && python benchmarks/bench_explain.py [--requests 500] [--batch 64]
+"""
+import os
+import sys
+import time
+import timeit
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("FOLLOWUP_DB_PATH", os.path.join(tempfile.mkdtemp(), "followups.db"))
+os.environ.setdefault("METRICS", "0")
+
+import app  # noqa: E402
+from bench_api import synthetic_patients  # noqa: E402
+
+
+def check_additivity():
+    df = pd.read_csv(app.DATASET_PATH)
+    is_diab = app.batch_disease_mask(df)
+    for disease, mask in (("Diabetes", is_diab), ("Heart Disease", ~is_diab)):
+        X, model, features = app.build_feature_matrix(df[mask], disease)
+        explainer = app.MODELS.get(f"explainer:{disease}")
+        if explainer is None:
+            raise SystemExit(f"[ERROR] No explainer for {disease}")
+        phi, base = explainer.explain(X)
+        total = base + phi.sum(axis=1)
+        prob = app.predict_matrix(X, model, features, disease)
+        expected = prob if explainer.output == "probability" else np.log(prob / (1.0 - prob))
+        diff = float(np.max(np.abs(total - expected)))
+        if diff > 1e-5:
+            raise SystemExit(f"[ERROR] {disease}: base + contributions is off by up to {diff:.3g}")
+        print(f"[INFO] {disease}: {len(X)} rows add up to the model output "
+              f"(max diff {diff:.2g}, {explainer.method}, {explainer.output})")
+
+
+def per_call_ms(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def predict_latencies(client, patients, n):
+    latencies = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        client.post("/api/predict", json=patients[i % len(patients)])
+        latencies.append(time.perf_counter() - t0)
+    ms = np.array(latencies) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="/api/predict calls per scenario")
+    parser.add_argument("--batch", type=int, default=64, help="patients per batched explanation")
+    args = parser.parse_args()
+
+    patients = synthetic_patients(max(256, args.batch), seed=5)
+    client = app.app.test_client()
+    app.PREDICTION_CACHE.maxsize = 0  # time the model, not the prediction cache
+    predict_latencies(client, patients, 200)  # compiled scorers, imports
+    cold = predict_latencies(client, patients, args.requests)
+
+    check_additivity()
+    built = predict_latencies(client, patients, args.requests)
+
+    cache = app.EXPLANATION_CACHE
+    cache.maxsize = 0
+    batch = patients[:args.batch]
+    one = per_call_ms(lambda: app.explain_patients(patients[:1]), 50)
+    batched = per_call_ms(lambda: app.explain_patients(batch), 5) / len(batch)
+    cache.maxsize = 4096
+    app.explain_patients(patients[:1])
+    hit = per_call_ms(lambda: app.explain_patients(patients[:1]), 200)
+
+    print(f"\n{'explain_patients':<28} {'ms/patient':>10}")
+    print(f"{'single, uncached':<28} {one:>10.3f}")
+    print(f"{f'batch of {len(batch)}, uncached':<28} {batched:>10.3f}")
+    print(f"{'single, cache hit':<28} {hit:>10.3f}")
+
+    stop = threading.Event()
+
+    def explain_load():
+        cache.maxsize = 0
+        while not stop.is_set():
+            app.explain_patients(batch)
+
+    worker = threading.Thread(target=explain_load)
+    worker.start()
+    try:
+        busy = predict_latencies(client, patients, args.requests)
+    finally:
+        stop.set()
+        worker.join()
+
+    print(f"\n{'/api/predict':<28} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, (p50, p95) in (("explainers not built", cold), ("explainers built", built),
+                              ("explain batches running", busy)):
+        print(f"{label:<28} {p50:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Per-worker memory with pickled vs memory-mapped models.
+
+Runs bench_startup's per-worker mode (every worker loads its own models,
+as gunicorn does without --preload) twice: with MODEL_MMAP=0, where each
+worker unpickles the sklearn forest and compiles it, and with
+MODEL_MMAP=1, where workers map the compiled .fast.joblib node tables
+from the page cache. The first run with MODEL_MMAP=1 writes the
+artifacts, so it is done once before measuring.
+
+    cd backend && python benchmarks/bench_model_memory.py [--workers 4]
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_startup import HEADER, format_row, measure  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    measure("per-worker", 1, {"MODEL_MMAP": "1"})  # build the .fast.joblib artifacts
+
+    print(HEADER)
+    for mode in ("per-worker", "preload"):
+        for mmap in ("0", "1"):
+            label = f"{mode} mmap={mmap}"
+            print(format_row(label, measure(mode, args.workers, {"MODEL_MMAP": mmap})))
+
+
+if __name__ == "__main__":
+    main()
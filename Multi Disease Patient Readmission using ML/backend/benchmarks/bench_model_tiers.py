@@ -0,0 +1,131 @@
+"""Heavy vs compact serving tier: latency, memory and ROC-AUC side by side.
+
+Loads both tiers of a model version (a train.py output directory or a
+MODEL_DIR version), scores the held-out split train.py tested them on,
+and times each the way app.py serves it: through the compiled fast
+scorer when fast_scorer can reproduce the model, else predict_proba.
+
+    cd backend && python benchmarks/bench_model_tiers.py [--models training_output] [--tolerance 0.01]
+
+Memory is the Python heap allocated while unpickling (tracemalloc,
+which includes NumPy buffers) and the size of the file on disk. The
+last column is the tier app.py would serve with MODEL_TIER=auto and
+the given tolerance, from the AUCs in training_summary.json.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import app  # noqa: E402
+import train  # noqa: E402
+from fast_scorer import compile_model  # noqa: E402
+from model_registry import first_existing, load_model_file  # noqa: E402
+from sklearn.metrics import roc_auc_score  # noqa: E402
+
+
+def load_measured(path):
+    tracemalloc.start()
+    model = load_model_file([path])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, peak
+
+
+def latencies(score, X, calls):
+    """Per-call seconds of score() on single rows, cycling through X."""
+    times = np.empty(calls)
+    for i in range(calls):
+        row = X[i % len(X)][None, :]
+        t0 = time.perf_counter()
+        score(row)
+        times[i] = time.perf_counter() - t0
+    return times
+
+
+def measure_tier(path, features, X_test, y_test, calls):
+    model, heap = load_measured(path)
+    scorer = compile_model(model, features, X_test[:256])
+    if scorer is not None:
+        score, path_used = scorer.predict_proba1, "fast"
+    else:
+        def score(X):
+            return model.predict_proba(pd.DataFrame(X, columns=features))[:, 1]
+        path_used = "predict_proba"
+
+    t = latencies(score, X_test, calls)
+    t0 = time.perf_counter()
+    probs = score(X_test)
+    batch_s = time.perf_counter() - t0
+    return {
+        "model": type(model.steps[-1][1] if hasattr(model, "steps") else model).__name__,
+        "path": path_used,
+        "auc": roc_auc_score(y_test, probs),
+        "p50_us": np.percentile(t, 50) * 1e6,
+        "p99_us": np.percentile(t, 99) * 1e6,
+        "rows_s": len(X_test) / batch_s,
+        "heap_mb": heap / 2**20,
+        "file_mb": os.path.getsize(path) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", default=os.path.join(BACKEND_DIR, "training_output"),
+                        help="directory with both tiers and training_summary.json")
+    parser.add_argument("--data", default=app.DATASET_PATH)
+    parser.add_argument("--calls", type=int, default=2000, help="single-row calls timed per tier")
+    parser.add_argument("--tolerance", type=float, default=app.COMPACT_AUC_TOLERANCE)
+    args = parser.parse_args()
+
+    try:
+        with open(os.path.join(args.models, train.SUMMARY_FILE), "r", encoding="utf-8") as f:
+            summary = json.load(f).get("diseases", {})
+    except (OSError, ValueError):
+        summary = {}
+
+    df, y = train.read_labeled(args.data)
+    data = train.encode_by_disease(df, y)
+
+    print(f"\n{'disease':<14} {'tier':<8} {'model':<32} {'path':<14} {'test AUC':>8} "
+          f"{'p50 us':>8} {'p99 us':>8} {'rows/s':>10} {'heap MB':>8} {'file MB':>8}")
+    for key, (X, y_d) in data.items():
+        _, X_test, _, y_test = train.holdout_split(X, y_d)
+        features = list(X.columns)
+        X_test = X_test.to_numpy(dtype="float64")
+        paths = {
+            "heavy": first_existing([os.path.join(args.models, f) for f in app.MODEL_FILES[key]]),
+            "compact": first_existing([os.path.join(args.models, app.COMPACT_MODEL_FILES[key])]),
+        }
+        results = {}
+        for tier, path in paths.items():
+            if path is None:
+                print(f"{key:<14} {tier:<8} (no model file in {args.models})")
+                continue
+            r = results[tier] = measure_tier(path, features, X_test, y_test, args.calls)
+            print(f"{key:<14} {tier:<8} {r['model']:<32} {r['path']:<14} {r['auc']:>8.4f} "
+                  f"{r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['rows_s']:>10.0f} "
+                  f"{r['heap_mb']:>8.2f} {r['file_mb']:>8.2f}")
+
+        info = summary.get(key, {})
+        heavy_auc = info.get("models", {}).get(info.get("saved_model"), {}).get("metrics_test", {}).get("roc_auc")
+        compact_auc = info.get("compact", {}).get("metrics_test", {}).get("roc_auc")
+        if len(results) == 2:
+            h, c = results["heavy"], results["compact"]
+            serve = ("compact" if heavy_auc is not None and compact_auc is not None
+                     and compact_auc >= heavy_auc - args.tolerance else "heavy")
+            print(f"{'':<14} compact/heavy: p50 latency {c['p50_us'] / h['p50_us']:.2f}x, "
+                  f"heap {c['heap_mb'] / max(h['heap_mb'], 1e-9):.3f}x, "
+                  f"AUC {c['auc'] - h['auc']:+.4f}; served at tolerance {args.tolerance}: {serve}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Single-patient payload decoding and JSON serialization, old vs new path.
+
+Decoding: the per-field safe_float / encode_ordinal / encode_bp row
+builder that build_feature_row used to be (kept below as
+legacy_feature_row) against PayloadDecoder. Both are first checked to
+give bit-identical vectors on every row of final_dataset_realistic.csv
+and on synthetic payloads with blank, missing, malformed and boundary
+values.
+
+JSON: Flask's default json-module provider against the orjson provider
+for parsing a request body, the /api/predict response and a page of
+/api/followups records.
+
+    cd backend && python benchmarks/bench_payload.py [--number 20000]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app  # noqa: E402
+from bench_risk_scoring import ODD_VALUES  # noqa: E402
+from bench_startup import SAMPLE  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+FEATURE_DEFAULTS = {
+    "Age": 0, "Weight": 0, "Cholesterol": 0, "Platelets": 0, "air_quality_index": 50,
+    "social_event_count": 0, "Hemoglobin (g/dL)": 13.5, "WBC Count (10^9/L)": 7.0,
+    "Platelet Count (10^9/L)": 250, "Urine Protein (mg/dL)": 10, "Urine Glucose (mg/dL)": 5,
+    "Pulse Rate (bpm)": 72,
+}
+
+EXTRA_ODD_VALUES = {
+    "Sex": [None, "", "female", " FEMALE ", "Male", "x"],
+    "Weight": ["1_000", "+nan", "-inf", "1e400", True, 10 ** 30, 2.5],
+    "Blood Pressure": [None, "", "nan/80", "inf/80", "120/abc"],
+    "Hemoglobin (g/dL)": [None, "", "NaN", "null", " 12.5 ", [1]],
+    "Pulse Rate (bpm)": ["None", 0, -1],
+}
+
+
+def legacy_feature_row(payload):
+    """build_feature_row as it was before PayloadDecoder."""
+    disease = "Diabetes" if "diab" in (payload.get("Problem Type") or "").strip().lower() else "Heart Disease"
+    row = {}
+    for name in app.COMMON_FEATURES + app.DIABETES_FEATURES + app.HEART_FAILURE_FEATURES:
+        if name == "Sex":
+            row[name] = 1.0 if (payload.get("Sex") or "Male").strip().lower() == "female" else 0.0
+        elif name == "Blood Pressure":
+            row[name] = app.encode_bp(payload.get(name, "120/80"))
+        elif name in ("Insulin", "Diabetics", "ECG Result"):
+            row[name] = float(app.encode_ordinal(payload.get(name, "Normal")))
+        else:
+            row[name] = app.safe_float(payload.get(name, FEATURE_DEFAULTS[name]))
+    features = app.COMMON_FEATURES + (
+        app.DIABETES_FEATURES if disease == "Diabetes" else app.HEART_FAILURE_FEATURES
+    )
+    return [app.safe_float(row.get(col, 0.0), 0.0) for col in features], disease
+
+
+def dataset_payloads():
+    df = pd.read_csv(os.path.join(BACKEND_DIR, "final_dataset_realistic.csv"))
+    return json.loads(df.to_json(orient="records"))
+
+
+def odd_payloads(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    odd = {**ODD_VALUES}
+    for name, values in EXTRA_ODD_VALUES.items():
+        odd[name] = list(odd.get(name, [])) + values
+    payloads = []
+    for i in range(n):
+        p = dict(base[int(rng.integers(len(base)))])
+        for name, values in odd.items():
+            r = rng.random()
+            if r < 0.15:
+                p[name] = values[int(rng.integers(len(values)))]
+            elif r < 0.2:
+                p.pop(name, None)
+        payloads.append(p)
+    return payloads
+
+
+def check_parity(label, payloads):
+    flagged = 0
+    for p in payloads:
+        if not isinstance(p.get("Sex"), (str, type(None))) and p.get("Sex"):
+            continue  # the old row builder raised on non-string Sex values
+        expected, disease = legacy_feature_row(p)
+        values, _, got_disease, errors = app.decode_patient(p)
+        flagged += bool(errors)
+        if disease != got_disease or np.asarray(expected, dtype="float64").tobytes() != values.tobytes():
+            raise SystemExit(f"[ERROR] {label}: vectors differ for {p}\n{expected}\n{values.tolist()}")
+    print(f"[INFO] Parity OK on {len(payloads)} payloads ({label}); {flagged} with field errors")
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing")
+    args = parser.parse_args()
+
+    base = dataset_payloads()
+    check_parity("final_dataset_realistic.csv", base)
+    check_parity("synthetic", odd_payloads(base, 20000))
+
+    payload = dict(SAMPLE)
+    n = args.number
+    print(f"\n{'operation':<34} {'old us':>9} {'new us':>9} {'speedup':>8}")
+
+    def row(label, old, new, number=n):
+        o, w = per_call_us(old, number), per_call_us(new, number)
+        print(f"{label:<34} {o:>9.2f} {w:>9.2f} {o / w:>7.1f}x")
+
+    row("decode payload -> float64 vector",
+        lambda: np.asarray(legacy_feature_row(payload)[0], dtype="float64"),
+        lambda: app.decode_patient(payload))
+
+    if app.orjson is None:
+        print("[WARN] orjson is not installed; skipping the JSON timings")
+        return
+    flask_app = app.app
+    default, fast = DefaultJSONProvider(flask_app), app.OrjsonProvider(flask_app)
+    body = json.dumps(payload).encode()
+    response = {
+        "disease_type": "Diabetes", "readmission_probability": 0.6123, "prediction": "Yes",
+        "risk_label": "Medium Risk", "followup_plan": app.followup_plan(0.61, "Diabetes"),
+        "staffing": app.staffing_simulator(0.61), "model_version": "default",
+    }
+    followups = [
+        {
+            "Patient ID": f"P{i}", "Patient Name": f"Patient_{i}", "Problem Type": "Diabetes",
+            "Readmission Probability": round(0.3 + i % 60 / 100, 4), "Risk Label": "Medium Risk",
+            "Followup Channel": "Phone call", "Next Visit": "In 7 days", "Simulation Date": "2024-06-01",
+            "Hospital Unit": "N/A", "Prediction Date": "2026-01-01", "Status": "Pending",
+        }
+        for i in range(1000)
+    ]
+    with flask_app.app_context():
+        row("parse request body", lambda: default.loads(body), lambda: fast.loads(body))
+        row("/api/predict response", lambda: default.response(response), lambda: fast.response(response))
+        row("/api/followups (1000 records)", lambda: default.response(followups),
+            lambda: fast.response(followups), number=max(1, n // 100))
+
+
+if __name__ == "__main__":
+    main()
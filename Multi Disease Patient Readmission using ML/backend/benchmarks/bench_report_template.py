@@ -0,0 +1,225 @@
+"""Single-patient PDF reports per second, static layer drawn vs stamped.
+
+"drawn" draws the header, logo, headings, signature and footer with
+canvas calls on every report (REPORT_TEMPLATE=0, the logo read from
+disk each time); "template" stamps them from report_pdf.ReportTemplate
+as one precompiled form XObject. Both run in this process on one core,
+with the signal-chart cache warm, so the numbers are reports/sec/core.
+
+Before timing, both versions of every report are checked to paint the
+same page: each PDF is parsed with pypdf and flattened (forms inlined,
+coordinates through the CTM) into a list of painted paths, text runs and
+images with their colours and fonts, and the lists must be equal.
+
+The repo does not ship umkc_logo.png; unless --logo is given a small
+RGBA PNG is generated so the logo path is exercised. Needs pypdf.
+
+    cd backend && python benchmarks/bench_report_template.py [--seconds 5] [--logo path.png]
+"""
+import os
+import io
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import report_pdf  # noqa: E402
+from bench_api import synthetic_patients  # noqa: E402
+from pypdf import PdfReader  # noqa: E402
+from pypdf.generic import ContentStream  # noqa: E402
+
+FOLLOWUP = {
+    "channel": "Phone + SMS + App",
+    "schedule": ["Day 2", "Day 7", "Day 14"],
+    "note": "High risk: close monitoring and early intervention.",
+}
+
+
+def report_args(patients, seed=0):
+    rng = np.random.default_rng(seed)
+    jobs = []
+    for p in patients:
+        disease = "Diabetes" if "diab" in str(p.get("Problem Type", "")).lower() else "Heart Disease"
+        prob = float(rng.random())
+        risk = "High Risk" if prob >= 0.7 else "Medium Risk" if prob >= 0.4 else "Low Risk"
+        staffing = {
+            "expected_readmissions": round(prob * 10, 2), "suggested_beds": int(prob * 10) + 1,
+            "suggested_nurses": int(prob * 20) + 2, "suggested_doctors": int(prob * 5) + 1,
+        }
+        jobs.append((p, disease, prob, risk, FOLLOWUP, staffing))
+    return jobs
+
+
+def render(job, template):
+    buffer = io.BytesIO()
+    c = report_pdf.canvas.Canvas(buffer, pagesize=report_pdf.A4)
+    report_pdf.draw_report_page(c, *job, template=template)
+    c.save()
+    return buffer.getvalue()
+
+
+# =========================
+# PAGE FLATTENING
+# =========================
+
+def _mul(a, b):
+    return (
+        a[0] * b[0] + a[1] * b[2], a[0] * b[1] + a[1] * b[3],
+        a[2] * b[0] + a[3] * b[2], a[2] * b[1] + a[3] * b[3],
+        a[4] * b[0] + a[5] * b[2] + b[4], a[4] * b[1] + a[5] * b[3] + b[5],
+    )
+
+
+def _pt(m, x, y):
+    return round(m[0] * x + m[2] * y + m[4], 2), round(m[1] * x + m[3] * y + m[5], 2)
+
+
+def _r(values):
+    return tuple(round(float(v), 4) for v in values)
+
+
+def _walk(reader, operations, resources, state, out):
+    stack = []
+    path = []
+    for operands, op in operations:
+        op = op.decode() if isinstance(op, bytes) else op
+        if op == "q":
+            stack.append(dict(state))
+        elif op == "Q":
+            state = stack.pop()
+        elif op == "cm":
+            state["ctm"] = _mul(_r(operands), state["ctm"])
+        elif op in ("rg", "g", "k", "sc", "scn"):
+            state["fill"] = _r(operands)
+        elif op in ("RG", "G", "K", "SC", "SCN"):
+            state["stroke"] = _r(operands)
+        elif op == "w":
+            state["lw"] = round(float(operands[0]), 4)
+        elif op == "gs":
+            state["gs"] = repr(sorted(resources["/ExtGState"][operands[0]].get_object().items()))
+        elif op in ("m", "l", "c", "v", "y"):
+            pts = [float(v) for v in operands]
+            path.append((op,) + tuple(_pt(state["ctm"], pts[i], pts[i + 1]) for i in range(0, len(pts), 2)))
+        elif op == "re":
+            x, y, w, h = (float(v) for v in operands)
+            path.append(("re",) + tuple(_pt(state["ctm"], px, py)
+                                        for px, py in ((x, y), (x + w, y), (x + w, y + h), (x, y + h))))
+        elif op == "h":
+            path.append(("h",))
+        elif op in ("f", "F", "f*", "S", "s", "B", "B*", "b", "b*", "n"):
+            if op != "n":
+                fills = op not in ("S", "s")
+                strokes = op not in ("f", "F", "f*")
+                out.append(("path", op, state["fill"] if fills else None,
+                            (state["stroke"], state["lw"]) if strokes else None, state["gs"], tuple(path)))
+            path = []
+        elif op == "BT":
+            state["tm"] = (1, 0, 0, 1, 0, 0)
+        elif op == "Tf":
+            font = resources["/Font"][operands[0]].get_object()
+            state["font"] = (str(font["/BaseFont"]), round(float(operands[1]), 4))
+        elif op == "Tm":
+            state["tm"] = _r(operands)
+        elif op == "Td":
+            tx, ty = (float(v) for v in operands)
+            state["tm"] = _mul((1, 0, 0, 1, tx, ty), state["tm"])
+        elif op in ("Tj", "TJ", "'", '"'):
+            text = operands[-1]
+            if op == "TJ":
+                text = "".join(str(t) for t in text if not isinstance(t, (int, float)) and not hasattr(t, "as_numeric"))
+            origin = _pt(_mul(state["tm"], state["ctm"]), 0, 0)
+            out.append(("text", str(text), state["font"], state["fill"], state["gs"], origin))
+        elif op == "Do":
+            xobj = resources["/XObject"][operands[0]].get_object()
+            if xobj["/Subtype"] == "/Form":
+                inner = dict(state)
+                inner["ctm"] = _mul(_r(xobj.get("/Matrix", [1, 0, 0, 1, 0, 0])), state["ctm"])
+                inner_resources = xobj.get("/Resources", resources).get_object()
+                _walk(reader, ContentStream(xobj, reader).operations, inner_resources, inner, out)
+            else:
+                smask = xobj.get("/SMask")
+                smask_hash = hashlib.md5(smask.get_object().get_data()).hexdigest() if smask else None
+                out.append(("image", hashlib.md5(xobj.get_data()).hexdigest(), smask_hash,
+                            _pt(state["ctm"], 0, 0), _pt(state["ctm"], 1, 1)))
+
+
+def painted(pdf):
+    """Everything the first page paints, in drawing order."""
+    reader = PdfReader(io.BytesIO(pdf))
+    page = reader.pages[0]
+    state = {"ctm": (1, 0, 0, 1, 0, 0), "fill": (0.0,), "stroke": (0.0,), "lw": 1.0, "gs": None,
+             "tm": (1, 0, 0, 1, 0, 0), "font": None}
+    out = []
+    _walk(reader, page.get_contents().operations, page["/Resources"].get_object(), state, out)
+    return out
+
+
+def same_page(a, b):
+    """Same items painted in the same order (so also the same stacking)."""
+    return painted(a) == painted(b)
+
+
+# =========================
+# MAIN
+# =========================
+
+def make_logo(path):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGBA", (180, 90), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((5, 5, 85, 85), fill=(255, 204, 0, 255))
+    draw.rectangle((95, 25, 175, 65), fill=(255, 255, 255, 200))
+    img.save(path)
+
+
+def reports_per_second(jobs, template, seconds):
+    n, i, t0 = 0, 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        render(jobs[i % len(jobs)], template)
+        n += 1
+        i += 1
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="timing per variant")
+    parser.add_argument("--patients", type=int, default=64, help="distinct patients (parity and timing)")
+    parser.add_argument("--logo", help="logo PNG to use (default: a generated one)")
+    args = parser.parse_args()
+
+    logo = args.logo
+    if logo is None:
+        logo = os.path.join(tempfile.mkdtemp(), "umkc_logo.png")
+        make_logo(logo)
+    report_pdf.LOGO_PATH = logo
+    template = report_pdf.ReportTemplate(logo)
+
+    jobs = report_args(synthetic_patients(args.patients, seed=11))
+    for job in jobs:
+        drawn, stamped = render(job, None), render(job, template)
+        if not same_page(drawn, stamped):
+            raise SystemExit(f"[ERROR] Pages differ for {job[0].get('Patient ID')}")
+    print(f"[INFO] {len(jobs)} reports paint identical pages drawn and stamped (logo: {logo})")
+
+    for job in jobs:  # warm the signal-chart cache for both runs
+        render(job, template)
+    drawn = reports_per_second(jobs, None, args.seconds)
+    stamped = reports_per_second(jobs, template, args.seconds)
+    size_drawn, size_stamped = len(render(jobs[0], None)), len(render(jobs[0], template))
+    print(f"{'variant':<10} {'reports/s':>10} {'ms/report':>10} {'bytes':>8}")
+    print(f"{'drawn':<10} {drawn:>10.1f} {1000 / drawn:>10.2f} {size_drawn:>8}")
+    print(f"{'template':<10} {stamped:>10.1f} {1000 / stamped:>10.2f} {size_stamped:>8}")
+    print(f"speedup: {stamped / drawn:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Vectorized severity / adjusted risk scoring vs the per-row functions.
+
+Times compute_severity_array, adjusted_risk_array, risk_category_array
+and followup_band_array against the scalar functions on --rows rows
+built by resampling the CSV (their exact agreement is checked by
+tests/test_risk_arrays.py, which also uses synthetic_frame). The scalar
+time is measured on --scalar-rows and extrapolated. The vectorized path
+is timed twice: on columns with the CSV's dtypes, and on the synthetic
+object columns where every numeric field has to be parsed from mixed
+values (the worst case, e.g. a JSON batch with strings in it).
+
+    cd backend && python benchmarks/bench_risk_scoring.py [--rows 1000000]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import app  # noqa: E402
+
+PAYLOAD_COLUMNS = [
+    "Problem Type", "Age", "Blood Pressure", "Cholesterol", "Insulin", "Diabetics",
+    "air_quality_index", "social_event_count", "Hemoglobin (g/dL)", "WBC Count (10^9/L)",
+    "Urine Protein (mg/dL)", "Urine Glucose (mg/dL)", "ECG Result", "Pulse Rate (bpm)",
+]
+
+# Values that exercise the parsing and threshold edges.
+ODD_VALUES = {
+    "Age": [np.nan, "", "75", "abc", 60, 74.999],
+    "Blood Pressure": [np.nan, "160/80", "140/100", "139/89", "bad", "120/80/60", " 150 / 85 ", 130],
+    "Cholesterol": [np.nan, 260, 219.99, "n/a"],
+    "Insulin": [np.nan, "HIGH", "Very high", "low", ""],
+    "Diabetics": [np.nan, "High", "normal"],
+    "ECG Result": [np.nan, "Abnormal", "borderline", "Borderline abnormal", "none"],
+    "Pulse Rate (bpm)": [np.nan, 100, "99.9"],
+    "air_quality_index": [np.nan, 120, "null"],
+    "social_event_count": [np.nan, 3, 2.5],
+}
+
+
+def synthetic_frame(base, n, seed=0, odd=True):
+    rng = np.random.default_rng(seed)
+    frame = base.iloc[rng.integers(0, len(base), size=n)].reset_index(drop=True)
+    if not odd:
+        return frame
+    frame = frame.astype(object)
+    for name, values in ODD_VALUES.items():
+        rows = rng.random(n) < 0.05
+        picks = np.empty(len(values), dtype=object)
+        picks[:] = values
+        frame.loc[rows, name] = picks[rng.integers(0, len(values), size=int(rows.sum()))]
+    return frame
+
+
+def diseases_for(frame):
+    return np.where(app.batch_disease_mask(frame), "Diabetes", "Heart Disease").astype(object)
+
+
+def scalar_scores(frame, diseases, model_prob):
+    sev, adj, risk, band = [], [], [], []
+    for data, disease, prob in zip(app.frame_records(frame), diseases, model_prob):
+        sev.append(app.compute_severity_score(data, disease))
+        a = app.adjusted_risk_score(prob, data, disease)
+        adj.append(a)
+        risk.append(app.risk_category(a))
+        band.append(app.followup_plan(a, disease)["risk_band"])
+    return np.array(sev), np.array(adj), np.array(risk, dtype=object), np.array(band, dtype=object)
+
+
+def vector_scores(frame, diseases, model_prob):
+    adj = app.adjusted_risk_array(model_prob, frame, diseases)
+    return adj, app.risk_category_array(adj), app.followup_band_array(adj)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    base = pd.read_csv(os.path.join(BACKEND_DIR, "final_dataset_realistic.csv"), usecols=PAYLOAD_COLUMNS)
+    frame = synthetic_frame(base, args.rows)
+    diseases = diseases_for(frame)
+    model_prob = np.random.default_rng(3).random(len(frame))
+
+    timings = {}
+    for label, f in (("vector", synthetic_frame(base, args.rows, odd=False)), ("vector obj", frame)):
+        f_diseases = diseases_for(f)
+        t0 = time.perf_counter()
+        vector_scores(f, f_diseases, model_prob)
+        timings[label] = time.perf_counter() - t0
+
+    n = min(args.scalar_rows, args.rows)
+    t0 = time.perf_counter()
+    scalar_scores(frame.iloc[:n], diseases[:n], model_prob[:n])
+    scalar_s = (time.perf_counter() - t0) * args.rows / n
+
+    print(f"\n{'':<10} {'rows':>10} {'seconds':>10} {'rows/s':>12}")
+    print(f"{'scalar':<10} {args.rows:>10} {scalar_s:>10.2f} {args.rows / scalar_s:>12.0f}"
+          f"{'  (extrapolated from %d rows)' % n if n < args.rows else ''}")
+    for label, seconds in timings.items():
+        print(f"{label:<10} {args.rows:>10} {seconds:>10.2f} {args.rows / seconds:>12.0f}")
+    print(f"\nspeedup: {scalar_s / timings['vector']:.0f}x ({scalar_s / timings['vector obj']:.0f}x on object columns)")
+
+
+if __name__ == "__main__":
+    main()
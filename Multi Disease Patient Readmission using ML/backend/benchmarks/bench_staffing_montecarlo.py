@@ -0,0 +1,66 @@
+"""Scaling of the Monte Carlo staffing simulation.
+
+Runs StaffingEngine.simulate on a synthetic pending cohort for several
+scenario counts, serially and on a process pool, and prints wall time
+and scenarios per second.
+
+    python benchmarks/bench_staffing_montecarlo.py [--patients 5000] [--horizon 14]
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from staffing import StaffingEngine  # noqa: E402
+
+
+def synthetic_cohort(n, start, window, seed=0):
+    rng = np.random.default_rng(seed)
+    units = np.array(["ICU", "Cardiology", "Endocrinology", "General Ward", "Emergency"])
+    days = rng.integers(0, window, size=n)
+    return pd.DataFrame({
+        "unit": units[rng.integers(0, len(units), size=n)],
+        "prediction_date": (pd.Timestamp(start) - pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d"),
+        "probability": rng.beta(2, 5, size=n),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--horizon", type=int, default=14)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--scenarios", default="10000,25000,50000,100000")
+    args = parser.parse_args()
+
+    engine = StaffingEngine(os.path.join(BACKEND_DIR, "staffing_simulation_summary.csv"))
+    start = "2025-06-01"
+    cohort = synthetic_cohort(args.patients, start, 30)
+    counts = [int(s) for s in args.scenarios.split(",")]
+
+    print(f"{args.patients} pending patients, {args.horizon} day horizon, "
+          f"{cohort['unit'].nunique()} units, {args.workers} workers\n")
+    print(f"{'scenarios':>10} {'serial s':>10} {'pool s':>10} {'scen/s (pool)':>14} {'speedup':>8}")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        engine.simulate(start, args.horizon, cohort, scenarios=1000, executor=pool)  # warm up
+        for n in counts:
+            t0 = time.perf_counter()
+            engine.simulate(start, args.horizon, cohort, scenarios=n, seed=1)
+            serial = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            engine.simulate(start, args.horizon, cohort, scenarios=n, seed=1, executor=pool)
+            pooled = time.perf_counter() - t0
+            print(f"{n:>10} {serial:>10.2f} {pooled:>10.2f} {n / pooled:>14.0f} {serial / pooled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Worker boot time and memory: preloaded master vs per-worker import.
+
+Emulates gunicorn's two start-up modes with os.fork (Linux only):
+
+  preload     the master imports app with PRELOAD_MODELS=1 and freezes the
+              GC, then forks the workers (gunicorn.conf.py's setup)
+  per-worker  workers are forked from a bare master and each imports app
+              and loads the models itself (gunicorn without --preload)
+
+Each worker serves one /api/simulate_staffing request; boot time is from
+fork to that response. RSS, PSS (RSS with shared pages split between the
+processes sharing them) and private memory are read from
+/proc/<pid>/smaps_rollup while all workers are alive.
+
+    cd backend && python benchmarks/bench_startup.py [--workers 4]
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = {
+    "Problem Type": "Diabetes", "Age": 63, "Sex": "Female", "Weight": 82,
+    "Blood Pressure": "145/92", "Cholesterol": 230, "Insulin": "High",
+    "Platelets": 260, "Diabetics": "High", "air_quality_index": 80,
+    "social_event_count": 2, "Hemoglobin (g/dL)": 11.8,
+    "WBC Count (10^9/L)": 9.1, "Platelet Count (10^9/L)": 250,
+    "Urine Protein (mg/dL)": 40, "Urine Glucose (mg/dL)": 120,
+    "Simulation Date": "2024-06-01",
+}
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def serve_one(report_fd, forked_at):
+    import app
+
+    with app.app.test_client() as client:
+        status = client.post("/api/simulate_staffing", json=SAMPLE).status_code
+    os.write(report_fd, (json.dumps({
+        "pid": os.getpid(), "boot": time.perf_counter() - forked_at, "status": status,
+    }) + "\n").encode())
+    signal.pause()
+
+
+def run(mode, n_workers):
+    """Runs inside a fresh interpreter; prints one JSON line of results."""
+    import gc
+
+    master_start = time.perf_counter()
+    if mode == "preload":
+        import app  # noqa: F401
+        gc.freeze()
+    master_ready = time.perf_counter() - master_start
+
+    sys.stdout.flush()
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(n_workers):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                serve_one(write_fd, forked_at)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    os.close(write_fd)
+
+    reports = []
+    with os.fdopen(read_fd) as reader:
+        while len(reports) < n_workers:
+            line = reader.readline()
+            if not line:
+                break
+            reports.append(json.loads(line))
+
+    time.sleep(0.5)
+    mem = {pid: memory_kb(pid) for pid in pids}
+    master_mem = memory_kb(os.getpid())
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+    print(json.dumps({
+        "mode": mode,
+        "workers": n_workers,
+        "master_ready_s": master_ready,
+        "boot_s": [r["boot"] for r in reports],
+        "status": [r["status"] for r in reports],
+        "worker_mem_kb": [mem[r["pid"]] for r in reports],
+        "master_mem_kb": master_mem,
+    }))
+
+
+def measure(mode, n_workers, env=None):
+    """Run one start-up mode in a fresh interpreter with extra `env`; returns its results."""
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--mode", mode, "--workers", str(n_workers)],
+        capture_output=True, text=True, check=True, env={**os.environ, **(env or {})},
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+HEADER = (f"{'mode':<20} {'master s':>9} {'boot s':>8} {'RSS MB':>8} {'PSS MB':>8} "
+          f"{'private MB':>11} {'total PSS MB':>13}")
+
+
+def format_row(label, result):
+    mem = result["worker_mem_kb"]
+    avg = lambda key: sum(m[key] for m in mem) / len(mem) / 1024  # noqa: E731
+    total_pss = (sum(m["pss"] for m in mem) + result["master_mem_kb"]["pss"]) / 1024
+    return (f"{label:<20} {result['master_ready_s']:>9.2f} "
+            f"{sum(result['boot_s']) / len(result['boot_s']):>8.2f} {avg('rss'):>8.1f} "
+            f"{avg('pss'):>8.1f} {avg('private'):>11.1f} {total_pss:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["preload", "per-worker"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        os.chdir(BACKEND_DIR)
+        sys.path.insert(0, BACKEND_DIR)
+        os.environ["PRELOAD_MODELS"] = "1"
+        run(args.mode, args.workers)
+        return
+
+    print(HEADER)
+    for mode in ("per-worker", "preload"):
+        print(format_row(mode, measure(mode, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from fast_scorer import _compile_step, _ForestTables
+
+try:
+    import shap
+except ImportError:
+    shap = None
+
+# =========================
+# PER-PATIENT EXPLANATIONS
+# =========================
+# A ModelExplainer is built once per loaded model (app.py registers one
+# per disease and model version) from a fixed background sample of the
+# shipped dataset. explain() takes float64 rows laid out as the model's
+# features and returns one contribution per feature plus a base value;
+# base + sum(contributions) is the model's output for the row, in the
+# units named by `output` ("probability" or "log_odds").
+#
+# With shap installed:
+#   forests / trees / XGBoost   shap.TreeExplainer, interventional on the
+#                               background, probability output
+#   LogisticRegression          shap.LinearExplainer (log-odds)
+#   anything else               shap.Explainer over predict_proba
+# Without shap:
+#   forests / trees             path attribution: each split on a row's
+#                               path credits its feature with the change
+#                               in the node's class-1 fraction, averaged
+#                               over the trees (one vectorized descent
+#                               over fast_scorer's stacked node tables)
+#   LogisticRegression          coef * (x - background mean), which is
+#                               exactly what LinearExplainer computes
+#   XGBoost                     the booster's own pred_contribs (TreeSHAP)
+#
+# Per-column preprocessing (StandardScaler, MinMaxScaler, SimpleImputer)
+# is applied first and does not change which feature a contribution
+# belongs to.
+
+TREE_ESTIMATORS = ("RandomForestClassifier", "ExtraTreesClassifier",
+                   "DecisionTreeClassifier", "ExtraTreeClassifier")
+
+
+class ModelExplainer:
+    """Per-feature contributions to one model's score."""
+
+    def __init__(self, model, features, background):
+        self.features = list(features)
+        background = np.asarray(background, dtype="float64")
+
+        if hasattr(model, "steps"):
+            raw_steps = [s for _, s in model.steps[:-1]]
+            est = model.steps[-1][1]
+        else:
+            raw_steps, est = [], model
+
+        self.columns = None
+        names_in = getattr(model, "feature_names_in_", None)
+        if names_in is not None and list(names_in) != self.features:
+            self.columns = np.array([self.features.index(n) for n in names_in])
+
+        try:
+            self.steps = [c for c in (_compile_step(s) for s in raw_steps) if c is not None]
+        except TypeError:
+            self.steps = None
+        name = type(est).__name__
+        booster = getattr(getattr(est, "model_", None), "get_booster", None)
+
+        if self.steps is None or not (name in TREE_ESTIMATORS or name == "LogisticRegression" or booster):
+            if shap is None:
+                raise TypeError(f"Explanations for {name} need shap")
+            self._build_generic(model, background)
+            return
+
+        bg = self._transform(background)
+        if shap is not None and name == "LogisticRegression":
+            self._shap = shap.LinearExplainer(est, bg)
+            self.method, self.output = "shap.LinearExplainer", "log_odds"
+            self.base_value = float(np.ravel(self._shap.expected_value)[-1])
+        elif shap is not None:
+            self._shap = shap.TreeExplainer(booster() if booster else est, data=bg,
+                                            feature_perturbation="interventional",
+                                            model_output="probability")
+            self.method, self.output = "shap.TreeExplainer", "probability"
+            self.base_value = float(np.ravel(self._shap.expected_value)[-1])
+        elif name == "LogisticRegression":
+            self.coef = np.asarray(est.coef_, dtype="float64").ravel()
+            self.center = bg.mean(axis=0)
+            self.method, self.output = "linear", "log_odds"
+            self.base_value = float(self.center @ self.coef + np.ravel(est.intercept_)[0])
+        elif booster:
+            self.booster = booster()
+            self.method, self.output = "xgboost.pred_contribs", "log_odds"
+            self.base_value = None  # per row, the booster's bias column
+        else:
+            trees = est.estimators_ if hasattr(est, "estimators_") else [est]
+            self.tables = _ForestTables(trees, 1)
+            self.method, self.output = "tree_path", "probability"
+            self.base_value = float(self.tables.proba[self.tables.roots].mean())
+
+    def _build_generic(self, model, background):
+        import pandas as pd
+
+        features = self.features
+
+        def predict(X):
+            return model.predict_proba(pd.DataFrame(X, columns=features))[:, 1]
+
+        self.steps = []
+        self.columns = None
+        self._shap = shap.Explainer(predict, shap.maskers.Independent(background, max_samples=len(background)))
+        self.method, self.output = "shap.Explainer", "probability"
+        self.base_value = float(np.mean(predict(background)))
+
+    def _transform(self, X):
+        X = np.asarray(X, dtype="float64")
+        if self.columns is not None:
+            X = X[:, self.columns]
+        for step in self.steps:
+            X = step(X)
+        return X
+
+    def explain(self, X):
+        """(contributions, base values) for the rows of a float64 matrix.
+
+        contributions[i, j] belongs to self.features[j]; base values are
+        one per row (the same for every row except with pred_contribs).
+        """
+        Xt = self._transform(X)
+        n = Xt.shape[0]
+        if self.method.startswith("shap."):
+            if self.method == "shap.Explainer":
+                phi = self._shap(Xt).values
+            else:
+                phi = self._shap.shap_values(Xt)
+                if isinstance(phi, list):
+                    phi = phi[-1]
+                phi = np.asarray(phi)
+                if phi.ndim == 3:
+                    phi = phi[:, :, -1]
+            base = np.full(n, self.base_value)
+        elif self.method == "linear":
+            phi = (Xt - self.center) * self.coef
+            base = np.full(n, self.base_value)
+        elif self.method == "xgboost.pred_contribs":
+            import xgboost
+
+            contribs = self.booster.predict(xgboost.DMatrix(Xt), pred_contribs=True)
+            phi, base = contribs[:, :-1], contribs[:, -1]
+        else:
+            phi = self._tree_path(Xt)
+            base = np.full(n, self.base_value)
+
+        phi = np.asarray(phi, dtype="float64")
+        if self.columns is not None:
+            out = np.empty_like(phi)
+            out[:, self.columns] = phi
+            phi = out
+        return phi, np.asarray(base, dtype="float64")
+
+    def _tree_path(self, X, chunk=512):
+        t = self.tables
+        if X.shape[0] > chunk:
+            return np.concatenate([self._tree_path(X[i:i + chunk], chunk)
+                                   for i in range(0, X.shape[0], chunk)])
+        n, m = X.shape
+        X32 = np.asarray(X, dtype=np.float32)
+        rows = np.arange(n)[:, None]
+        nodes = np.broadcast_to(t.roots, (n, t.n_trees))
+        phi = np.zeros(n * m)
+        for _ in range(t.depth):
+            feature = t.feature[nodes]
+            go_left = X32[rows, feature] <= t.threshold[nodes]
+            nxt = np.where(go_left, t.left[nodes], t.right[nodes])
+            # Leaves point to themselves, so finished trees add zeros.
+            phi += np.bincount((rows * m + feature).ravel(),
+                               weights=(t.proba[nxt] - t.proba[nodes]).ravel(), minlength=n * m)
+            nodes = nxt
+        return phi.reshape(n, m) / t.n_trees
+
+
+class ExplanationCache:
+    """Bounded LRU of explanation results, keyed like PredictionCache."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,289 @@
+import os
+import hashlib
+import numpy as np
+
+# =========================
+# COMPILED (PANDAS-FREE) SCORING
+# =========================
+# A fitted sklearn pipeline is flattened once at load time into plain
+# NumPy arrays: preprocessing steps become (shift, scale) vectors and the
+# final RandomForest / DecisionTree / LogisticRegression becomes either a
+# stacked node table or a coefficient vector. Scoring a float64 row then
+# skips DataFrame construction, feature-name validation and joblib's
+# per-call thread pool.
+#
+# compile_model() only returns a scorer after it reproduces the model's
+# predict_proba bit for bit on a probe batch; anything unsupported or
+# mismatching returns None and callers keep using predict_proba.
+#
+# A verified scorer can be saved as an uncompressed joblib file next to
+# its source pickle. Loading it with mmap_mode="r" maps the node tables
+# straight from the file: the pages are shared by every worker through
+# the page cache and never copied into a worker's heap. (sklearn's own
+# trees cannot be shared this way; Tree.__setstate__ copies the nodes.)
+
+
+class _Affine:
+    """x -> (x - shift) / scale, the form of StandardScaler.transform."""
+
+    def __init__(self, shift, scale):
+        self.shift = shift
+        self.scale = scale
+
+    def __call__(self, X):
+        X = X.copy()
+        if self.shift is not None:
+            X -= self.shift
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+
+class _MinMax:
+    def __init__(self, scale, min_):
+        self.scale = scale
+        self.min_ = min_
+
+    def __call__(self, X):
+        X = X * self.scale
+        X += self.min_
+        return X
+
+
+class _Impute:
+    def __init__(self, statistics):
+        self.statistics = statistics
+
+    def __call__(self, X):
+        return np.where(np.isnan(X), self.statistics, X)
+
+
+def _compile_step(step):
+    """Flatten one preprocessing step, or raise TypeError if unsupported."""
+    name = type(step).__name__
+    if step is None or step == "passthrough" or name == "BloodPressureTransformer":
+        return None
+    if name == "StandardScaler":
+        shift = np.asarray(step.mean_, dtype="float64") if step.with_mean else None
+        scale = np.asarray(step.scale_, dtype="float64") if step.with_std else None
+        return _Affine(shift, scale)
+    if name == "MinMaxScaler":
+        if getattr(step, "clip", False):
+            raise TypeError("MinMaxScaler(clip=True) is not supported")
+        return _MinMax(np.asarray(step.scale_, dtype="float64"),
+                       np.asarray(step.min_, dtype="float64"))
+    if name == "SimpleImputer":
+        stats = np.asarray(step.statistics_, dtype="float64")
+        if np.isnan(stats).any() or step.add_indicator:
+            raise TypeError("SimpleImputer that drops or adds columns is not supported")
+        return _Impute(stats)
+    raise TypeError(f"Unsupported pipeline step: {name}")
+
+
+class _ForestTables:
+    """All trees of a forest stacked into one node table.
+
+    Node ids are global; roots[t] is the root of tree t. Leaves point to
+    themselves so the descent loop can run a fixed number of steps.
+    """
+
+    def __init__(self, trees, class_index):
+        left, right, feature, threshold, proba, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for tree in trees:
+            t = tree.tree_
+            n = t.node_count
+            is_leaf = t.children_left == -1
+            ids = np.arange(n)
+            left.append(np.where(is_leaf, ids, t.children_left) + offset)
+            right.append(np.where(is_leaf, ids, t.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, t.feature))
+            threshold.append(t.threshold)
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = t.value[:, 0, :].astype("float64")
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            proba.append(value[:, class_index] / normalizer)
+            roots.append(offset)
+            offset += n
+            depth = max(depth, t.max_depth)
+
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype("float64")
+        self.proba = np.concatenate(proba)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = depth
+        self.n_trees = len(roots)
+
+    def __call__(self, X, chunk=2048):
+        if X.shape[0] > chunk:
+            return np.concatenate([
+                self(X[i:i + chunk], chunk) for i in range(0, X.shape[0], chunk)
+            ])
+        # Trees compare float32 features against float64 thresholds.
+        X32 = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X32.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X32.shape[0], self.n_trees))
+        for _ in range(self.depth):
+            go_left = X32[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        # Sequential sum in estimator order, as the forest accumulates it.
+        leaf = self.proba[nodes]
+        return np.cumsum(leaf, axis=1)[:, -1] / self.n_trees
+
+
+class _Linear:
+    def __init__(self, coef, intercept):
+        from scipy.special import expit
+
+        self.coef_t = np.asarray(coef, dtype="float64").T
+        self.intercept = np.asarray(intercept, dtype="float64")
+        self.expit = expit
+
+    def __call__(self, X):
+        # predict_proba receives a DataFrame, which reaches BLAS in column
+        # major order; matching the layout keeps the dot product identical.
+        decision = (np.asfortranarray(X) @ self.coef_t + self.intercept).ravel()
+        return self.expit(decision)
+
+
+def _compile_estimator(est):
+    name = type(est).__name__
+    classes = list(getattr(est, "classes_", []))
+    if len(classes) != 2:
+        raise TypeError("Only binary classifiers are supported")
+    class_index = 1
+
+    if name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        if getattr(est, "n_outputs_", 1) != 1:
+            raise TypeError("Multi-output forests are not supported")
+        return _ForestTables(est.estimators_, class_index)
+    if name in ("DecisionTreeClassifier", "ExtraTreeClassifier"):
+        return _ForestTables([est], class_index)
+    if name == "LogisticRegression":
+        return _Linear(est.coef_, est.intercept_)
+    raise TypeError(f"Unsupported estimator: {name}")
+
+
+class CompiledScorer:
+    """predict_proba(X)[:, 1] over float64 arrays without pandas or sklearn."""
+
+    def __init__(self, steps, estimator, columns, kind):
+        self.steps = steps
+        self.estimator = estimator
+        self.columns = columns
+        self.kind = kind
+
+    def predict_proba1(self, X):
+        """Positive-class probability for each row of a float64 matrix."""
+        X = np.asarray(X, dtype="float64")
+        if self.columns is not None:
+            X = X[:, self.columns]
+        for step in self.steps:
+            X = step(X)
+        return self.estimator(X)
+
+
+def _reference_proba(model, X_df):
+    """predict_proba with forests forced to n_jobs=1 (deterministic summation)."""
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    n_jobs = getattr(est, "n_jobs", None)
+    try:
+        if n_jobs not in (None, 1):
+            est.n_jobs = 1
+        return model.predict_proba(X_df)[:, 1]
+    finally:
+        if n_jobs not in (None, 1):
+            est.n_jobs = n_jobs
+
+
+def compile_model(model, features, probe):
+    """Compile `model` for rows laid out as `features`.
+
+    `probe` is a float64 matrix of representative rows used for the
+    parity check. Returns a CompiledScorer, or None (with a printed
+    reason) when the model cannot be reproduced exactly.
+    """
+    import pandas as pd
+
+    try:
+        if hasattr(model, "steps"):
+            raw_steps = [s for _, s in model.steps[:-1]]
+            estimator = model.steps[-1][1]
+        else:
+            raw_steps = []
+            estimator = model
+
+        columns = None
+        names_in = getattr(model, "feature_names_in_", None)
+        if names_in is not None:
+            names_in = list(names_in)
+            if sorted(names_in) != sorted(features):
+                raise TypeError(f"Model expects different features: {names_in}")
+            if names_in != list(features):
+                columns = np.array([list(features).index(n) for n in names_in])
+
+        steps = [c for c in (_compile_step(s) for s in raw_steps) if c is not None]
+        scorer = CompiledScorer(steps, _compile_estimator(estimator), columns,
+                                type(estimator).__name__)
+    except Exception as e:
+        print(f"[WARN] Fast scoring unavailable for {type(model).__name__}: {e}")
+        return None
+
+    probe = np.asarray(probe, dtype="float64")
+    expected = _reference_proba(model, pd.DataFrame(probe, columns=features))
+    got = scorer.predict_proba1(probe)
+    if not np.array_equal(expected, got):
+        diff = float(np.max(np.abs(expected - got)))
+        print(f"[WARN] Fast scoring disabled for {scorer.kind}: parity check failed (max diff {diff:.3g})")
+        return None
+
+    print(f"[INFO] Fast scoring enabled for {scorer.kind} ({len(probe)} probe rows bit-identical)")
+    return scorer
+
+
+# =========================
+# MEMORY-MAPPED ARTIFACTS
+# =========================
+
+ARTIFACT_FORMAT = 1
+
+
+def file_fingerprint(path):
+    """sha256 of a file's contents; ties an artifact to the pickle it was built from."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def save_compiled(scorer, path, source_fingerprint):
+    """Write a verified scorer to `path` (atomically) for memory-mapped loading."""
+    import joblib
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({"format": ARTIFACT_FORMAT, "source": source_fingerprint, "scorer": scorer}, tmp)
+    os.replace(tmp, path)
+
+
+def load_compiled(path, source_fingerprint, mmap=True):
+    """Scorer saved by save_compiled, or None if missing, stale or unreadable."""
+    import joblib
+
+    if not os.path.exists(path):
+        return None
+    try:
+        data = joblib.load(path, mmap_mode="r" if mmap else None)
+    except Exception as e:
+        print(f"[WARN] Could not load compiled scorer {path}: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("format") != ARTIFACT_FORMAT:
+        return None
+    if data.get("source") != source_fingerprint:
+        print(f"[INFO] Compiled scorer {path} is out of date; rebuilding")
+        return None
+    return data["scorer"]
@@ -0,0 +1,367 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+# =========================
+# FOLLOW-UP STORAGE BACKENDS
+# =========================
+
+FOLLOWUP_COLUMNS = [
+    "Patient ID", "Patient Name", "Problem Type",
+    "Readmission Probability", "Risk Label",
+    "Followup Channel", "Next Visit",
+    "Simulation Date", "Hospital Unit",
+    "Prediction Date", "Status"
+]
+
+# CSV header -> SQLite column
+SQL_COLUMNS = {
+    "Patient ID": "patient_id",
+    "Patient Name": "patient_name",
+    "Problem Type": "problem_type",
+    "Readmission Probability": "readmission_probability",
+    "Risk Label": "risk_label",
+    "Followup Channel": "followup_channel",
+    "Next Visit": "next_visit",
+    "Simulation Date": "simulation_date",
+    "Hospital Unit": "hospital_unit",
+    "Prediction Date": "prediction_date",
+    "Status": "status",
+}
+
+
+def _date_str(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _clean(value):
+    """NaN / pandas scalars -> plain Python values SQLite and jsonify accept."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class CsvFollowupStore:
+    """Legacy store: the whole CSV is read and rewritten on every change."""
+
+    name = "csv"
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(self.path):
+            pd.DataFrame(columns=FOLLOWUP_COLUMNS).to_csv(self.path, index=False)
+
+    def add(self, record):
+        df = pd.read_csv(self.path)
+        df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
+        df.to_csv(self.path, index=False)
+
+    def add_many(self, records):
+        if not records:
+            return
+        pd.DataFrame(records, columns=FOLLOWUP_COLUMNS).to_csv(
+            self.path, mode="a", header=False, index=False
+        )
+
+    def complete(self, patient_id):
+        """Mark every record of patient_id Completed; returns rows matched."""
+        df = pd.read_csv(self.path)
+        mask = df["Patient ID"].astype(str) == str(patient_id)
+        if not mask.any():
+            return 0
+        df.loc[mask, "Status"] = "Completed"
+        df.to_csv(self.path, index=False)
+        return int(mask.sum())
+
+    def version(self):
+        """Token that changes whenever the stored follow-ups change."""
+        st = os.stat(self.path)
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    def query_pending(self, since, until=None, unit=None, risk_label=None,
+                      problem_type=None, after=None, limit=None):
+        """See SqliteFollowupStore.query_pending; row position stands in for id."""
+        df = pd.read_csv(self.path)
+        df["_id"] = range(len(df))
+        df["Prediction Date"] = pd.to_datetime(
+            df["Prediction Date"], errors="coerce"
+        ).dt.strftime("%Y-%m-%d")
+        dates = df["Prediction Date"]
+
+        mask = (dates >= _date_str(since)) & (df["Status"] != "Completed")
+        if until is not None:
+            mask &= dates <= _date_str(until)
+        for col, value in (("Hospital Unit", unit), ("Risk Label", risk_label),
+                           ("Problem Type", problem_type)):
+            if value:
+                mask &= df[col].astype(str).str.lower() == str(value).lower()
+        if after is not None:
+            mask &= (dates < after[0]) | ((dates == after[0]) & (df["_id"] < int(after[1])))
+
+        df = df[mask].sort_values(["Prediction Date", "_id"], ascending=False)
+        next_after = None
+        if limit and len(df) > limit:
+            df = df.head(limit)
+            last = df.iloc[-1]
+            next_after = (last["Prediction Date"], int(last["_id"]))
+
+        records = [
+            {k: _clean(v) for k, v in row.items()}
+            for row in df[FOLLOWUP_COLUMNS].to_dict(orient="records")
+        ]
+        return records, next_after
+
+    def pending_since(self, cutoff):
+        """Non-Completed records predicted on or after cutoff, newest first."""
+        return self.query_pending(cutoff)[0]
+
+    def pending_cohort(self, since):
+        """DataFrame (unit, prediction_date, probability) of pending follow-ups since `since`."""
+        df = pd.read_csv(self.path, usecols=["Hospital Unit", "Prediction Date",
+                                             "Readmission Probability", "Status"])
+        dates = pd.to_datetime(df["Prediction Date"], errors="coerce")
+        df = df[(dates >= pd.Timestamp(_date_str(since))) & (df["Status"] != "Completed")]
+        return pd.DataFrame({
+            "unit": df["Hospital Unit"],
+            "prediction_date": df["Prediction Date"],
+            "probability": df["Readmission Probability"],
+        })
+
+
+class SqliteFollowupStore:
+    """Follow-ups in SQLite (WAL mode) with single-row inserts and updates.
+
+    WAL lets gunicorn workers read while another writes, and each write
+    is its own transaction, so concurrent predictions no longer lose
+    each other's rows the way the CSV rewrite did.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS followups (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                patient_name TEXT,
+                problem_type TEXT,
+                readmission_probability REAL,
+                risk_label TEXT,
+                followup_channel TEXT,
+                next_visit TEXT,
+                simulation_date TEXT,
+                hospital_unit TEXT,
+                prediction_date TEXT,
+                status TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_followups_patient_id ON followups(patient_id);
+            CREATE INDEX IF NOT EXISTS idx_followups_status ON followups(status);
+            CREATE INDEX IF NOT EXISTS idx_followups_prediction_date ON followups(prediction_date);
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', '0');
+            CREATE TRIGGER IF NOT EXISTS followups_version_insert AFTER INSERT ON followups
+            BEGIN
+                UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+            END;
+            CREATE TRIGGER IF NOT EXISTS followups_version_update AFTER UPDATE ON followups
+            BEGIN
+                UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+            END;
+            CREATE TRIGGER IF NOT EXISTS followups_version_delete AFTER DELETE ON followups
+            BEGIN
+                UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+            END;
+            """
+        )
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork so gunicorn
+        # workers never share the master's handle.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row_values(record):
+        values = []
+        for col in FOLLOWUP_COLUMNS:
+            v = _clean(record.get(col))
+            if v is not None and col != "Readmission Probability":
+                v = str(v)
+            values.append(v)
+        return values
+
+    _INSERT = "INSERT INTO followups ({}) VALUES ({})".format(
+        ", ".join(SQL_COLUMNS.values()), ", ".join("?" * len(SQL_COLUMNS))
+    )
+
+    def add(self, record):
+        self._conn().execute(self._INSERT, self._row_values(record))
+
+    def add_many(self, records):
+        if not records:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(self._INSERT, [self._row_values(r) for r in records])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, patient_id):
+        """Mark every record of patient_id Completed; returns rows matched."""
+        cur = self._conn().execute(
+            "UPDATE followups SET status = 'Completed' WHERE patient_id = ?",
+            (str(patient_id),),
+        )
+        return cur.rowcount
+
+    def version(self):
+        """Token that changes whenever the stored follow-ups change.
+
+        Maintained by triggers, so reading it is a single primary-key lookup.
+        """
+        row = self._conn().execute(
+            "SELECT value FROM store_meta WHERE key = 'version'"
+        ).fetchone()
+        return row[0]
+
+    def query_pending(self, since, until=None, unit=None, risk_label=None,
+                      problem_type=None, after=None, limit=None):
+        """Non-Completed records in [since, until], newest first.
+
+        `after` is the (prediction_date, id) of the last row of the
+        previous page. Returns (records, next_after); next_after is None
+        on the last page.
+        """
+        where = ["prediction_date >= ?", "status != 'Completed'"]
+        params = [_date_str(since)]
+        if until is not None:
+            where.append("prediction_date <= ?")
+            params.append(_date_str(until))
+        for col, value in (("hospital_unit", unit), ("risk_label", risk_label),
+                           ("problem_type", problem_type)):
+            if value:
+                where.append(f"{col} = ? COLLATE NOCASE")
+                params.append(str(value))
+        if after is not None:
+            where.append("(prediction_date < ? OR (prediction_date = ? AND id < ?))")
+            params += [after[0], after[0], int(after[1])]
+
+        sql = "SELECT id, {} FROM followups WHERE {} ORDER BY prediction_date DESC, id DESC".format(
+            ", ".join(SQL_COLUMNS.values()), " AND ".join(where)
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit) + 1)
+
+        rows = self._conn().execute(sql, params).fetchall()
+        next_after = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1]["prediction_date"], rows[-1]["id"])
+
+        records = [dict(zip(FOLLOWUP_COLUMNS, tuple(row)[1:])) for row in rows]
+        return records, next_after
+
+    def pending_since(self, cutoff):
+        """Non-Completed records predicted on or after cutoff, newest first."""
+        return self.query_pending(cutoff)[0]
+
+    def pending_cohort(self, since):
+        """DataFrame (unit, prediction_date, probability) of pending follow-ups since `since`."""
+        rows = self._conn().execute(
+            "SELECT hospital_unit, prediction_date, readmission_probability FROM followups"
+            " WHERE prediction_date >= ? AND status != 'Completed'",
+            (_date_str(since),),
+        ).fetchall()
+        return pd.DataFrame([tuple(r) for r in rows],
+                            columns=["unit", "prediction_date", "probability"])
+
+    def migrate_from_csv(self, csv_path):
+        """One-shot import of a legacy follow-up CSV; later calls are no-ops.
+
+        Returns the number of rows imported.
+        """
+        if not os.path.exists(csv_path):
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'migrated_from_csv'"
+            ).fetchone()
+            if done is not None:
+                conn.execute("COMMIT")
+                return 0
+
+            # Read as text so literal "N/A" values survive the import.
+            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+            df = df.reindex(columns=FOLLOWUP_COLUMNS).replace("", None)
+            df["Readmission Probability"] = pd.to_numeric(
+                df["Readmission Probability"], errors="coerce"
+            )
+            df["Prediction Date"] = pd.to_datetime(
+                df["Prediction Date"], errors="coerce"
+            ).dt.strftime("%Y-%m-%d")
+            records = df.to_dict(orient="records")
+            conn.executemany(self._INSERT, [self._row_values(r) for r in records])
+            conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('migrated_from_csv', ?)",
+                (os.path.abspath(csv_path),),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(records)
+
+
+def open_followup_store(backend, csv_path, db_path):
+    """Build the configured follow-up store ("sqlite" or legacy "csv")."""
+    backend = (backend or "sqlite").strip().lower()
+    if backend == "csv":
+        return CsvFollowupStore(csv_path)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown follow-up store backend: {backend}")
+
+    store = SqliteFollowupStore(db_path)
+    imported = store.migrate_from_csv(csv_path)
+    if imported:
+        print(f"[INFO] Migrated {imported} follow-ups from {csv_path} to {db_path}")
+    return store
+
+
+if __name__ == "__main__":
+    # python followup_store.py migrate [csv_path] [db_path]
+    import sys
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    args = sys.argv[1:]
+    if not args or args[0] != "migrate":
+        print("usage: python followup_store.py migrate [csv_path] [db_path]")
+        sys.exit(2)
+    csv_path = args[1] if len(args) > 1 else os.path.join(base_dir, "patient_followups.csv")
+    db_path = args[2] if len(args) > 2 else os.path.join(base_dir, "patient_followups.db")
+    n = SqliteFollowupStore(db_path).migrate_from_csv(csv_path)
+    print(f"[INFO] Imported {n} follow-ups into {db_path}")
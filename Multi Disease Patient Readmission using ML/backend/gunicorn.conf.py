@@ -0,0 +1,55 @@
+# Gunicorn settings (used by the Procfile and Dockerfile: gunicorn -c gunicorn.conf.py app:app)
+#
+# The app is imported once in the master with every model loaded
+# (preload_app + PRELOAD_MODELS=1); workers are forked from it and share
+# the model pages copy-on-write instead of each unpickling its own copy.
+import gc
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+# Workers write their metrics here and /metrics sums them (see metrics.py).
+# One directory per server, emptied at start so counters begin at zero.
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"readmission-metrics-{os.getpid()}"))
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+# uvicorn.workers.UvicornWorker serves asgi:app (see asgi.py).
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+_fork_times = {}
+
+
+def on_starting(server):
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's view;
+    # otherwise a collection in a worker writes to every tracked object's
+    # header and un-shares the pages that hold the models.
+    gc.freeze()
+    server.log.info("Master ready; %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
+
+
+def pre_fork(server, worker):
+    _fork_times[worker.age] = time.perf_counter()
+
+
+def worker_exit(server, worker):
+    # Write the last few seconds of this worker's metrics before it goes.
+    app = sys.modules.get("app")
+    if app is not None:
+        app.METRICS.flush()
+
+
+def post_worker_init(worker):
+    started = _fork_times.get(worker.age)
+    if started is not None:
+        worker.log.info("Worker %s booted in %.3fs", worker.pid, time.perf_counter() - started)
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# =========================
+# BACKGROUND JOB QUEUE
+# =========================
+# Jobs live in a SQLite table shared by every gunicorn worker; each worker
+# runs a few daemon threads that claim queued jobs, so long PDF and batch
+# work runs outside the request/--timeout path. Inputs and results are
+# files under <result_dir>/<job_id>/. Finished jobs are removed once
+# their result is older than the TTL.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobAbandoned(Exception):
+    """The job is no longer RUNNING in the table (e.g. failed as stale by cleanup())."""
+
+
+class Job:
+    """Handle passed to job handlers for progress reporting and cancellation."""
+
+    def __init__(self, queue, job_id, kind, params):
+        self.queue = queue
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.dir = queue.job_dir(job_id)
+        self._last_report = 0.0
+
+    def input_path(self):
+        return os.path.join(self.dir, "input.json")
+
+    def result_path(self, ext):
+        return os.path.join(self.dir, "result" + ext)
+
+    def load_input(self):
+        with open(self.input_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def progress(self, fraction, message=None, force=False):
+        """Record progress (0..1); raises JobCancelled if a cancel was requested,
+        JobAbandoned if the job was failed as stale in the meantime.
+
+        Writes are throttled to one every 0.5s unless force=True.
+        """
+        now = time.time()
+        if force or now - self._last_report >= 0.5:
+            self._last_report = now
+            if not self.queue._update_running(self.id, progress=max(0.0, min(float(fraction), 1.0)),
+                                              message=message, heartbeat_at=now):
+                raise JobAbandoned()
+            if self.queue._cancel_requested(self.id):
+                raise JobCancelled()
+
+    @contextmanager
+    def keepalive(self, interval=30.0):
+        """Keep the heartbeat fresh while a long step that cannot call progress() runs."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                self.queue._update_running(self.id, heartbeat_at=time.time())
+
+        thread = threading.Thread(target=beat, name=f"job-keepalive-{self.id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+class JobQueue:
+    def __init__(self, db_path, result_dir, workers=2, ttl_seconds=24 * 3600,
+                 stale_seconds=15 * 60):
+        self.db_path = db_path
+        self.result_dir = result_dir
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.handlers = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._last_cleanup = 0.0
+        os.makedirs(self.result_dir, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT,
+                progress REAL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                result_file TEXT,
+                result_mimetype TEXT,
+                result_name TEXT,
+                cancel_requested INTEGER DEFAULT 0,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+            """
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def job_dir(self, job_id):
+        return os.path.join(self.result_dir, job_id)
+
+    def register(self, kind, handler):
+        """handler(job) -> dict result, or {"file": path, "mimetype": ..., "name": ...}."""
+        self.handlers[kind] = handler
+
+    # ---------- submit / inspect ----------
+
+    def submit(self, kind, input_data, params=None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(os.path.join(self.job_dir(job_id), "input.json"), "w", encoding="utf-8") as f:
+            json.dump(input_data, f)
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params or {}), time.time()),
+        )
+        self.ensure_workers()
+        return job_id
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "progress": round(job["progress"] or 0.0, 4),
+            "message": job["message"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "expires_at": job["finished_at"] + self.ttl_seconds if job["finished_at"] else None,
+        }
+
+    def cancel(self, job_id):
+        """Cancel a job; queued jobs stop at once, running jobs at their next progress()."""
+        conn = self._conn()
+        cur = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, message = 'Cancelled'"
+            " WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED),
+        )
+        if cur.rowcount:
+            return True
+        cur = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, RUNNING),
+        )
+        return bool(cur.rowcount)
+
+    # ---------- workers ----------
+
+    def ensure_workers(self):
+        """Start this process's worker threads (again after a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                t.start()
+
+    def _update(self, job_id, **fields):
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if not fields:
+            return
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        self._conn().execute(f"UPDATE jobs SET {sets} WHERE id = ?", (*fields.values(), job_id))
+
+    def _update_running(self, job_id, **fields):
+        """Update a job only while it is RUNNING; False if it no longer is."""
+        fields = {k: v for k, v in fields.items() if v is not None}
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        cur = self._conn().execute(
+            f"UPDATE jobs SET {sets} WHERE id = ? AND status = ?", (*fields.values(), job_id, RUNNING)
+        )
+        return cur.rowcount > 0
+
+    def _cancel_requested(self, job_id):
+        row = self._conn().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def _claim(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, params FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                    (RUNNING, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _worker_loop(self):
+        while True:
+            try:
+                self._maybe_cleanup()
+                row = self._claim()
+                if row is None:
+                    time.sleep(0.5)
+                    continue
+                self._run(row["id"], row["kind"], json.loads(row["params"] or "{}"))
+            except Exception as e:
+                print(f"[ERROR] Job worker error: {e}")
+                time.sleep(1.0)
+
+    def _run(self, job_id, kind, params):
+        # Terminal updates only apply to a RUNNING row, so a job that
+        # cleanup() has already failed as stale is never flipped back.
+        job = Job(self, job_id, kind, params)
+        try:
+            result = self.handlers[kind](job)
+            if isinstance(result, dict) and "file" in result:
+                stored = dict(result_file=result["file"],
+                              result_mimetype=result.get("mimetype", "application/octet-stream"),
+                              result_name=result.get("name", os.path.basename(result["file"])))
+            else:
+                path = job.result_path(".json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(result, f)
+                stored = dict(result_file=path, result_mimetype="application/json",
+                              result_name="result.json")
+            if not self._update_running(job_id, status=DONE, progress=1.0, finished_at=time.time(),
+                                        message="Done", **stored):
+                raise JobAbandoned()
+            print(f"[INFO] Job {job_id} ({kind}) done")
+        except JobAbandoned:
+            print(f"[WARN] Job {job_id} ({kind}) was no longer running (stale); result discarded")
+        except JobCancelled:
+            self._update_running(job_id, status=CANCELLED, finished_at=time.time(), message="Cancelled")
+            print(f"[INFO] Job {job_id} ({kind}) cancelled")
+        except Exception as e:
+            self._update_running(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+            print(f"[ERROR] Job {job_id} ({kind}) failed: {e}")
+
+    # ---------- TTL cleanup ----------
+
+    def _maybe_cleanup(self, every=60.0):
+        now = time.time()
+        if now - self._last_cleanup < every:
+            return
+        self._last_cleanup = now
+        self.cleanup(now)
+
+    def cleanup(self, now=None):
+        """Delete expired finished jobs and fail jobs whose worker went away."""
+        now = now or time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = 'Worker stopped responding'"
+            " WHERE status = ? AND heartbeat_at < ?",
+            (FAILED, now, RUNNING, now - self.stale_seconds),
+        )
+        expired = [
+            r[0] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (*FINISHED, now - self.ttl_seconds),
+            )
+        ]
+        for job_id in expired:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        if expired:
+            print(f"[INFO] Removed {len(expired)} expired jobs")
+        return len(expired)
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import bisect
+import threading
+
+# =========================
+# PROMETHEUS METRICS
+# =========================
+# Request counts and latency histograms per route, and histograms of the
+# hot-path phases request_timing records (feature build, model, severity,
+# staffing, chart, pdf, storage), served by GET /metrics in the
+# Prometheus text format.
+#
+# Each process counts in memory; observing is a bisect and two additions
+# under a lock. Under gunicorn every worker also writes its totals to
+# METRICS_DIR/<pid>-<start>.json (atomic rename) at most every
+# flush_interval seconds, and /metrics sums the files of all workers, so
+# whichever worker answers the scrape reports the whole server. Files of
+# workers that have exited are kept, so counters never go backwards;
+# gunicorn.conf.py clears the directory when the server starts.
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+DEFINITIONS = {
+    "readmission_http_requests_total": ("counter", "HTTP requests by route, method and status", None),
+    "readmission_http_request_duration_seconds": ("histogram", "Request handling time by route", REQUEST_BUCKETS),
+    "readmission_phase_duration_seconds": (
+        "histogram", "Time per request phase (nested phases excluded)", PHASE_BUCKETS,
+    ),
+    "readmission_profiled_requests_total": ("counter", "Slow requests saved as cProfile dumps", None),
+    "readmission_rejected_requests_total": (
+        "counter", "Requests answered 429 because their ASGI lane was full (asgi.py)", None,
+    ),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Metrics:
+    def __init__(self, directory=None, flush_interval=5.0, enabled=True):
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._file = f"{self._pid}-{time.time_ns()}.json"
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = time.monotonic()
+
+    def _check_fork(self):
+        # A forked worker starts counting from zero under its own file name.
+        if self._pid != os.getpid():
+            self._reset()
+
+    # ---------- recording ----------
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        buckets = DEFINITIONS[name][2]
+        i = bisect.bisect_left(buckets, seconds)
+        with self._lock:
+            self._check_fork()
+            h = self._histograms.get((name, labels))
+            if h is None:
+                h = self._histograms[(name, labels)] = [[0] * (len(buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += seconds
+
+    def observe_request(self, route, method, status, seconds, phases):
+        """Count one request and observe its duration and phases (seconds)."""
+        self.inc("readmission_http_requests_total",
+                 (("route", route), ("method", method), ("status", str(status))))
+        self.observe("readmission_http_request_duration_seconds", (("route", route),), seconds)
+        for phase, phase_seconds in phases.items():
+            self.observe("readmission_phase_duration_seconds",
+                         (("route", route), ("phase", phase)), phase_seconds)
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    # ---------- aggregation ----------
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {
+                "counters": [[n, list(map(list, l)), v] for (n, l), v in self._counters.items()],
+                "histograms": [[n, list(map(list, l)), c[:], s] for (n, l), (c, s) in self._histograms.items()],
+            }
+
+    def flush(self):
+        """Write this process's totals to the shared directory."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, self._file)
+        tmp = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+            self._last_flush = time.monotonic()
+        except OSError as e:
+            print(f"[WARN] Could not write metrics to {path}: {e}")
+
+    def collect(self):
+        """(counters, histograms) summed over every worker."""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            self.flush()
+            snapshots = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for snap in snapshots:
+            for name, labels, value in snap["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snap["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                h = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                h[0] = [a + b for a, b in zip(h[0], counts)]
+                h[1] += total
+        return counters, histograms
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+                continue
+            for (n, labels), (counts, total) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ["+Inf"], counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total:.9g}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,341 @@
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+
+# =========================
+# MODEL REGISTRY
+# =========================
+# Models (and anything derived from them, such as compiled scorers) are
+# registered by name with a loader and built on first use. Under
+# gunicorn, gunicorn.conf.py sets preload_app and PRELOAD_MODELS=1 so
+# everything is built once in the master before workers fork; the
+# workers then share those pages copy-on-write instead of each
+# unpickling its own copy. The time of every startup phase is recorded.
+#
+# Versions: with a model directory laid out as
+#
+#     models/<version>/readmission_*.pkl   (+ optional metadata.json or
+#                                           train.py's training_summary.json)
+#     models/CURRENT                       (name of the active version)
+#
+# each version is a ModelGeneration. Switching versions builds and warms
+# the new generation off to the side, then replaces the current one with
+# a single assignment. Requests pin the generation they started with, so
+# in-flight requests finish on the old models and none are dropped.
+# Without a model directory the files are read from the working
+# directory as before, as version "default".
+
+CURRENT_FILE = "CURRENT"
+DEFAULT_VERSION = "default"
+
+
+def first_existing(paths):
+    return next((p for p in paths if os.path.exists(p)), None)
+
+
+def load_model_file(paths):
+    """Load the first existing file via joblib, falling back to cloudpickle."""
+    import joblib
+
+    p = first_existing(paths)
+    if p is None:
+        raise FileNotFoundError(f"No model file found in: {paths}")
+    try:
+        print(f"[MODEL] Loading via joblib: {p}")
+        return joblib.load(p)
+    except Exception as e:
+        print(f"[WARN] joblib.load failed for {p}: {e}")
+        print("[INFO] Trying cloudpickle fallback...")
+        import cloudpickle
+
+        with open(p, "rb") as f:
+            return cloudpickle.load(f)
+
+
+class LazyModel:
+    """Stand-in for a registry entry that loads it on first attribute access.
+
+    Lets feature builders hand out "the diabetes model" without forcing
+    the pickle to load when only the compiled scorer ends up being used.
+    """
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+
+class ModelGeneration:
+    """Every registered model for one version, each built on first use."""
+
+    def __init__(self, registry, version, path):
+        self.registry = registry
+        self.version = version
+        self.path = path
+        self.items = {}
+        self.loaded_in_pid = {}
+        self.activated_at = None
+        self._lock = threading.RLock()
+
+    def path_for(self, filename):
+        return os.path.join(self.path, filename)
+
+    def metadata(self):
+        for name in ("metadata.json", "training_summary.json"):
+            try:
+                with open(self.path_for(name), "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def get(self, name):
+        try:
+            return self.items[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self.items:
+                loader = self.registry._loaders.get(name)
+                if loader is None:
+                    raise KeyError(f"Unknown model: {name}")
+                with self.registry.phase(f"load:{name}@{self.version}"):
+                    self.items[name] = loader(self)
+                self.loaded_in_pid[name] = os.getpid()
+            return self.items[name]
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._local = threading.local()
+        self._swap_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._current = ModelGeneration(self, DEFAULT_VERSION, "")
+        self.model_dir = None
+        self.watch_interval = 0
+        self.warm = None
+        self._watcher_pid = None
+        self._failed_version = None
+        self.timings = {}
+
+    # ---------- registration / lookup ----------
+
+    def register(self, name, loader):
+        """loader(generation) -> object; called once per version, on first use."""
+        self._loaders[name] = loader
+
+    def current(self):
+        """The generation pinned by this thread's request, else the active one."""
+        return getattr(self._local, "generation", None) or self._current
+
+    def get(self, name):
+        return self.current().get(name)
+
+    def lazy(self, name):
+        generation = self.current()
+        if name in generation.items:
+            return generation.items[name]
+        return LazyModel(self, name)
+
+    def loaded(self, name):
+        return name in self.current().items
+
+    def preload(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def pin(self, generation=None):
+        """Use one generation for the rest of this thread's request."""
+        self._local.generation = generation or self._current
+        return self._local.generation
+
+    def unpin(self):
+        self._local.generation = None
+
+    @contextmanager
+    def pinned(self, generation=None):
+        previous = getattr(self._local, "generation", None)
+        self._local.generation = generation or self._current
+        try:
+            yield self._local.generation
+        finally:
+            self._local.generation = previous
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block and record it under `name` (seconds)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - t0, 4)
+
+    # ---------- versions ----------
+
+    def use_directory(self, model_dir, watch_interval=10.0, warm=None):
+        """Serve versions from model_dir (if it exists) and follow its CURRENT file.
+
+        warm(generation) is called on a new generation before it goes
+        live; it should load what requests need and score a canary batch,
+        raising if the version is unusable.
+        """
+        self.model_dir = model_dir
+        self.watch_interval = watch_interval
+        self.warm = warm
+        version = self.current_pointer()
+        if version is not None:
+            self._current = ModelGeneration(self, version, os.path.join(model_dir, version))
+            self._current.activated_at = time.time()
+            print(f"[INFO] Model version: {version}")
+
+    def versions(self):
+        if not self.model_dir or not os.path.isdir(self.model_dir):
+            return []
+        return sorted(
+            d for d in os.listdir(self.model_dir)
+            if os.path.isdir(os.path.join(self.model_dir, d)) and not d.startswith(".")
+            and not d.endswith(".tmp")
+        )
+
+    def current_pointer(self):
+        """Version named in CURRENT, else the newest version directory, else None."""
+        if not self.model_dir:
+            return None
+        try:
+            with open(os.path.join(self.model_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def write_pointer(self, version):
+        """Point CURRENT at `version` (atomic rename)."""
+        path = os.path.join(self.model_dir, CURRENT_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version + "\n")
+        os.replace(tmp, path)
+
+    def publish(self, version, files, activate=False):
+        """Copy `files` into a new version directory; optionally point CURRENT at it."""
+        target = os.path.join(self.model_dir, version)
+        if os.path.exists(target):
+            raise ValueError(f"Version already exists: {target}")
+        # Copy into a temporary directory and rename, so watchers never
+        # see a half-copied version.
+        tmp = target + ".tmp"
+        os.makedirs(tmp)
+        for path in files:
+            shutil.copy2(path, tmp)
+        os.replace(tmp, target)
+        if activate:
+            self.write_pointer(version)
+        return target
+
+    def activate(self, version):
+        """Build, warm and switch to `version`; the old generation keeps serving until then."""
+        if not self.model_dir or version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        with self._swap_lock:
+            if version == self._current.version:
+                return self._current
+            generation = ModelGeneration(self, version, os.path.join(self.model_dir, version))
+            with self.phase(f"warm@{version}"):
+                if self.warm is not None:
+                    self.warm(generation)
+            generation.activated_at = time.time()
+            previous, self._current = self._current, generation
+        print(f"[INFO] Model version {previous.version} -> {version}")
+        return generation
+
+    def ensure_watcher(self):
+        """Start this process's CURRENT-file watcher (again after a fork)."""
+        if not self.model_dir or self.watch_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch_loop, name="model-watcher", daemon=True).start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.watch_interval)
+            version = None
+            try:
+                version = self.current_pointer()
+                if version in (None, self._current.version, self._failed_version):
+                    continue
+                self.activate(version)
+                self._failed_version = None
+            except Exception as e:
+                self._failed_version = version
+                print(f"[ERROR] Could not activate model version {version}: {e}")
+
+    def info(self):
+        generation = self.current()
+        return {
+            "pid": os.getpid(),
+            "version": generation.version,
+            "activated_at": generation.activated_at,
+            "metadata": generation.metadata(),
+            "available_versions": self.versions(),
+            "models": {
+                name: {
+                    "loaded": name in generation.items,
+                    "loaded_in_pid": generation.loaded_in_pid.get(name),
+                    "type": type(generation.items[name]).__name__ if name in generation.items else None,
+                }
+                for name in self._loaders
+            },
+            "startup_phases": dict(self.timings),
+        }
+
+
+if __name__ == "__main__":
+    # python model_registry.py publish <version> <file.pkl> [...] [--activate]
+    # python model_registry.py activate <version>
+    # python model_registry.py list
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    registry = ModelRegistry()
+    registry.model_dir = os.environ.get("MODEL_DIR", os.path.join(base_dir, "models"))
+    args = sys.argv[1:]
+    command = args[0] if args else None
+
+    if command == "list":
+        current = registry.current_pointer()
+        for v in registry.versions():
+            print(("* " if v == current else "  ") + v)
+    elif command == "publish" and len(args) >= 3:
+        version, files = args[1], [a for a in args[2:] if a != "--activate"]
+        try:
+            registry.publish(version, files, activate="--activate" in args)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        print(f"[INFO] Published {len(files)} files as {version}")
+        if "--activate" in args:
+            print(f"[INFO] CURRENT -> {version}")
+    elif command == "activate" and len(args) == 2:
+        if args[1] not in registry.versions():
+            print(f"[ERROR] Unknown model version: {args[1]}")
+            sys.exit(1)
+        registry.write_pointer(args[1])
+        print(f"[INFO] CURRENT -> {args[1]}")
+    else:
+        print("usage: python model_registry.py publish <version> <file.pkl> [...] [--activate]\n"
+              "       python model_registry.py activate <version>\n"
+              "       python model_registry.py list")
+        sys.exit(2)
@@ -0,0 +1,234 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# =========================
+# MODEL SCHEMA
+# =========================
+# What the readmission models consume and where their files live: the
+# feature lists, the encoders that turn patient fields into model
+# inputs, and the artifact names. app.py serves with these and train.py
+# fits with them, so train.py does not have to import the web app.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(BASE_DIR, "models"))
+
+# =========================
+# FEATURES (DO NOT CHANGE)
+# =========================
+
+COMMON_FEATURES = [
+    "Age",
+    "Sex",
+    "Weight",
+    "Blood Pressure",
+    "Cholesterol",
+    "Insulin",
+    "Platelets",
+    "Diabetics",
+    "air_quality_index",
+    "social_event_count",
+]
+
+DIABETES_FEATURES = [
+    "Hemoglobin (g/dL)",
+    "WBC Count (10^9/L)",
+    "Platelet Count (10^9/L)",
+    "Urine Protein (mg/dL)",
+    "Urine Glucose (mg/dL)",
+]
+
+HEART_FAILURE_FEATURES = [
+    "ECG Result",
+    "Pulse Rate (bpm)",
+]
+
+ordinal_map = {
+    "Low": 1,
+    "Normal": 2,
+    "Moderate": 3,
+    "High": 4,
+    "low": 1,
+    "normal": 2,
+    "moderate": 3,
+    "high": 4,
+    "Borderline": 3,
+    "borderline": 3,
+    "Abnormal": 4,
+    "abnormal": 4,
+}
+
+# =========================
+# COMPAT FOR OLD PIPELINES
+# =========================
+
+class BloodPressureTransformer:
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X
+
+
+sys.modules["__main__"].BloodPressureTransformer = BloodPressureTransformer
+
+# =========================
+# MODEL FILES
+# =========================
+
+MODEL_FILES = {
+    "diabetes": [
+        "readmission_diabetes_RandomForest.pkl",
+        "readmission_diabetes_advanced.pkl",
+        "readmission_diabetes.pkl",
+    ],
+    "heart_disease": [
+        "readmission_heart_disease_RandomForest.pkl",
+        "readmission_heart_disease_advanced.pkl",
+        "readmission_heart_disease.pkl",
+    ],
+}
+COMPACT_MODEL_FILES = {key: f"readmission_{key}_compact.pkl" for key in MODEL_FILES}
+
+
+# =========================
+# ENCODERS
+# =========================
+
+def safe_float(value, default=0.0):
+    try:
+        if value is None:
+            return default
+        s = str(value).strip()
+        if s == "" or s.lower() in ["nan", "none", "null"]:
+            return default
+        return float(s)
+    except Exception:
+        return default
+
+
+def encode_ordinal(value, default=2):
+    if value is None:
+        return default
+    return ordinal_map.get(str(value).strip(), default)
+
+
+def encode_bp(bp_str):
+    try:
+        s, d = str(bp_str).split("/")
+        return float(s) / 120.0 + float(d) / 80.0
+    except Exception:
+        return 2.0
+
+
+# Vectorized counterparts used by the batch endpoint. Each takes a
+# pandas Series (or anything Series() accepts) and returns a float64 array
+# with the same semantics as the scalar helper above. String handling is
+# done once per distinct value (columns like Insulin or Blood Pressure
+# repeat a few hundred values over any number of rows) and spread back
+# over the rows with the factorize codes.
+
+def distinct_strings(values):
+    """(codes, str of each distinct value) for a column."""
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=False)
+    return codes, pd.Series(uniques, dtype=object).astype(str)
+
+
+def safe_float_array(values, default=0.0):
+    s = pd.Series(values, copy=False)
+    if pd.api.types.is_bool_dtype(s):
+        s = pd.Series(np.nan, index=s.index)
+    elif not pd.api.types.is_numeric_dtype(s):
+        # to_numeric already skips surrounding whitespace; booleans are
+        # the one thing it accepts that float(str(v)) does not.
+        parsed = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        candidates = np.flatnonzero((parsed == 0) | (parsed == 1))
+        if len(candidates):
+            values = s.to_numpy()[candidates]
+            is_bool = np.fromiter((isinstance(v, (bool, np.bool_)) for v in values), bool, len(values))
+            parsed[candidates[is_bool]] = np.nan
+        s = pd.Series(parsed)
+    return s.astype("float64").fillna(default).to_numpy()
+
+
+def encode_ordinal_array(values, default=2):
+    codes, text = distinct_strings(values)
+    return text.str.strip().map(ordinal_map).astype("float64").fillna(default).to_numpy()[codes]
+
+
+def bp_readings_array(values):
+    """Systolic and diastolic arrays; both NaN where a reading is not "s/d"."""
+    codes, text = distinct_strings(values)
+    parts = text.str.split("/")
+    valid = (parts.str.len() == 2).to_numpy()
+    systolic = np.where(valid, pd.to_numeric(parts.str[0].str.strip(), errors="coerce"), np.nan)
+    diastolic = np.where(valid, pd.to_numeric(parts.str[1].str.strip(), errors="coerce"), np.nan)
+    return systolic[codes], diastolic[codes]
+
+
+def encode_bp_array(values):
+    systolic, diastolic = bp_readings_array(values)
+    valid = ~np.isnan(systolic) & ~np.isnan(diastolic)
+    return np.where(valid, systolic / 120.0 + diastolic / 80.0, 2.0)
+
+
+# =========================
+# FEATURE MATRIX (BATCH)
+# =========================
+
+def _batch_column(frame, name, default):
+    """Column `name` of frame with missing cells set to the payload default."""
+    if name not in frame.columns:
+        return pd.Series(default, index=frame.index, dtype=object)
+    col = frame[name]
+    return col.where(col.notna(), default)
+
+
+def encode_feature_matrix(frame, disease):
+    """(X, features): every row of `frame` (all one disease) encoded in one pass.
+
+    Mirrors app.build_feature_df column for column, but returns a float64
+    NumPy matrix instead of a one-row DataFrame.
+    """
+    if disease == "Diabetes":
+        features = COMMON_FEATURES + DIABETES_FEATURES
+    else:
+        features = COMMON_FEATURES + HEART_FAILURE_FEATURES
+
+    codes, sex = distinct_strings(_batch_column(frame, "Sex", "Male"))
+    is_female = (sex.str.strip().str.lower() == "female").to_numpy()[codes]
+
+    cols = {
+        "Age": safe_float_array(_batch_column(frame, "Age", 0)),
+        "Sex": is_female.astype("float64"),
+        "Weight": safe_float_array(_batch_column(frame, "Weight", 0)),
+        "Blood Pressure": encode_bp_array(_batch_column(frame, "Blood Pressure", "120/80")),
+        "Cholesterol": safe_float_array(_batch_column(frame, "Cholesterol", 0)),
+        "Insulin": encode_ordinal_array(_batch_column(frame, "Insulin", "Normal")),
+        "Platelets": safe_float_array(_batch_column(frame, "Platelets", 0)),
+        "Diabetics": encode_ordinal_array(_batch_column(frame, "Diabetics", "Normal")),
+        "air_quality_index": safe_float_array(_batch_column(frame, "air_quality_index", 50)),
+        "social_event_count": safe_float_array(_batch_column(frame, "social_event_count", 0)),
+    }
+
+    if disease == "Diabetes":
+        cols["Hemoglobin (g/dL)"] = safe_float_array(_batch_column(frame, "Hemoglobin (g/dL)", 13.5))
+        cols["WBC Count (10^9/L)"] = safe_float_array(_batch_column(frame, "WBC Count (10^9/L)", 7.0))
+        cols["Platelet Count (10^9/L)"] = safe_float_array(_batch_column(frame, "Platelet Count (10^9/L)", 250))
+        cols["Urine Protein (mg/dL)"] = safe_float_array(_batch_column(frame, "Urine Protein (mg/dL)", 10))
+        cols["Urine Glucose (mg/dL)"] = safe_float_array(_batch_column(frame, "Urine Glucose (mg/dL)", 5))
+    else:
+        cols["ECG Result"] = encode_ordinal_array(_batch_column(frame, "ECG Result", "Normal"))
+        cols["Pulse Rate (bpm)"] = safe_float_array(_batch_column(frame, "Pulse Rate (bpm)", 72))
+
+    X = np.empty((len(frame), len(features)), dtype="float64")
+    for j, name in enumerate(features):
+        X[:, j] = cols[name]
+    return X, features
+
+
+def batch_disease_mask(frame):
+    """Boolean mask of rows routed to the diabetes model."""
+    codes, problem = distinct_strings(_batch_column(frame, "Problem Type", ""))
+    return problem.str.lower().str.contains("diab", regex=False).to_numpy()[codes]
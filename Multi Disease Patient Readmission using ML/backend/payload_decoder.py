@@ -0,0 +1,112 @@
+import numpy as np
+
+# =========================
+# PAYLOAD DECODER
+# =========================
+# Turns one patient's parsed JSON dict into the model's float64 feature
+# vector. A decoder is built once per feature list from a field schema
+# (kind + value used when the key is absent); decoding is then a single
+# pass over the fields with one parser per kind, writing into an array
+# allocated at its final size. Values it cannot read are reported per
+# field and replaced the way app.py always did, so results are the same
+# as with safe_float / encode_ordinal / encode_bp:
+#
+#   number    blank, None or "nan"/"none"/"null" -> 0.0, unparsable -> 0.0
+#   ordinal   ordinal_map lookup, anything else -> 2.0
+#   bp        "systolic/diastolic" -> s/120 + d/80, anything else -> 2.0
+#   sex       "female" (any case) -> 1.0, else 0.0
+#
+# NaN never reaches the vector (it becomes 0.0, as the final safe_float
+# pass over the row did).
+
+_MISSING = object()
+_BLANKS = ("nan", "none", "null")
+_SAFE_INT = 2 ** 53
+
+
+def _number(value):
+    t = type(value)
+    if t is float:
+        return (value if value == value else 0.0), None
+    if t is int and -_SAFE_INT <= value <= _SAFE_INT:
+        return float(value), None
+    if value is None:
+        return 0.0, None
+    try:
+        s = str(value).strip()
+        if s == "" or s.lower() in _BLANKS:
+            return 0.0, None
+        x = float(s)
+    except Exception:
+        return 0.0, f"expected a number, got {value!r}"
+    return (x if x == x else 0.0), None
+
+
+def _bp(value):
+    if value is None:
+        return 2.0, None
+    try:
+        s, d = str(value).split("/")
+        x = float(s) / 120.0 + float(d) / 80.0
+    except Exception:
+        if str(value).strip() == "":
+            return 2.0, None
+        return 2.0, f"expected systolic/diastolic such as 120/80, got {value!r}"
+    return (x if x == x else 0.0), None
+
+
+def _sex(value):
+    if not value:
+        return 0.0, None
+    if not isinstance(value, str):
+        return 0.0, f"expected Male or Female, got {value!r}"
+    s = value.strip().lower()
+    if s == "female":
+        return 1.0, None
+    if s in ("male", ""):
+        return 0.0, None
+    return 0.0, f"expected Male or Female, got {value!r}"
+
+
+def _ordinal_parser(ordinal_map, default=2):
+    choices = ", ".join(dict.fromkeys(k.capitalize() for k in ordinal_map))
+
+    def parse(value):
+        if value is None:
+            return float(default), None
+        s = str(value).strip()
+        code = ordinal_map.get(s)
+        if code is not None:
+            return float(code), None
+        return float(default), (None if s == "" else f"expected one of {choices}, got {value!r}")
+
+    return parse
+
+
+class PayloadDecoder:
+    """Decodes payload dicts into float64 vectors laid out as `features`."""
+
+    def __init__(self, features, schema, ordinal_map):
+        parsers = {"number": _number, "bp": _bp, "sex": _sex, "ordinal": _ordinal_parser(ordinal_map)}
+        self.features = list(features)
+        self.plan = []
+        for i, name in enumerate(self.features):
+            kind, missing = schema[name]
+            # The value for an absent key goes through the same parser
+            # once, here, instead of on every request.
+            self.plan.append((i, name, parsers[kind], parsers[kind](missing)[0]))
+
+    def decode(self, payload):
+        """(vector, {field: error}) for one payload dict."""
+        out = np.empty(len(self.plan), dtype="float64")
+        errors = {}
+        get = payload.get
+        for i, name, parse, missing in self.plan:
+            value = get(name, _MISSING)
+            if value is _MISSING:
+                out[i] = missing
+                continue
+            out[i], error = parse(value)
+            if error is not None:
+                errors[name] = error
+        return out, errors
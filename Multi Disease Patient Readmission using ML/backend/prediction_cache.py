@@ -0,0 +1,126 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# =========================
+# PREDICTION CACHE
+# =========================
+# Raw model probabilities keyed on sha1(model tag, disease, encoded
+# feature vector). A bounded in-process LRU sits in front of an optional
+# SQLite file (WAL) that all gunicorn workers share, so /api/predict,
+# /api/simulate_staffing and /api/report for the same patient score the
+# model once between them, whichever worker serves each call. The model
+# tag changes with the model files, so a new version never sees old
+# entries.
+
+
+class PredictionCache:
+    def __init__(self, maxsize=4096, db_path=None, ttl_seconds=24 * 3600):
+        self.maxsize = maxsize
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.db_path:
+            self._conn().executescript(
+                """
+                CREATE TABLE IF NOT EXISTS predictions (
+                    key TEXT PRIMARY KEY,
+                    probability REAL NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions(created_at);
+                """
+            )
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 or bool(self.db_path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def key(model_tag, disease, values):
+        h = hashlib.sha1(f"{model_tag}|{disease}|".encode())
+        h.update(np.asarray(values, dtype="float64").tobytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.db_path:
+            try:
+                row = self._conn().execute(
+                    "SELECT probability FROM predictions WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - self.ttl_seconds),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"[WARN] Prediction cache read failed: {e}")
+                row = None
+            if row is not None:
+                self._remember(key, row[0])
+                with self._lock:
+                    self.disk_hits += 1
+                return row[0]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        value = float(value)
+        self._remember(key, value)
+        if self.db_path:
+            try:
+                conn = self._conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, probability, created_at) VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                self._puts += 1
+                if self._puts % 1000 == 0:
+                    conn.execute("DELETE FROM predictions WHERE created_at < ?",
+                                 (time.time() - self.ttl_seconds,))
+            except sqlite3.Error as e:
+                print(f"[WARN] Prediction cache write failed: {e}")
+
+    def _remember(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "shared_db": self.db_path,
+        }
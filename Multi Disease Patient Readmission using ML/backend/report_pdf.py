@@ -0,0 +1,589 @@
+import os
+import io
+import re
+import copy
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Prevent GUI-related warnings
+from matplotlib.figure import Figure
+from functools import lru_cache
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics import renderPDF
+from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfdoc
+from reportlab import rl_config, Version as REPORTLAB_VERSION
+from request_timing import phase
+
+# Report rendering lives apart from app.py so that process-pool workers
+# can import it without loading the models or opening the follow-up store.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# =========================
+# EXTRA VISUALIZATION FUNCTION
+# =========================
+
+# Charts are rendered into memory and kept in an LRU cache. The heart
+# (ECG) and default charts never change; diabetes charts are keyed on
+# the three marker values rounded to SIGNAL_CHART_PRECISION decimals.
+SIGNAL_CHART_CACHE_SIZE = 256
+SIGNAL_CHART_PRECISION = 1
+
+
+@lru_cache(maxsize=SIGNAL_CHART_CACHE_SIZE)
+def _render_signal_chart(kind, h=0.0, p=0.0, g=0.0):
+    # Object-oriented Figure instead of pyplot: no global figure state,
+    # so concurrent threads cannot draw into each other's chart.
+    fig = Figure(figsize=(4, 1.5))
+    ax = fig.subplots()
+
+    if kind == "heart":
+        # Simulated ECG for heart patients
+        t = np.linspace(0, 2*np.pi, 200)
+        ecg = np.sin(5*t) * (np.sin(2*t) > 0)
+        ax.plot(t, ecg, color="#d60000", linewidth=1.8)
+        ax.set_title("ECG Trend", color="#0056A4", fontsize=9)
+        ax.axis('off')
+
+    elif kind == "diabetes":
+        # Bar chart for diabetes markers
+        labels = ["Hemoglobin", "Urine Protein", "Urine Glucose"]
+        values = [h, p, g]
+        colors = ["#0078FF", "#00A36C", "#E63946"]
+
+        ax.bar(labels, values, color=colors)
+        ax.set_title("Key Diabetes Marker Levels", color="#0056A4", fontsize=9)
+        ax.set_ylabel("Value")
+        ax.grid(axis="y", linestyle="--", alpha=0.4)
+
+    else:
+        # Default flat trend
+        x = np.arange(10)
+        y = np.ones(10) * 5
+        ax.plot(x, y, color="#0078FF", linewidth=2)
+        ax.set_title("Stability Trend", color="#0056A4", fontsize=9)
+        ax.axis('off')
+
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", transparent=True)
+    return buf.getvalue()
+
+
+def _marker(data, key):
+    try:
+        value = float(data.get(key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value
+
+
+def generate_signal_chart(disease_type, data=None):
+    """Generate ECG-like or glucose marker chart; returns PNG bytes."""
+    if "heart" in disease_type.lower():
+        return _render_signal_chart("heart")
+
+    if "diabet" in disease_type.lower():
+        data = data or {}
+        return _render_signal_chart(
+            "diabetes",
+            round(_marker(data, "Hemoglobin (g/dL)"), SIGNAL_CHART_PRECISION),
+            round(_marker(data, "Urine Protein (mg/dL)"), SIGNAL_CHART_PRECISION),
+            round(_marker(data, "Urine Glucose (mg/dL)"), SIGNAL_CHART_PRECISION),
+        )
+
+    return _render_signal_chart("default")
+
+
+def signal_chart_cache_stats():
+    info = _render_signal_chart.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
+# =========================
+# PDF REPORT PAGE
+# =========================
+# The page is drawn in two layers. The static layer (header bar, logo,
+# titles, the details box, section headings, signature line, footer) is
+# the same for every patient; the patient layer holds the values, the
+# pie chart, the signal chart and the key risk factors. Section positions
+# are fixed, points from the bottom of the page.
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LOGO_PATH = os.path.join(BASE_DIR, "umkc_logo.png")
+BRAND_BLUE = colors.HexColor("#0056A4")
+
+BOX_TOP = PAGE_HEIGHT - 120
+BOX_HEIGHT = 130
+RISK_Y = BOX_TOP - BOX_HEIGHT - 10
+VISUAL_Y = RISK_Y - 68
+FOLLOWUP_Y = VISUAL_Y - 150
+STAFFING_Y = FOLLOWUP_Y - 75
+EXPLAIN_Y = STAFFING_Y - 60
+SIGNATURE_Y = EXPLAIN_Y - 125
+
+# Key Risk Factors: the largest contributions from app.explain_patients,
+# one row each, with a bar of up to EXPLAIN_BAR_WIDTH points either side
+# of x = EXPLAIN_BAR_X (red raises the risk, green lowers it).
+EXPLAIN_ROWS = 5
+EXPLAIN_BAR_X = 360
+EXPLAIN_BAR_WIDTH = 90
+
+SECTION_TITLES = (
+    (RISK_Y, "Risk Summary"),
+    (VISUAL_Y, "Clinical Visualization"),
+    (FOLLOWUP_Y, "Follow-up & Care Plan"),
+    (STAFFING_Y, "Resource Simulation Summary"),
+    (EXPLAIN_Y, "Key Risk Factors"),
+)
+
+
+def draw_static_layer(c, logo=None):
+    """Draw the parts of the report page that do not depend on the patient.
+
+    `logo` is a file path or a PreparedImage.
+    """
+    width, height = PAGE_WIDTH, PAGE_HEIGHT
+
+    # --- Header ---
+    c.setFillColorRGB(0, 0.33, 0.64)
+    c.rect(0, height - 60, width, 60, fill=True, stroke=False)
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica-Bold", 20)
+    c.drawString(40, height - 40, "UMKC Hospital Analytics")
+
+    if isinstance(logo, PreparedImage):
+        logo.draw(c, width - 140, height - 55, 90, 45)
+    elif logo:
+        c.drawImage(logo, width - 140, height - 55, width=90, height=45, mask='auto')
+
+    c.setFillColor(BRAND_BLUE)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(40, height - 100, "Patient Readmission Risk Report")
+
+    # --- Patient & Admission Details box ---
+    c.setFillColor(colors.lightgrey)
+    c.roundRect(35, BOX_TOP - BOX_HEIGHT, width - 70, BOX_HEIGHT, 10, fill=True, stroke=False)
+
+    # --- Section headings ---
+    c.setFont("Helvetica-Bold", 13)
+    c.setFillColor(BRAND_BLUE)
+    for y, title in SECTION_TITLES:
+        c.drawString(40, y, title)
+
+    # --- Signature Line ---
+    c.setStrokeColor(colors.black)
+    c.line(width/2 - 100, SIGNATURE_Y, width/2 + 100, SIGNATURE_Y)
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Oblique", 10)
+    c.drawCentredString(width / 2, SIGNATURE_Y - 15, "Physician-in-Charge Signature")
+
+    # --- Footer ---
+    c.setFillColorRGB(0, 0.33, 0.64)
+    c.rect(0, 0, width, 55, fill=True, stroke=False)
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica", 9)
+    c.drawCentredString(width / 2, 30, "© 2025 UMKC Hospital Analytics | AI-Driven Readmission Predictor")
+    c.setFont("Helvetica", 8.5)
+    c.drawCentredString(width / 2, 16, "UMKC Hospital Unit, Kansas City, Missouri, 64111")
+
+
+def _factor_value(value):
+    if isinstance(value, float):
+        return f"{value:g}"
+    return "N/A" if value is None else str(value)
+
+
+def draw_explanation(c, explanation):
+    """Draw the Key Risk Factors rows, or a note when there is no explanation."""
+    y = EXPLAIN_Y - 18
+    c.setFont("Helvetica", 9)
+    rows = (explanation or {}).get("contributions", [])[:EXPLAIN_ROWS]
+    if not rows:
+        c.setFillColor(colors.grey)
+        c.drawString(50, y, "Not available for this report.")
+        return
+
+    units = "probability" if explanation.get("output") == "probability" else "log-odds"
+    c.setFont("Helvetica", 8)
+    c.setFillColor(colors.grey)
+    c.drawRightString(PAGE_WIDTH - 40, EXPLAIN_Y, f"Contribution to the model's readmission {units}")
+
+    largest = max(abs(r["contribution"]) for r in rows) or 1.0
+    c.setFont("Helvetica", 9)
+    for r in rows:
+        c.setFillColor(colors.black)
+        c.drawString(50, y, f"{r['feature']}: {_factor_value(r['value'])}")
+        c.drawString(EXPLAIN_BAR_X + EXPLAIN_BAR_WIDTH + 10, y, f"{r['contribution']:+.4f}")
+        c.setFillColor(colors.red if r["contribution"] > 0 else colors.green)
+        c.rect(EXPLAIN_BAR_X, y - 1, EXPLAIN_BAR_WIDTH * r["contribution"] / largest, 8, fill=True, stroke=False)
+        y -= 13
+    c.setStrokeColor(colors.grey)
+    c.line(EXPLAIN_BAR_X, EXPLAIN_Y - 9, EXPLAIN_BAR_X, y + 9)
+
+
+def draw_patient_layer(c, data, disease, adj_prob, risk, followup, staffing, explanation=None,
+                       prepared_images=False):
+    """Draw one patient's values and charts over the static layer."""
+    # --- Patient & Admission Details ---
+    box_top = BOX_TOP
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+
+    # Left column (general info)
+    c.drawString(50, box_top - 15, f"Patient Name: {data.get('Patient Name', 'N/A')}")
+    c.drawString(50, box_top - 30, f"Admission Date: {data.get('Admission Date', 'N/A')}")
+    c.drawString(50, box_top - 45, f"Simulation Date: {data.get('Simulation Date', 'N/A')}")
+    c.drawString(50, box_top - 60, f"Age: {data.get('Age', 'N/A')} | Sex: {data.get('Sex', 'N/A')} | Weight: {data.get('Weight', 'N/A')} kg")
+    c.drawString(50, box_top - 75, f"Blood Pressure: {data.get('Blood Pressure', 'N/A')} | Cholesterol: {data.get('Cholesterol', 'N/A')}")
+    c.drawString(50, box_top - 90, f"Insulin: {data.get('Insulin', 'N/A')} | Diabetics Status: {data.get('Diabetics', 'N/A')}")
+
+    # Right column (hospital + cardiac/diabetes markers)
+    c.drawString(280, box_top - 15, f"Patient ID: {data.get('Patient ID', 'N/A')}")
+    c.drawString(280, box_top - 30, f"Discharge Date: {data.get('Discharge Date', 'N/A')}")
+    c.drawString(280, box_top - 45, f"Hospital / Unit: {data.get('Hospital Unit', 'N/A')}")
+
+    if "heart" in disease.lower():
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(280, box_top - 65, "Cardiac Overview")
+        c.setFont("Helvetica", 9)
+        c.drawString(280, box_top - 80, f"ECG Result: {data.get('ECG Result', 'N/A')}")
+        c.drawString(280, box_top - 95, f"Pulse Rate: {data.get('Pulse Rate (bpm)', 'N/A')} bpm")
+    elif "diabet" in disease.lower():
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(280, box_top - 65, "Key Diabetes Markers")
+        c.setFont("Helvetica", 9)
+        c.drawString(280, box_top - 80, f"Hemoglobin: {data.get('Hemoglobin (g/dL)', 'N/A')}")
+        c.drawString(280, box_top - 95, f"Urine Protein: {data.get('Urine Protein (mg/dL)', 'N/A')}")
+        c.drawString(280, box_top - 110, f"Urine Glucose: {data.get('Urine Glucose (mg/dL)', 'N/A')}")
+
+    # --- Risk Summary ---
+    y = RISK_Y - 18
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawString(50, y, f"Disease Type: {disease}")
+    y -= 15
+    c.drawString(50, y, f"Predicted Readmission: {'Yes' if adj_prob >= 0.5 else 'No'}")
+    y -= 15
+    c.drawString(50, y, f"Readmission Probability: {adj_prob:.4f} ({risk})")
+
+    # --- Clinical Visualization ---
+    y = VISUAL_Y - 10
+    prob = max(0.0, min(adj_prob, 1.0))
+    d = Drawing(120, 100)
+    pie = Pie()
+    pie.x = 20
+    pie.y = 10
+    pie.width = 100
+    pie.height = 100
+    pie.data = [prob, 1 - prob]
+    pie.labels = [f"Risk {prob:.2f}", f"Safe {1 - prob:.2f}"]
+    pie.slices[0].fillColor = colors.red
+    pie.slices[1].fillColor = colors.green
+    d.add(pie)
+    renderPDF.draw(d, c, 60, y - 110)
+
+    with phase("chart"):
+        chart_png = generate_signal_chart(disease, data)
+    if prepared_images:
+        signal_chart_image(chart_png).draw(c, 250, y - 80, 250, 90)
+    else:
+        c.drawImage(ImageReader(io.BytesIO(chart_png)), 250, y - 80, width=250, height=90)
+
+    # --- Follow-up Plan ---
+    y = FOLLOWUP_Y - 20
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawString(50, y, f"Channel: {followup['channel']}")
+    y -= 15
+    c.drawString(50, y, f"Schedule: {', '.join(followup['schedule'])}")
+    y -= 15
+    c.drawString(50, y, f"Note: {followup['note']}")
+
+    # --- Staffing Suggestion ---
+    y = STAFFING_Y - 20
+    c.drawString(50, y, f"Expected Readmissions: {staffing['expected_readmissions']}")
+    y -= 15
+    c.drawString(50, y, f"Beds: {staffing['suggested_beds']} | Nurses: {staffing['suggested_nurses']} | Doctors: {staffing['suggested_doctors']}")
+
+    # --- Key Risk Factors ---
+    draw_explanation(c, explanation)
+
+
+def draw_report_page(c, data, disease, adj_prob, risk, followup, staffing, explanation=None,
+                     template=None):
+    """Draw one patient's A4 readmission report onto canvas `c`.
+
+    `explanation` is an app.explain_patients result (None leaves the Key
+    Risk Factors section marked as not available).
+
+    With a ReportTemplate the static layer is stamped from it and the
+    signal chart comes from signal_chart_image(); without one everything
+    is drawn call by call (and the logo read from disk).
+    """
+    if template is None or not template.stamp(c):
+        draw_static_layer(c, LOGO_PATH if os.path.exists(LOGO_PATH) else None)
+    draw_patient_layer(c, data, disease, adj_prob, risk, followup, staffing, explanation,
+                       prepared_images=template is not None)
+    c.showPage()
+
+
+# =========================
+# REPORT TEMPLATE
+# =========================
+# The static layer is drawn once per process on a scratch canvas. Its PDF
+# operators are kept already compressed, and every report gets them as
+# a single form XObject: adding it to the document is a few dictionary
+# entries instead of some forty canvas calls. Images (the logo, and the
+# signal charts, which the chart cache hands out as the same PNG bytes
+# again and again) are kept as PreparedImage: decoded, compressed and
+# ASCII85-encoded once instead of on every report.
+#
+# The operators name fonts by the document's internal names (F1, F2,
+# ...), so stamp() registers the fonts in the scratch canvas's order
+# first, and draws the layer the slow way if the names do not come out
+# the same. This relies on ReportLab canvas/document internals (_doc,
+# _code, idToObject, ...), checked against the reportlab range pinned in
+# requirements.txt. report_template() builds the template and stamps a
+# probe page on first use; if a reportlab release has moved any of those
+# internals, the process draws every page with plain canvas calls, as
+# REPORT_TEMPLATE=0 does. The logo is looked up when the template is
+# built, once per process.
+
+REPORT_TEMPLATE = os.environ.get("REPORT_TEMPLATE", "1") != "0"
+
+
+def _unregistered(obj):
+    """Copy of a PDF object that another document can register."""
+    obj = copy.copy(obj)
+    obj.__dict__.pop(pdfdoc.__InternalName__, None)
+    obj.__dict__.pop("smask", None)
+    return obj
+
+
+class PreparedImage:
+    """An image XObject built once and added to any number of documents."""
+
+    def __init__(self, source, mask=None):
+        scratch = canvas.Canvas(io.BytesIO(), pagesize=A4)
+        scratch.drawImage(source, 0, 0, width=1, height=1, mask=mask)
+        doc = scratch._doc
+        self.name = scratch._formsinuse[0]
+        image = doc.idToObject[doc.getXObjectName(self.name)]
+        smask = getattr(image, "smask", None)
+        self.smask = (smask.name, _unregistered(doc.idToObject[smask.name])) if smask is not None else None
+        self.image = _unregistered(image)
+
+    def register(self, doc):
+        if doc.getXObjectName(self.name) in doc.idToObject:
+            return
+        image = copy.copy(self.image)
+        doc.addForm(self.name, image)
+        if self.smask is not None:
+            smask_name, smask = self.smask
+            image.smask = doc.Reference(copy.copy(smask), smask_name)
+
+    def draw(self, c, x, y, width, height):
+        """Same operators as c.drawImage(source, x, y, width, height, mask)."""
+        self.register(c._doc)
+        c._currentPageHasImages = 1
+        c.saveState()
+        c.translate(x, y)
+        c.scale(width, height)
+        c._code.append("/%s Do" % c._doc.getXObjectName(self.name))
+        c.restoreState()
+        c._formsinuse.append(self.name)
+
+
+@lru_cache(maxsize=SIGNAL_CHART_CACHE_SIZE)
+def signal_chart_image(chart_png):
+    return PreparedImage(ImageReader(io.BytesIO(chart_png)))
+
+
+class ReportTemplate:
+    FORM_NAME = "ReportStaticLayer"
+
+    def __init__(self, logo_path=None):
+        self.logo = PreparedImage(logo_path, mask='auto') if logo_path else None
+        scratch = canvas.Canvas(io.BytesIO(), pagesize=A4)
+        draw_static_layer(scratch, self.logo)
+
+        self.fonts = sorted(scratch._doc.fontMapping.items(), key=lambda item: int(item[1].lstrip("/F")))
+        filters = [pdfdoc.PDFBase85Encode, pdfdoc.PDFZCompress] if rl_config.useA85 else [pdfdoc.PDFZCompress]
+        content = pdfdoc.pdfdocEnc("\n".join([scratch._preamble] + scratch._code))
+        for f in reversed(filters):
+            content = f.encode(content)
+        self.stream = content
+        self.filter_names = [f.pdfname for f in filters]
+
+    def stamp(self, c):
+        """Add the static layer to the current page of `c`; False if it cannot."""
+        doc = c._doc
+        for psname, internal in self.fonts:
+            if doc.getInternalFontName(psname) != internal:
+                return False
+
+        form = pdfdoc.PDFFormXObject(0, 0, PAGE_WIDTH, PAGE_HEIGHT)
+        form.Contents = pdfdoc.PDFStream(
+            pdfdoc.PDFDictionary({"Filter": pdfdoc.PDFArray([pdfdoc.PDFName(n) for n in self.filter_names])}),
+            self.stream,
+        )
+        if self.logo is not None:
+            self.logo.register(doc)
+            form.XObjects = doc.xobjDict([self.logo.name])
+            c._currentPageHasImages = 1
+        doc.addForm(self.FORM_NAME, form)
+        c.doForm(self.FORM_NAME)
+        return True
+
+
+@lru_cache(maxsize=1)
+def report_template():
+    """The process's ReportTemplate, or None when this reportlab cannot build one."""
+    from PIL import Image
+
+    try:
+        template = ReportTemplate(LOGO_PATH if os.path.exists(LOGO_PATH) else None)
+        probe = canvas.Canvas(io.BytesIO(), pagesize=A4)
+        if not template.stamp(probe):
+            raise KeyError("static layer fonts registered in a different order")
+        PreparedImage(ImageReader(Image.new("RGB", (1, 1)))).draw(probe, 0, 0, 1, 1)
+        probe.showPage()
+        probe.save()
+    except (AttributeError, KeyError) as e:
+        print(f"[WARN] Report template unavailable with reportlab {REPORTLAB_VERSION} ({e!r}); "
+              "drawing report pages call by call")
+        return None
+    return template
+
+
+def render_report_pdf(data, disease, adj_prob, risk, followup, staffing, explanation=None):
+    """One-page report as PDF bytes."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    template = report_template() if REPORT_TEMPLATE else None
+    draw_report_page(c, data, disease, adj_prob, risk, followup, staffing, explanation, template=template)
+    c.save()
+    return buffer.getvalue()
+
+
+def render_report_job(args):
+    """Process-pool entry point: args is the render_report_pdf argument tuple."""
+    return render_report_pdf(*args)
+
+
+# =========================
+# STREAMING PDF MERGE
+# =========================
+
+_OBJ_HEADER = re.compile(rb"\d+ 0 obj\r?\n")
+_REF = re.compile(rb"(?<![\d.])(\d+) 0 R\b")
+_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+
+
+def _pdf_objects(pdf):
+    """{object number: body} of a ReportLab PDF, located through its xref table."""
+    startxref = int(pdf[pdf.rindex(b"startxref") + len(b"startxref"):].split()[0])
+    trailer_at = pdf.index(b"trailer", startxref)
+    entries = _XREF_ENTRY.findall(pdf[startxref:trailer_at])
+    offsets = {num: int(off) for num, (off, _, kind) in enumerate(entries) if kind == b"n"}
+
+    ends = sorted(offsets.values()) + [startxref]
+    objects = {}
+    for num, off in offsets.items():
+        end = ends[ends.index(off) + 1]
+        chunk = pdf[off:end]
+        chunk = chunk[_OBJ_HEADER.match(chunk).end():]
+        objects[num] = chunk[:chunk.rindex(b"endobj")]
+
+    info = re.search(rb"/Info (\d+) 0 R", pdf[trailer_at:])
+    return objects, int(info.group(1)) if info else None
+
+
+class PdfMergeStream:
+    """Concatenate single-document PDFs into one PDF, chunk by chunk.
+
+    Each add() returns the bytes for that document's pages, ready to be
+    streamed; only object offsets and page ids are kept between calls.
+    Call header() first and finish() last.
+    """
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self):
+        self.pos = 0
+        self.next_id = 3
+        self.offsets = {}
+        self.kids = []
+
+    def _obj(self, num, body):
+        data = b"%d 0 obj\n" % num + body + b"endobj\n"
+        self.offsets[num] = self.pos
+        self.pos += len(data)
+        return data
+
+    def header(self):
+        data = b"%PDF-1.4\n%\x93\x8c\x8b\x9e\n"
+        self.pos += len(data)
+        return data
+
+    def add(self, pdf):
+        objects, info_id = _pdf_objects(pdf)
+        skip = {info_id}
+        mapping = {}
+        pages_in = []
+        for num, body in objects.items():
+            head = body.split(b"stream", 1)[0]
+            if re.search(rb"/Type /Catalog\b", head) or re.search(rb"/Type /Outlines\b", head):
+                skip.add(num)
+            elif re.search(rb"/Type /Pages\b", head):
+                skip.add(num)
+                mapping[num] = self.PAGES_ID
+            elif re.search(rb"/Type /Page\b", head):
+                pages_in.append(num)
+        for num in sorted(objects):
+            if num not in skip:
+                mapping[num] = self.next_id
+                self.next_id += 1
+
+        def renumber(m):
+            return b"%d 0 R" % mapping[int(m.group(1))]
+
+        out = []
+        for num in sorted(objects):
+            if num in skip:
+                continue
+            body = objects[num]
+            # Only the dictionary is rewritten; stream data stays untouched.
+            split = body.find(b"stream")
+            if split == -1:
+                body = _REF.sub(renumber, body)
+            else:
+                body = _REF.sub(renumber, body[:split]) + body[split:]
+            out.append(self._obj(mapping[num], body))
+        self.kids.extend(mapping[n] for n in pages_in)
+        return b"".join(out)
+
+    def finish(self):
+        kids = b" ".join(b"%d 0 R" % k for k in self.kids)
+        out = [
+            self._obj(self.PAGES_ID, b"<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>\n" % (len(self.kids), kids)),
+            self._obj(self.CATALOG_ID, b"<<\n/Pages %d 0 R /Type /Catalog\n>>\n" % self.PAGES_ID),
+        ]
+        size = self.next_id
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for num in range(1, size):
+            xref.append(b"%010d 00000 n \n" % self.offsets[num])
+        out.append(b"".join(xref))
+        out.append(b"trailer\n<<\n/Root %d 0 R /Size %d\n>>\nstartxref\n%d\n%%%%EOF\n" % (self.CATALOG_ID, size, self.pos))
+        return b"".join(out)
@@ -0,0 +1,139 @@
+import os
+import re
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+# =========================
+# REQUEST PHASE TIMINGS
+# =========================
+# With SERVER_TIMING=1 each request records the time it spends in named
+# phases (feature, model, severity, staffing, explain, pdf, chart, storage)
+# and returns them in a Server-Timing response header, e.g.
+#
+#     Server-Timing: feature;dur=0.041, model;dur=0.210, total;dur=1.92
+#
+# (milliseconds). benchmarks/bench_api.py reads the header, so the same
+# breakdown is available from the Flask test client and from a running
+# gunicorn. Phases may nest (chart runs inside pdf); a phase's time
+# excludes the phases inside it, so the values add up to at most total.
+# Off by default; phase() is then a no-op outside a timed request.
+# app.py also starts collection when /metrics is on (metrics.py), which
+# turns the same phases into histograms.
+
+ENABLED = os.environ.get("SERVER_TIMING", "0") == "1"
+
+_local = threading.local()
+
+
+def start():
+    """Begin collecting phases for the current thread's request."""
+    _local.phases = {}
+    _local.nested = []
+    _local.started = time.perf_counter()
+
+
+def finish():
+    """Stop collecting; returns (phases in seconds, total seconds) or None."""
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        return None
+    _local.phases = None
+    return phases, time.perf_counter() - _local.started
+
+
+@contextmanager
+def phase(name):
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        yield
+        return
+    nested = _local.nested
+    nested.append(0.0)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        inner = nested.pop()
+        phases[name] = phases.get(name, 0.0) + elapsed - inner
+        if nested:
+            nested[-1] += elapsed
+
+
+def header(phases, total):
+    """Server-Timing header value for finish()'s result."""
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in phases.items()]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+def parse_header(value):
+    """{phase: milliseconds} from a Server-Timing header value."""
+    timings = {}
+    for part in (value or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, dur = param.strip().partition("=")
+            if key == "dur" and name:
+                timings[name] = float(dur)
+    return timings
+
+
+# =========================
+# SLOW REQUEST PROFILING
+# =========================
+# With PROFILE_SAMPLE_RATE > 0 that fraction of requests runs under
+# cProfile (the request's own thread only, one request at a time per
+# process). Those that take at least PROFILE_SLOW_MS are written to
+# PROFILE_DIR as <time>-<route>-<ms>ms.prof; open them with
+# python -m pstats or snakeviz. The rest are discarded.
+
+class SlowRequestProfiler:
+    def __init__(self, sample_rate=0.0, slow_ms=500.0, directory="profiles"):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.directory = directory
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def start(self):
+        """Profile the current request if it is sampled; returns whether it is."""
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return False
+        import cProfile
+
+        _local.profile = cProfile.Profile()
+        _local.profile.enable()
+        return True
+
+    def stop(self, route, seconds):
+        """End this thread's profile; returns the dump's path if the request was slow."""
+        profile = getattr(_local, "profile", None)
+        if profile is None:
+            return None
+        self.discard()
+        ms = seconds * 1000
+        if ms < self.slow_ms:
+            return None
+        name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{ms:.0f}ms.prof")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            print(f"[WARN] Could not save profile {path}: {e}")
+            return None
+        return path
+
+    def discard(self):
+        """End this thread's profile, if any, without saving it."""
+        profile = getattr(_local, "profile", None)
+        if profile is not None:
+            profile.disable()
+            _local.profile = None
+            self._busy.release()
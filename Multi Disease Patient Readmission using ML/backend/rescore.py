@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# OFFLINE BULK RESCORING
+# =========================
+# Scores a final_dataset_realistic.csv-shaped file without the web app:
+#
+#     python rescore.py final_dataset_realistic.csv -o scored.csv
+#     python rescore.py patients.csv -o scored.parquet --workers 4 --followups
+#
+# The input is read in chunks of --chunksize rows. Each chunk is encoded
+# and scored with the same code as /api/predict/batch (build_feature_matrix,
+# predict_batch, the vectorized risk functions) in a process pool. At most
+# 2 x --workers chunks are in flight and results are written in input
+# order as they complete, so memory stays flat however long the file is.
+# Models are loaded once before the pool forks (PRELOAD_MODELS=1), as
+# under gunicorn.
+
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+import app  # noqa: E402
+
+# Input columns copied to the output when present.
+PASSTHROUGH_COLUMNS = ["Patient ID", "Patient Name", "Admission ID", "Hospital Unit", "Simulation Date"]
+
+# Everything the encoders and the severity score read; other columns of
+# the input are skipped by the CSV parser.
+INPUT_COLUMNS = set(
+    ["Problem Type"] + app.COMMON_FEATURES + app.DIABETES_FEATURES + app.HEART_FAILURE_FEATURES
+    + PASSTHROUGH_COLUMNS
+)
+
+FOLLOWUP_PLANS = {band: app.followup_plan_for_band(band) for band in ("High", "Medium", "Low")}
+
+
+def score_chunk(frame):
+    """Scored output rows for one input chunk (a DataFrame)."""
+    frame = frame.reset_index(drop=True)
+    model_prob, diseases = app.predict_batch(frame)
+    adj = app.adjusted_risk_array(model_prob, frame, diseases)
+    bands = pd.Series(app.followup_band_array(adj))
+
+    out = pd.DataFrame({
+        # Strings throughout, so every chunk has the same Parquet schema.
+        name: frame[name].astype("string") for name in PASSTHROUGH_COLUMNS if name in frame.columns
+    })
+    out["disease_type"] = diseases
+    out["model_probability"] = model_prob.round(4)
+    out["readmission_probability"] = adj.round(4)
+    out["prediction"] = np.where(adj >= 0.5, "Yes", "No")
+    out["risk_label"] = app.risk_category_array(adj)
+    out["followup_channel"] = bands.map({b: p["channel"] for b, p in FOLLOWUP_PLANS.items()})
+    out["next_visit"] = bands.map({b: p["schedule"][0] for b, p in FOLLOWUP_PLANS.items()})
+    return out
+
+
+def followup_records(out, prediction_date):
+    """Follow-up store records for a scored chunk, as /api/predict/batch saves them."""
+    def column(name):
+        if name in out.columns:
+            return out[name].astype(object).where(out[name].notna(), "N/A")
+        return pd.Series("N/A", index=out.index, dtype=object)
+
+    return pd.DataFrame({
+        "Patient ID": column("Patient ID"),
+        "Patient Name": column("Patient Name"),
+        "Problem Type": out["disease_type"],
+        "Readmission Probability": out["readmission_probability"],
+        "Risk Label": out["risk_label"],
+        "Followup Channel": out["followup_channel"],
+        "Next Visit": out["next_visit"],
+        "Simulation Date": column("Simulation Date"),
+        "Hospital Unit": column("Hospital Unit"),
+        "Prediction Date": prediction_date,
+        "Status": "Pending",
+    }).to_dict(orient="records")
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("[ERROR] Parquet output needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.writer = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_writer(path):
+    if path.lower().endswith((".parquet", ".pq")):
+        return ParquetWriter(path)
+    return CsvWriter(path)
+
+
+def scored_chunks(chunks, workers):
+    """score_chunk over `chunks`, in input order, on `workers` processes."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def rescore(input_path, output_path, chunksize=100_000, workers=1, followups=False):
+    """Score input_path into output_path; returns (rows, seconds)."""
+    writer = open_writer(output_path)
+    prediction_date = datetime.now().strftime("%Y-%m-%d")
+    chunks = pd.read_csv(
+        input_path, chunksize=chunksize, usecols=lambda name: name in INPUT_COLUMNS,
+        dtype={name: str for name in PASSTHROUGH_COLUMNS},
+    )
+
+    t0 = time.perf_counter()
+    rows = 0
+    next_report = 1_000_000
+    try:
+        for out in scored_chunks(chunks, workers):
+            writer.write(out)
+            if followups:
+                app.save_followup_records(followup_records(out, prediction_date))
+            rows += len(out)
+            if rows >= next_report:
+                elapsed = time.perf_counter() - t0
+                print(f"[INFO] {rows} rows scored ({rows / elapsed:.0f} rows/s)")
+                next_report += 1_000_000
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a patient CSV offline with the readmission models.")
+    parser.add_argument("input", help="CSV in the final_dataset_realistic.csv schema")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv or .parquet)")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--followups", action="store_true",
+                        help="also save a Pending follow-up for every row in the follow-up store")
+    args = parser.parse_args(argv)
+
+    print(f"[INFO] Scoring {args.input} with model version {app.MODELS.current().version}, "
+          f"{args.workers} workers, {args.chunksize} rows per chunk")
+    rows, seconds = rescore(args.input, args.output, args.chunksize, args.workers, args.followups)
+    print(f"[INFO] Wrote {rows} rows to {args.output} in {seconds:.2f}s "
+          f"({rows / seconds if seconds else 0:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
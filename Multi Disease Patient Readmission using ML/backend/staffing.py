@@ -0,0 +1,381 @@
+import os
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# =========================
+# STAFFING ENGINE
+# =========================
+# staffing_simulation_summary.csv is loaded once into date-sorted NumPy
+# arrays with prefix sums, per unit and overall. A +/-N day window mean
+# is then two binary searches and one subtraction instead of a DataFrame
+# copy, filter and sort per request. The file is re-read when its mtime
+# changes (checked at most every `reload_interval` seconds).
+
+# Canonical metric -> accepted CSV headers (shipped schema first).
+METRIC_COLUMNS = {
+    "beds": ("Beds_Required", "Beds"),
+    "nurses": ("Nurses_Needed", "Nurses"),
+    "doctors": ("Doctors_Needed", "Doctors"),
+    "support_staff": ("Support_Staff_Needed", "Support_Staff"),
+    "readmissions": ("Readmissions",),
+}
+REQUIRED_METRICS = ("beds", "nurses", "doctors")
+DAY_NS = 24 * 3600 * 10**9
+
+
+@lru_cache(maxsize=4096)
+def _date_ns(value):
+    """Simulation date string -> epoch nanoseconds, or None if unparseable."""
+    ts = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(ts) else ts.value
+
+
+class _DateIndex:
+    """Rows sorted by date with per-metric prefix sums."""
+
+    def __init__(self, ts, values):
+        order = np.argsort(ts, kind="stable")
+        self.ts = ts[order]
+        self.values = values[order]
+        self.prefix = np.vstack([
+            np.zeros((1, values.shape[1])),
+            np.cumsum(self.values, axis=0),
+        ])
+
+    def __len__(self):
+        return len(self.ts)
+
+    def mean(self, lo=0, hi=None):
+        hi = len(self.ts) if hi is None else hi
+        if hi <= lo:
+            return None
+        return (self.prefix[hi] - self.prefix[lo]) / (hi - lo)
+
+    def window_mean(self, center_ns, days):
+        """Mean over rows whose |date - center| is at most `days` whole days."""
+        span = (days + 1) * DAY_NS
+        lo = np.searchsorted(self.ts, center_ns - span, side="right")
+        hi = np.searchsorted(self.ts, center_ns + span, side="left")
+        return self.mean(lo, hi)
+
+    def weekday_profile(self, end_ns, weeks):
+        """Per-weekday metric means over the `weeks` weeks before end_ns.
+
+        If there is no history in that span (forecasting past the end of
+        the data) the last `weeks` weeks that exist are used. Returns a
+        (7, n_metrics) array indexed by weekday (Monday=0), or None.
+        """
+        if len(self.ts) == 0:
+            return None
+        hi = np.searchsorted(self.ts, end_ns, side="left")
+        if hi == 0:
+            hi = len(self.ts)
+        lo = np.searchsorted(self.ts, self.ts[hi - 1] - weeks * 7 * DAY_NS, side="right")
+        ts, values = self.ts[lo:hi], self.values[lo:hi]
+
+        weekday = (ts // DAY_NS + 3) % 7  # 1970-01-01 was a Thursday
+        counts = np.bincount(weekday, minlength=7).astype("float64")
+        sums = np.stack([np.bincount(weekday, weights=values[:, j], minlength=7)
+                         for j in range(values.shape[1])], axis=1)
+        overall = values.mean(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            profile = sums / counts[:, None]
+        return np.where(counts[:, None] > 0, profile, overall)
+
+    def per_readmission(self, metrics):
+        """Staff / beds needed per readmission, from totals over all history."""
+        names = [m for m, _ in metrics]
+        if "readmissions" not in names:
+            return np.ones(len(names))
+        totals = self.values.sum(axis=0)
+        readmissions = totals[names.index("readmissions")]
+        if readmissions <= 0:
+            return np.ones(len(names))
+        return totals / readmissions
+
+
+class _Snapshot:
+    """Immutable index built from one version of the CSV."""
+
+    def __init__(self, df, metrics, unit_col):
+        self.metrics = metrics
+        ts = df["Date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        values = df[[c for _, c in metrics]].to_numpy(dtype="float64")
+        self.all = _DateIndex(ts, values)
+
+        self.unit_rows = {}
+        if unit_col is not None:
+            units = df[unit_col].astype(str).str.strip().str.lower().to_numpy()
+            for unit in np.unique(units):
+                mask = units == unit
+                self.unit_rows[unit] = (ts[mask], values[mask])
+        self._unit_cache = {}
+
+    def for_unit(self, query):
+        """Index over every unit whose name contains `query` (case-insensitive)."""
+        key = str(query).strip().lower()
+        idx = self._unit_cache.get(key)
+        if idx is None:
+            parts = [rows for unit, rows in self.unit_rows.items() if key in unit]
+            if parts:
+                idx = _DateIndex(np.concatenate([p[0] for p in parts]),
+                                 np.concatenate([p[1] for p in parts]))
+            else:
+                idx = _DateIndex(np.empty(0, dtype=np.int64),
+                                 np.empty((0, len(self.metrics))))
+            if len(self._unit_cache) < 1024:
+                self._unit_cache[key] = idx
+        return idx
+
+
+def cohort_daily_expected(unit_codes, n_units, start_offsets, probs, horizon, window_days):
+    """Expected readmissions per unit and forecast day from pending patients.
+
+    Each patient's readmission probability is spread evenly over the
+    `window_days` days after their prediction date; start_offsets are
+    those prediction dates as day offsets from the forecast start.
+    Built with a difference array, so the cost is O(patients + units*days).
+    """
+    diff = np.zeros((n_units, horizon + 1), dtype="float64")
+    first = np.clip(start_offsets + 1, 0, horizon)
+    last = np.clip(start_offsets + 1 + window_days, 0, horizon)
+    rate = probs / float(window_days)
+    np.add.at(diff, (unit_codes, first), rate)
+    np.add.at(diff, (unit_codes, last), -rate)
+    return np.cumsum(diff, axis=1)[:, :horizon]
+
+
+def _cohort_arrays(cohort, start_ns):
+    """Cohort frame -> (unit names, unit codes, day offsets from start, probabilities)."""
+    if len(cohort) == 0:
+        return [], np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64), np.empty(0)
+    unit_labels = cohort["unit"].fillna("N/A").astype(str).str.strip()
+    codes, uniques = pd.factorize(unit_labels)
+    pred_ns = pd.to_datetime(cohort["prediction_date"], errors="coerce")
+    valid = pred_ns.notna().to_numpy()
+    offsets = (pred_ns[valid].dt.normalize().to_numpy(dtype="datetime64[ns]").astype(np.int64)
+               - start_ns) // DAY_NS
+    probs = pd.to_numeric(cohort["probability"], errors="coerce").fillna(0.0).to_numpy()[valid]
+    return list(uniques), codes[valid], offsets, probs
+
+
+class StaffingEngine:
+    def __init__(self, path, window_days=3, reload_interval=5.0):
+        self.path = path
+        self.window_days = window_days
+        self.reload_interval = reload_interval
+        self._snapshot = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def empty(self):
+        snap = self._current()
+        return snap is None or len(snap.all) == 0
+
+    def reload(self):
+        """(Re)load the CSV; keeps the previous snapshot if the new file is unusable."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            print(f"[WARN] Staffing CSV not found: {self.path}")
+            return False
+
+        try:
+            df = pd.read_csv(self.path)
+            metrics = []
+            for name, candidates in METRIC_COLUMNS.items():
+                col = next((c for c in candidates if c in df.columns), None)
+                if col is not None:
+                    metrics.append((name, col))
+            missing = [m for m in REQUIRED_METRICS if m not in dict(metrics)]
+            if "Date" not in df.columns or missing:
+                print(f"[WARN] Staffing CSV missing expected columns. Found: {df.columns.tolist()}")
+                return False
+
+            df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+            df = df.dropna(subset=["Date"])
+            for _, col in metrics:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            df = df.dropna(subset=[c for _, c in metrics])
+            unit_col = "Unit" if "Unit" in df.columns else None
+            snapshot = _Snapshot(df, metrics, unit_col)
+        except Exception as e:
+            print(f"[ERROR] Failed to load staffing CSV: {e}")
+            return False
+
+        self._snapshot = snapshot
+        self._mtime = mtime
+        print(f"[INFO] Loaded staffing CSV with {len(snapshot.all)} rows.")
+        return True
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_interval:
+                    self._checked_at = now
+                    try:
+                        changed = os.stat(self.path).st_mtime_ns != self._mtime
+                    except OSError:
+                        changed = False
+                    if changed:
+                        self.reload()
+        return self._snapshot
+
+    def window_means(self, sim_date=None, hospital_unit=None):
+        """Historical metric means for the unit and +/-window_days around sim_date.
+
+        Rows of units whose name contains hospital_unit are used when the
+        CSV has a unit column and some unit matches; otherwise (the shipped
+        CSV has no units) all rows. The date window is tried on those rows,
+        then on all rows, and the whole-table mean is the last fallback.
+        Returns {metric: mean} or None when no data is loaded.
+        """
+        snap = self._current()
+        if snap is None or len(snap.all) == 0:
+            return None
+
+        indexes = [snap.all]
+        if hospital_unit and snap.unit_rows:
+            unit_idx = snap.for_unit(hospital_unit)
+            if len(unit_idx):
+                indexes.insert(0, unit_idx)
+
+        means = None
+        sim_ns = _date_ns(str(sim_date)) if sim_date else None
+        for idx in indexes:
+            means = idx.window_mean(sim_ns, self.window_days) if sim_ns is not None else idx.mean()
+            if means is not None:
+                break
+
+        if means is None:
+            means = snap.all.mean()
+        return {name: float(v) for (name, _), v in zip(snap.metrics, means)}
+
+    def forecast(self, start, horizon, cohort, history_weeks=8, window_days=30):
+        """Day-by-day staffing forecast per unit.
+
+        cohort is a DataFrame of pending follow-ups with columns unit,
+        prediction_date and probability. Demand for each day is the
+        weekday baseline from the historical series (per unit when the CSV
+        has units, otherwise counted once in the total) plus the cohort's
+        expected readmissions times the historical staff-per-readmission
+        ratios. Returns None when no staffing data is loaded.
+        """
+        snap = self._current()
+        if snap is None or len(snap.all) == 0:
+            return None
+
+        start_ns = pd.Timestamp(start).normalize().value
+        days_ns = start_ns + np.arange(horizon, dtype=np.int64) * DAY_NS
+        weekday = (days_ns // DAY_NS + 3) % 7
+        names = [m for m, _ in snap.metrics]
+        ratios = snap.all.per_readmission(snap.metrics)
+
+        units, codes, offsets, probs = _cohort_arrays(cohort, start_ns)
+        expected = cohort_daily_expected(codes, len(units), offsets, probs, horizon, window_days)
+
+        def rows(baseline, cohort_expected):
+            # baseline: (horizon, n_metrics) or None; cohort_expected: (horizon,)
+            demand = np.outer(cohort_expected, ratios)
+            if baseline is not None:
+                demand = demand + baseline
+            out = {"date": [pd.Timestamp(d).strftime("%Y-%m-%d") for d in days_ns]}
+            if "readmissions" in names:
+                out["expected_readmissions"] = np.round(demand[:, names.index("readmissions")], 2).tolist()
+            else:
+                out["expected_readmissions"] = np.round(cohort_expected, 2).tolist()
+            for name in names:
+                if name != "readmissions":
+                    out[name] = np.ceil(demand[:, names.index(name)] - 1e-9).astype(int).tolist()
+            out["cohort_expected_readmissions"] = np.round(cohort_expected, 2).tolist()
+            return [dict(zip(out, vals)) for vals in zip(*out.values())]
+
+        total_baseline = snap.all.weekday_profile(start_ns, history_weeks)[weekday]
+        result = {
+            "start_date": pd.Timestamp(start_ns).strftime("%Y-%m-%d"),
+            "horizon_days": horizon,
+            "pending_patients": int(len(cohort)),
+            "total": rows(total_baseline, expected.sum(axis=0) if len(units) else np.zeros(horizon)),
+            "units": {},
+        }
+        for i, unit in enumerate(units):
+            unit_idx = snap.for_unit(unit) if snap.unit_rows else None
+            unit_baseline = None
+            if unit_idx is not None and len(unit_idx):
+                unit_baseline = unit_idx.weekday_profile(start_ns, history_weeks)[weekday]
+            result["units"][unit] = rows(unit_baseline, expected[i])
+        return result
+
+    def simulate(self, start, horizon, cohort, scenarios=10000, percentiles=(50, 90, 95, 99),
+                 history_weeks=8, window_days=30, seed=None, executor=None):
+        """Monte Carlo staffing demand per unit and day.
+
+        Same inputs as forecast(), but each pending patient is sampled as a
+        Bernoulli trial and background readmissions as Poisson draws around
+        the weekday baseline (per unit when the CSV has units, otherwise in
+        the total only). Reports mean and percentile readmissions, and
+        beds / staff at those percentiles via the historical
+        staff-per-readmission ratios. Scenario parts run on `executor`
+        (a process pool) when given. Returns None when no data is loaded.
+        """
+        from staffing_montecarlo import histogram_percentiles, simulate_counts
+
+        snap = self._current()
+        if snap is None or len(snap.all) == 0:
+            return None
+
+        start_ns = pd.Timestamp(start).normalize().value
+        days_ns = start_ns + np.arange(horizon, dtype=np.int64) * DAY_NS
+        weekday = (days_ns // DAY_NS + 3) % 7
+        names = [m for m, _ in snap.metrics]
+        ratios = snap.all.per_readmission(snap.metrics)
+        units, codes, offsets, probs = _cohort_arrays(cohort, start_ns)
+
+        baseline = None
+        if "readmissions" in names:
+            r = names.index("readmissions")
+            baseline = np.zeros((len(units) + 1, horizon))
+            baseline[-1] = snap.all.weekday_profile(start_ns, history_weeks)[weekday, r]
+            for i, unit in enumerate(units):
+                unit_idx = snap.for_unit(unit) if snap.unit_rows else None
+                if unit_idx is not None and len(unit_idx):
+                    baseline[i] = unit_idx.weekday_profile(start_ns, history_weeks)[weekday, r]
+
+        hist, mean = simulate_counts(offsets, probs, codes, len(units), baseline, horizon,
+                                     window_days, scenarios, seed=seed, executor=executor)
+        pct = histogram_percentiles(hist, percentiles)
+        dates = [pd.Timestamp(d).strftime("%Y-%m-%d") for d in days_ns]
+
+        def rows(i):
+            out = []
+            for d in range(horizon):
+                row = {
+                    "date": dates[d],
+                    "readmissions": {"mean": round(float(mean[i, d]), 2)},
+                }
+                for k, q in enumerate(percentiles):
+                    row["readmissions"][f"p{q:g}"] = int(pct[k, i, d])
+                for j, name in enumerate(names):
+                    if name == "readmissions":
+                        continue
+                    row[name] = {f"p{q:g}": int(np.ceil(pct[k, i, d] * ratios[j] - 1e-9))
+                                 for k, q in enumerate(percentiles)}
+                out.append(row)
+            return out
+
+        return {
+            "start_date": dates[0],
+            "horizon_days": horizon,
+            "scenarios": scenarios,
+            "pending_patients": int(len(cohort)),
+            "percentiles": list(percentiles),
+            "total": rows(len(units)),
+            "units": {unit: rows(i) for i, unit in enumerate(units)},
+        }
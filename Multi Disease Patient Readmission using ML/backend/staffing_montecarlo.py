@@ -0,0 +1,114 @@
+import numpy as np
+from staffing import cohort_daily_expected
+
+# =========================
+# MONTE CARLO STAFFING SIMULATION
+# =========================
+# Each pending patient is a Bernoulli trial with their readmission
+# probability. A patient who is readmitted comes back on a day drawn
+# uniformly from the window after their prediction date; both draws come
+# from the same uniform number (u < p, then u / p is uniform on [0, 1)).
+# Background readmissions from the historical series are added as
+# Poisson draws around the weekday baseline.
+#
+# Scenarios are split into fixed-size parts with independent seeds
+# (spawned from one SeedSequence, so a given seed gives the same result
+# however many processes run the parts). Each part returns a histogram of readmission counts per (unit, day) rather
+# than the raw samples, so memory does not grow with the scenario count
+# and parts merge by addition. Percentiles are read off the merged
+# histogram (inverted CDF, i.e. always an actually simulated count).
+
+# Uniform draws per sampling batch (scenarios x patients); ~32 MB float64.
+BATCH_ELEMENTS = 4_000_000
+SCENARIOS_PER_PART = 2500
+
+
+def _simulate_part(args):
+    """Run `scenarios` scenarios; returns (histogram, sum of counts)."""
+    offsets, probs, cells, n_cells, baseline, horizon, window, scenarios, seed, width = args
+    rng = np.random.default_rng(seed)
+    n_rows = n_cells + 1  # last row is the total over all units
+    hist = np.zeros(n_rows * horizon * width, dtype=np.int64)
+    sums = np.zeros((n_rows, horizon))
+    bins = np.arange(n_rows * horizon, dtype=np.int64) * width
+    n = len(probs)
+    batch = max(1, min(scenarios, BATCH_ELEMENTS // max(n, 1)))
+
+    done = 0
+    while done < scenarios:
+        s = min(batch, scenarios - done)
+        counts = np.zeros((s, n_rows, horizon), dtype=np.int64)
+        if n:
+            u = rng.random((s, n))
+            sc, pt = np.nonzero(u < probs)
+            day = offsets[pt] + 1 + (u[sc, pt] / probs[pt] * window).astype(np.int64)
+            keep = (day >= 0) & (day < horizon)
+            sc, pt, day = sc[keep], pt[keep], day[keep]
+            flat = (sc * n_cells + cells[pt]) * horizon + day
+            counts[:, :n_cells, :] = np.bincount(
+                flat, minlength=s * n_cells * horizon
+            ).reshape(s, n_cells, horizon)
+            counts[:, n_cells, :] = counts[:, :n_cells, :].sum(axis=1)
+        if baseline is not None:
+            counts += rng.poisson(baseline, size=(s, n_rows, horizon))
+
+        sums += counts.sum(axis=0)
+        np.minimum(counts, width - 1, out=counts)
+        hist += np.bincount((counts.reshape(s, -1) + bins).ravel(), minlength=hist.size)
+        done += s
+
+    return hist.reshape(n_rows, horizon, width), sums
+
+
+def simulate_counts(offsets, probs, cells, n_cells, baseline, horizon, window,
+                    scenarios, seed=None, executor=None):
+    """Simulate readmission counts per (unit, day) over `scenarios` scenarios.
+
+    offsets are prediction dates as day offsets from the forecast start,
+    probs the readmission probabilities and cells the unit index of each
+    patient. baseline is an (n_cells + 1, horizon) array of Poisson means
+    (last row: total) or None. Parts run on `executor` when given.
+    Returns (histogram of shape (n_cells + 1, horizon, width), mean counts).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    probs = np.clip(np.asarray(probs, dtype="float64"), 0.0, 1.0)
+    cells = np.asarray(cells, dtype=np.int64)
+
+    # Only patients whose window overlaps the horizon can contribute.
+    live = (probs > 0) & (offsets + 1 < horizon) & (offsets + window >= 0)
+    offsets, probs, cells = offsets[live], probs[live], cells[live]
+
+    # Histogram width: far enough past the busiest cell's mean that
+    # clipping never reaches the reported percentiles.
+    mean = cohort_daily_expected(cells, n_cells, offsets, probs, horizon, window)
+    mean = np.vstack([mean, mean.sum(axis=0, keepdims=True)])
+    if baseline is not None:
+        mean = mean + baseline
+    peak = float(mean.max()) if mean.size else 0.0
+    width = int(peak + 12 * np.sqrt(peak) + 20) + 1
+
+    parts = max(1, -(-scenarios // SCENARIOS_PER_PART))
+    sizes = [min(SCENARIOS_PER_PART, scenarios - i * SCENARIOS_PER_PART) for i in range(parts)]
+    seeds = np.random.SeedSequence(seed).spawn(parts)
+    jobs = [(offsets, probs, cells, n_cells, baseline, horizon, window, size, ss, width)
+            for size, ss in zip(sizes, seeds)]
+
+    if executor is None or parts == 1:
+        results = [_simulate_part(job) for job in jobs]
+    else:
+        results = list(executor.map(_simulate_part, jobs))
+
+    hist = sum(r[0] for r in results)
+    sums = sum(r[1] for r in results)
+    return hist, sums / scenarios
+
+
+def histogram_percentiles(hist, percentiles):
+    """Inverted-CDF percentiles along the last axis of a count histogram.
+
+    Returns an array of shape (len(percentiles), *hist.shape[:-1]).
+    """
+    cdf = np.cumsum(hist, axis=-1)
+    total = cdf[..., -1:]
+    out = [np.argmax(cdf >= total * (q / 100.0), axis=-1) for q in percentiles]
+    return np.stack(out)
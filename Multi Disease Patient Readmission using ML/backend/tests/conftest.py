@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DATASET_PATH = os.path.join(BACKEND_DIR, "final_dataset_realistic.csv")
+
+
+@pytest.fixture(scope="session")
+def labeled_dataset():
+    """(frame, 0/1 readmission target) of final_dataset_realistic.csv."""
+    import train
+
+    return train.read_labeled(DATASET_PATH)
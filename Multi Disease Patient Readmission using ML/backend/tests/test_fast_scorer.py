@@ -0,0 +1,79 @@
+"""fast_scorer must reproduce predict_proba bit for bit.
+
+app.py only uses a compiled scorer after its startup probe matches, and
+otherwise falls back to predict_proba silently; these tests make a
+parity regression fail instead of only showing up as latency.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import train
+from fast_scorer import compile_model, file_fingerprint, load_compiled, save_compiled
+
+
+@pytest.fixture(scope="module", params=sorted(train.DISEASES))
+def encoded(request, labeled_dataset):
+    """(X, y) of one disease, encoded as app.py serves it."""
+    df, y = labeled_dataset
+    return train.encode_by_disease(df, y)[request.param]
+
+
+def split(X, y):
+    """Fit rows, probe rows for compile_model, and held-out rows to compare on."""
+    n = len(y)
+    return X.iloc[: n // 2], y[: n // 2], X.to_numpy()[n // 2: 3 * n // 4], X.to_numpy()[3 * n // 4:]
+
+
+def fit_forest(X, y):
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", RandomForestClassifier(n_estimators=25, max_depth=8, random_state=train.RANDOM_STATE)),
+    ]).fit(X, y)
+
+
+def fit_compact_logistic(X, y):
+    """The compact tier's scaler + LogisticRegression, Platt scaling folded in as train.py saves it."""
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=train.RANDOM_STATE)
+    estimator = train.compact_candidates(cv)["LogisticRegression"]
+    calibrated = CalibratedClassifierCV(estimator, method="sigmoid", cv=cv, ensemble=False).fit(X, y)
+    return train.fold_platt_scaling(calibrated)
+
+
+@pytest.mark.parametrize("fit", [fit_forest, fit_compact_logistic])
+def test_compiled_matches_predict_proba(encoded, fit):
+    X, y = encoded
+    X_fit, y_fit, probe, held_out = split(X, y)
+    model = fit(X_fit, y_fit)
+
+    scorer = compile_model(model, list(X.columns), probe)
+
+    assert scorer is not None
+    expected = model.predict_proba(pd.DataFrame(held_out, columns=X.columns))[:, 1]
+    assert np.array_equal(scorer.predict_proba1(held_out), expected)
+
+
+def test_saved_scorer_round_trip(encoded, tmp_path):
+    X, y = encoded
+    X_fit, y_fit, probe, held_out = split(X, y)
+    model = fit_forest(X_fit, y_fit)
+    scorer = compile_model(model, list(X.columns), probe)
+    pickle_path = tmp_path / "model.pkl"
+    pickle_path.write_bytes(b"model bytes")
+    artifact = str(tmp_path / "model.fast.joblib")
+
+    save_compiled(scorer, artifact, file_fingerprint(pickle_path))
+
+    for mmap in (True, False):
+        loaded = load_compiled(artifact, file_fingerprint(pickle_path), mmap=mmap)
+        assert loaded is not None
+        assert np.array_equal(loaded.predict_proba1(held_out), scorer.predict_proba1(held_out))
+
+    pickle_path.write_bytes(b"retrained model bytes")
+    assert load_compiled(artifact, file_fingerprint(pickle_path)) is None
+    assert load_compiled(str(tmp_path / "missing.fast.joblib"), file_fingerprint(pickle_path)) is None
@@ -0,0 +1,64 @@
+"""The column-wise risk functions must agree exactly with the per-patient ones.
+
+compute_severity_array, adjusted_risk_array, risk_category_array and
+followup_band_array (used by /api/predict/batch and bulk reports) are
+compared with compute_severity_score, adjusted_risk_score, risk_category
+and followup_plan on final_dataset_realistic.csv and on resampled rows
+seeded with blank, malformed and boundary values.
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import BACKEND_DIR, DATASET_PATH
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+os.environ.setdefault("FOLLOWUP_DB_PATH", os.path.join(tempfile.mkdtemp(), "followups.db"))
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(), "jobs.db"))
+os.environ.setdefault("METRICS", "0")
+
+import app  # noqa: E402
+from bench_risk_scoring import PAYLOAD_COLUMNS, synthetic_frame  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def base():
+    return pd.read_csv(DATASET_PATH, usecols=PAYLOAD_COLUMNS)
+
+
+def scalar_scores(frame, diseases, model_prob):
+    sev, adj, risk, band = [], [], [], []
+    for data, disease, prob in zip(app.frame_records(frame), diseases, model_prob):
+        sev.append(app.compute_severity_score(data, disease))
+        a = app.adjusted_risk_score(prob, data, disease)
+        adj.append(a)
+        risk.append(app.risk_category(a))
+        band.append(app.followup_plan(a, disease)["risk_band"])
+    return np.array(sev), np.array(adj), np.array(risk, dtype=object), np.array(band, dtype=object)
+
+
+def vector_scores(frame, diseases, model_prob):
+    adj = app.adjusted_risk_array(model_prob, frame, diseases)
+    return (app.compute_severity_array(frame, diseases), adj,
+            app.risk_category_array(adj), app.followup_band_array(adj))
+
+
+@pytest.mark.parametrize("rows", [None, 20_000], ids=["dataset", "synthetic"])
+def test_arrays_match_scalar_functions(base, rows):
+    frame = base if rows is None else synthetic_frame(base, rows, seed=2)
+    diseases = np.where(app.batch_disease_mask(frame), "Diabetes", "Heart Disease").astype(object)
+    model_prob = np.random.default_rng(1).random(len(frame))
+
+    expected = scalar_scores(frame, diseases, model_prob)
+    actual = vector_scores(frame, diseases, model_prob)
+
+    for name, e, a in zip(("severity", "adjusted_risk", "risk_category", "followup_band"), expected, actual):
+        mismatches = np.flatnonzero(e != a)
+        assert not len(mismatches), (
+            f"{name} differs on {len(mismatches)} rows, first row {mismatches[0]}: "
+            f"scalar={e[mismatches[0]]!r} vector={a[mismatches[0]]!r}\n{frame.iloc[mismatches[0]].to_dict()}"
+        )
@@ -0,0 +1,648 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# MODEL TRAINING
+# =========================
+# Scripted version of the search in ML Model/Healthcare_ML_Model.ipynb:
+# per disease, LogisticRegression, RandomForest and a boosted model are
+# tuned with cross-validated ROC-AUC, evaluated on a held-out split, and
+# the chosen one is saved under the file name app.py loads
+# (readmission_<disease>_RandomForest.pkl), plus training_summary.json.
+#
+#     python train.py                                # final_dataset_realistic.csv -> training_output/
+#     python train.py data.csv -o out/ --jobs 8 --n-iter 20
+#
+# Unlike the notebook, the models are trained on the features app.py
+# feeds them (model_schema.encode_feature_matrix, shared with app.py
+# without importing the web app), so a new artifact drops in without a
+# compatibility shim and can be compiled by fast_scorer.
+#
+# Speed: raw columns are encoded once per disease, vectorized. The
+# (parameter set, fold) fits of each search run in parallel on --jobs
+# processes, with the estimators themselves single-threaded so the cores
+# are not oversubscribed. The scaler fitted on each fold is cached
+# (Pipeline memory=) and reused by every parameter set and model. The
+# boosted model stops adding trees when its validation loss stalls.
+# --n-iter replaces the exhaustive grids with a random sample of each.
+#
+# A compact, calibrated model is trained next to each saved one (see
+# COMPACT SERVING TIER); app.py serves it when its test ROC-AUC is
+# within COMPACT_AUC_TOLERANCE of the heavy model's.
+
+from model_schema import (BASE_DIR, MODEL_DIR, MODEL_FILES, COMPACT_MODEL_FILES,  # noqa: E402
+                          batch_disease_mask, encode_feature_matrix)
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.metrics import (accuracy_score, average_precision_score, f1_score,
+                             precision_recall_curve, precision_score, recall_score, roc_auc_score)
+from sklearn.model_selection import (GridSearchCV, RandomizedSearchCV, StratifiedKFold,
+                                     cross_val_predict, train_test_split)
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+try:
+    import xgboost
+    XGBOOST_AVAILABLE = True
+except Exception:
+    XGBOOST_AVAILABLE = False
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+RISK_THRESHOLD = 0.5
+EARLY_STOPPING_ROUNDS = 30
+SGD_STEP_SIZE = 0.001
+SUMMARY_FILE = "training_summary.json"
+
+DISEASES = {"diabetes": "Diabetes", "heart_disease": "Heart Disease"}
+
+
+class XGBEarlyStopping(BaseEstimator, ClassifierMixin):
+    """XGBClassifier that picks its own number of trees.
+
+    Holds back validation_fraction of the data it is fitted on, adds trees
+    until the validation log-loss has not improved for
+    early_stopping_rounds, then refits on all of it with that many trees.
+    Only used during the search; the saved pipeline holds the plain
+    XGBClassifier in `model_`.
+    """
+
+    def __init__(self, learning_rate=0.1, max_depth=5, subsample=1.0, colsample_bytree=1.0,
+                 max_estimators=1000, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                 validation_fraction=0.1, scale_pos_weight=1.0, random_state=RANDOM_STATE):
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.subsample = subsample
+        self.colsample_bytree = colsample_bytree
+        self.max_estimators = max_estimators
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.scale_pos_weight = scale_pos_weight
+        self.random_state = random_state
+
+    def _xgb(self, **extra):
+        return xgboost.XGBClassifier(
+            learning_rate=self.learning_rate, max_depth=self.max_depth, subsample=self.subsample,
+            colsample_bytree=self.colsample_bytree, scale_pos_weight=self.scale_pos_weight,
+            random_state=self.random_state, eval_metric="logloss", n_jobs=1, **extra,
+        )
+
+    def fit(self, X, y):
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=self.validation_fraction, stratify=y, random_state=self.random_state
+        )
+        probe = self._xgb(n_estimators=self.max_estimators, early_stopping_rounds=self.early_stopping_rounds)
+        probe.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        self.n_estimators_ = int(probe.best_iteration) + 1
+        self.model_ = self._xgb(n_estimators=self.n_estimators_).fit(X, y)
+        self.classes_ = self.model_.classes_
+        return self
+
+    def predict_proba(self, X):
+        return self.model_.predict_proba(X)
+
+    def predict(self, X):
+        return self.model_.predict(X)
+
+
+def candidate_models(y):
+    """(estimator, parameter grid) per model name; the grids are the notebook's."""
+    pos_weight = max(1.0, float((y == 0).sum()) / max(int((y == 1).sum()), 1))
+    models = {
+        "LogisticRegression": (
+            LogisticRegression(max_iter=4000, solver="liblinear", class_weight="balanced",
+                               random_state=RANDOM_STATE),
+            {"clf__C": [0.01, 0.1, 1, 5, 10], "clf__penalty": ["l1", "l2"]},
+        ),
+        "RandomForest": (
+            RandomForestClassifier(random_state=RANDOM_STATE, class_weight="balanced", n_jobs=1),
+            {
+                "clf__n_estimators": [200, 400, 600],
+                "clf__max_depth": [10, 15, 20, None],
+                "clf__min_samples_split": [2, 4],
+                "clf__min_samples_leaf": [1, 2],
+                "clf__max_features": ["sqrt", "log2"],
+            },
+        ),
+    }
+    # Boosted model: the number of trees is found by early stopping
+    # instead of being part of the grid.
+    if XGBOOST_AVAILABLE:
+        models["XGBoost"] = (
+            XGBEarlyStopping(scale_pos_weight=pos_weight),
+            {
+                "clf__learning_rate": [0.01, 0.05, 0.1],
+                "clf__max_depth": [3, 5, 7],
+                "clf__subsample": [0.8, 1.0],
+                "clf__colsample_bytree": [0.8, 1.0],
+            },
+        )
+    else:
+        models["HistGradientBoosting"] = (
+            HistGradientBoostingClassifier(
+                max_iter=1000, early_stopping=True, validation_fraction=0.1,
+                n_iter_no_change=EARLY_STOPPING_ROUNDS, class_weight="balanced",
+                random_state=RANDOM_STATE,
+            ),
+            {
+                "clf__learning_rate": [0.01, 0.05, 0.1],
+                "clf__max_depth": [3, 5, 7],
+                "clf__l2_regularization": [0.0, 1.0],
+            },
+        )
+    return models
+
+
+def read_labeled(csv_path, skip_rows=0):
+    """(frame, 0/1 target) for the data rows of csv_path after the first skip_rows."""
+    df = pd.read_csv(csv_path, skiprows=range(1, skip_rows + 1) if skip_rows else None)
+    df.columns = df.columns.str.strip()
+    target_col = next((c for c in df.columns if "readmit" in c.lower() or "readmission" in c.lower()), None)
+    if target_col is None:
+        raise ValueError("No readmission target column found.")
+    y = (
+        df[target_col].astype(str).str.lower().str.strip()
+        .map({"yes": 1, "true": 1, "1": 1, "no": 0, "false": 0, "0": 0})
+        .fillna(0).astype(int).to_numpy()
+    )
+    return df, y
+
+
+def encode_by_disease(df, y, require_all=True):
+    """Encoded (X, y) per disease key, with the encoding app.py serves with."""
+    is_diab = batch_disease_mask(df)
+    data = {}
+    for key, mask in (("diabetes", is_diab), ("heart_disease", ~is_diab)):
+        if not mask.any():
+            if require_all:
+                raise ValueError(f"No {DISEASES[key]} records found. Check 'Problem Type' values.")
+            continue
+        X, features = encode_feature_matrix(df[mask], DISEASES[key])
+        data[key] = (pd.DataFrame(X, columns=features), y[mask])
+    return data
+
+
+def holdout_split(X, y):
+    """(X_train, X_test, y_train, y_test): the split every model of a disease is tested on."""
+    return train_test_split(X, y, test_size=TEST_SIZE, stratify=y, random_state=RANDOM_STATE)
+
+
+def test_metrics(model, X_test, y_test, threshold=RISK_THRESHOLD):
+    y_prob = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_prob >= threshold).astype(int)
+    return {
+        "roc_auc": roc_auc_score(y_test, y_prob),
+        "pr_auc": average_precision_score(y_test, y_prob),
+        "accuracy": accuracy_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred, zero_division=0),
+        "recall": recall_score(y_test, y_pred, zero_division=0),
+        "f1": f1_score(y_test, y_pred, zero_division=0),
+    }
+
+
+def final_pipeline(search):
+    """The refitted best pipeline, stripped of search-only parts."""
+    best = search.best_estimator_
+    best.set_params(memory=None)
+    if isinstance(best.steps[-1][1], XGBEarlyStopping):
+        best.steps[-1] = ("clf", best.steps[-1][1].model_)
+    return best
+
+
+def train_disease(key, X, y, models, cv_folds, jobs, n_iter, cache_dir):
+    """Search every candidate for one disease; returns (summary, fitted pipelines)."""
+    X_train, X_test, y_train, y_test = holdout_split(X, y)
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+
+    summary, fitted = {}, {}
+    for name, (estimator, grid) in models.items():
+        pipe = Pipeline([("scaler", StandardScaler()), ("clf", estimator)],
+                        memory=os.path.join(cache_dir, key))
+        if n_iter:
+            search = RandomizedSearchCV(pipe, grid, n_iter=n_iter, scoring="roc_auc", cv=cv,
+                                        n_jobs=jobs, random_state=RANDOM_STATE)
+        else:
+            search = GridSearchCV(pipe, grid, scoring="roc_auc", cv=cv, n_jobs=jobs)
+
+        t0 = time.perf_counter()
+        search.fit(X_train, y_train)
+        seconds = time.perf_counter() - t0
+
+        model = final_pipeline(search)
+        metrics = test_metrics(model, X_test, y_test)
+        fitted[name] = model
+        summary[name] = {
+            "best_params": {k.replace("clf__", ""): v for k, v in search.best_params_.items()},
+            "cv_roc_auc": search.best_score_,
+            "candidates": len(search.cv_results_["params"]),
+            "search_seconds": round(seconds, 2),
+            "metrics_test": metrics,
+        }
+        if isinstance(search.best_estimator_.steps[-1][1], HistGradientBoostingClassifier):
+            summary[name]["n_trees"] = int(model.steps[-1][1].n_iter_)
+        elif name == "XGBoost":
+            summary[name]["n_trees"] = int(model.steps[-1][1].n_estimators)
+        print(f"[INFO] {DISEASES[key]} {name}: CV AUC {search.best_score_:.4f}, "
+              f"test AUC {metrics['roc_auc']:.4f}, acc {metrics['accuracy']:.4f} "
+              f"({summary[name]['candidates']} candidates x {cv_folds} folds in {seconds:.1f}s)")
+    return summary, fitted
+
+
+# =========================
+# COMPACT SERVING TIER
+# =========================
+# Small models that score a row in microseconds instead of walking
+# hundreds of trees: an L2 LogisticRegression and shallow boosted trees.
+# Each is calibrated with Platt scaling, fitted on out-of-fold
+# predictions (CalibratedClassifierCV, ensemble=False), so its
+# probabilities can stand in for the heavy model's in the severity
+# adjustment and the risk bands. For the LogisticRegression the
+# calibration is folded into its coefficients: the saved artifact is a
+# plain scaler + LogisticRegression pipeline that fast_scorer compiles.
+#
+# The candidate with the best out-of-fold ROC-AUC is kept, and the
+# threshold that maximises F1 on those out-of-fold probabilities is
+# recorded with it. It is evaluated on the same held-out split as the
+# heavy models, which is what app.py compares.
+
+def compact_candidates(cv):
+    return {
+        "LogisticRegression": GridSearchCV(
+            Pipeline([("scaler", StandardScaler()),
+                      ("clf", LogisticRegression(max_iter=4000, class_weight="balanced",
+                                                 random_state=RANDOM_STATE))]),
+            {"clf__C": [0.01, 0.1, 1, 10]}, scoring="roc_auc", cv=cv,
+        ),
+        "ShallowBoosting": Pipeline([
+            ("scaler", StandardScaler()),
+            ("clf", HistGradientBoostingClassifier(
+                max_depth=2, max_leaf_nodes=4, max_iter=100, learning_rate=0.1,
+                early_stopping=False, class_weight="balanced", random_state=RANDOM_STATE,
+            )),
+        ]),
+    }
+
+
+def fold_platt_scaling(calibrated):
+    """The scaler + LogisticRegression pipeline equal to a sigmoid-calibrated one."""
+    inner = calibrated.calibrated_classifiers_[0]
+    pipe, platt = inner.estimator, inner.calibrators[0]
+    if isinstance(pipe, GridSearchCV):
+        pipe = pipe.best_estimator_
+    clf = pipe.steps[-1][1]
+    # calibrated p = expit(-(a * (w.x + b) + c)) = expit((-a w).x + (-a b - c))
+    clf.coef_ = -platt.a_ * clf.coef_
+    clf.intercept_ = -platt.a_ * clf.intercept_ - platt.b_
+    return pipe
+
+
+def best_f1_threshold(y, y_prob):
+    precision, recall, thresholds = precision_recall_curve(y, y_prob)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-12)
+    return float(thresholds[int(np.argmax(f1[:-1]))])
+
+
+def train_compact(key, X, y, cv_folds=CV_FOLDS, jobs=-1):
+    """Fit, calibrate and test the compact candidates; returns (summary, pipeline)."""
+    X_train, X_test, y_train, y_test = holdout_split(X, y)
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+
+    results = {}
+    for name, estimator in compact_candidates(cv).items():
+        calibrated = CalibratedClassifierCV(estimator, method="sigmoid", cv=cv, ensemble=False)
+        t0 = time.perf_counter()
+        oof = cross_val_predict(calibrated, X_train, y_train, cv=cv, method="predict_proba",
+                                n_jobs=jobs)[:, 1]
+        calibrated.fit(X_train, y_train)
+        seconds = time.perf_counter() - t0
+        results[name] = (calibrated, oof, seconds)
+
+    name = max(results, key=lambda n: roc_auc_score(y_train, results[n][1]))
+    calibrated, oof, seconds = results[name]
+    model = fold_platt_scaling(calibrated) if name == "LogisticRegression" else calibrated
+    threshold = best_f1_threshold(y_train, oof)
+    summary = {
+        "model": name,
+        "calibration": "sigmoid",
+        "cv_roc_auc": {n: float(roc_auc_score(y_train, r[1])) for n, r in results.items()},
+        "fit_seconds": round(seconds, 2),
+        "threshold": threshold,
+        "metrics_test": test_metrics(model, X_test, y_test),
+        "metrics_test_at_threshold": test_metrics(model, X_test, y_test, threshold),
+    }
+    print(f"[INFO] {DISEASES[key]} compact {name}: test AUC {summary['metrics_test']['roc_auc']:.4f}, "
+          f"F1-optimal threshold {threshold:.3f}")
+    return summary, model
+
+
+def save_artifact(model, path):
+    """joblib.dump via a temporary file, so readers never see half a model."""
+    import joblib
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+def train(csv_path, output_dir, final_model="RandomForest", cv_folds=CV_FOLDS, jobs=-1, n_iter=None):
+    """Train both diseases, write the artifacts and training_summary.json; returns the summary."""
+    started = time.perf_counter()
+    df, y_all = read_labeled(csv_path)
+    data = encode_by_disease(df, y_all)
+    os.makedirs(output_dir, exist_ok=True)
+    cache_dir = tempfile.mkdtemp(prefix="readmission-train-")
+
+    summary = {
+        "timestamp": datetime.now().isoformat(),
+        "data": os.path.abspath(csv_path),
+        "cv_folds": cv_folds,
+        "search": f"random ({n_iter} per model)" if n_iter else "grid",
+        "final_model": final_model,
+        # Rows of `data` used so far; train.py --incremental starts after them.
+        "watermark": {"data": os.path.abspath(csv_path), "rows": int(len(df))},
+        "diseases": {},
+    }
+    try:
+        for key, (X, y) in data.items():
+            models = candidate_models(y)
+            if final_model not in models:
+                raise ValueError(f"Unknown final model {final_model}; choose from {sorted(models)}")
+            results, fitted = train_disease(key, X, y, models, cv_folds, jobs, n_iter, cache_dir)
+
+            artifact = MODEL_FILES[key][0]
+            save_artifact(fitted[final_model], os.path.join(output_dir, artifact))
+            best = max(results, key=lambda n: results[n]["cv_roc_auc"])
+            compact, compact_model = train_compact(key, X, y, cv_folds, jobs)
+            compact["artifact"] = COMPACT_MODEL_FILES[key]
+            save_artifact(compact_model, os.path.join(output_dir, compact["artifact"]))
+            summary["diseases"][key] = {
+                "rows": int(len(y)),
+                "positive_rate": float(np.mean(y)),
+                "features": list(X.columns),
+                "artifact": artifact,
+                "saved_model": final_model,
+                "best_model": best,
+                "models": results,
+                "compact": compact,
+            }
+            heavy_auc = results[final_model]["metrics_test"]["roc_auc"]
+            print(f"[INFO] Saved {final_model} for {DISEASES[key]} -> {os.path.join(output_dir, artifact)} "
+                  f"(test AUC {heavy_auc:.4f}; compact {compact['metrics_test']['roc_auc']:.4f})")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+# =========================
+# INCREMENTAL RETRAINING
+# =========================
+# train.py --incremental updates the live models with only the labeled
+# rows appended to the data file since the last run (the watermark in
+# training_summary.json) instead of searching from scratch:
+#
+#   RandomForest           warm_start: new trees grown on the new rows
+#   HistGradientBoosting   warm_start: more boosting iterations
+#   XGBoost                continued boosting from the existing booster
+#   linear models          partial_fit (LogisticRegression is carried
+#                          over to an SGDClassifier with its weights)
+#
+# The fitted scaler is kept, so old and new trees see the same inputs.
+# A slice of the new rows is held back; a disease's update is kept only
+# if its ROC-AUC there is within --tolerance of the current model's.
+# The result is published as a new version in MODEL_DIR.
+
+def added_estimators(current, seen_rows, new_rows):
+    """Trees / rounds to add: the new rows' share of the data, at least 10."""
+    return max(10, int(round(current * new_rows / max(seen_rows, 1))))
+
+
+def sgd_from_logistic(clf, seen_rows, positive_rate):
+    """An SGDClassifier (log loss) starting from a fitted LogisticRegression's weights."""
+    from sklearn.linear_model import SGDClassifier
+
+    # Same objective: LogisticRegression minimises C * sum(loss) + penalty,
+    # SGD mean(loss) + alpha * penalty. partial_fit cannot use "balanced",
+    # so the weights are fixed from the rate the model was trained on.
+    # The step size is small and constant so that a batch of new rows
+    # nudges the fitted weights rather than replacing them (the default
+    # "optimal" schedule restarts with steps large enough to do that).
+    rate = min(max(positive_rate, 1e-6), 1 - 1e-6)
+    sgd = SGDClassifier(
+        loss="log_loss", penalty=clf.penalty, alpha=1.0 / (clf.C * max(seen_rows, 1)),
+        learning_rate="constant", eta0=SGD_STEP_SIZE,
+        class_weight={0: 0.5 / (1 - rate), 1: 0.5 / rate}, random_state=RANDOM_STATE,
+    )
+    sgd.classes_ = clf.classes_
+    sgd.coef_ = clf.coef_.copy()
+    sgd.intercept_ = clf.intercept_.copy()
+    sgd.n_features_in_ = clf.n_features_in_
+    return sgd
+
+
+def continue_training(model, X, y, seen_rows, positive_rate):
+    """Update fitted pipeline `model` in place with new rows; returns what was done."""
+    steps, (name, clf) = model.steps[:-1], model.steps[-1]
+    Xt = X
+    for _, step in steps:
+        Xt = step.transform(Xt)
+
+    if isinstance(clf, LogisticRegression):
+        clf = sgd_from_logistic(clf, seen_rows, positive_rate)
+        model.steps[-1] = (name, clf)
+    if hasattr(clf, "partial_fit"):
+        clf.partial_fit(Xt, y)
+        return f"partial_fit on {len(y)} rows"
+    if isinstance(clf, RandomForestClassifier):
+        add = added_estimators(len(clf.estimators_), seen_rows, len(y))
+        clf.set_params(warm_start=True, n_estimators=len(clf.estimators_) + add)
+        clf.fit(Xt, y)
+        clf.set_params(warm_start=False)
+        return f"warm_start +{add} trees ({len(clf.estimators_)} total)"
+    if isinstance(clf, HistGradientBoostingClassifier):
+        add = added_estimators(clf.n_iter_, seen_rows, len(y))
+        clf.set_params(warm_start=True, early_stopping=False, max_iter=clf.n_iter_ + add)
+        clf.fit(Xt, y)
+        clf.set_params(warm_start=False)
+        return f"warm_start +{add} iterations ({clf.n_iter_} total)"
+    if XGBOOST_AVAILABLE and isinstance(clf, xgboost.XGBClassifier):
+        add = added_estimators(clf.n_estimators, seen_rows, len(y))
+        params = dict(clf.get_params(), n_estimators=add, early_stopping_rounds=None)
+        updated = xgboost.XGBClassifier(**params).fit(Xt, y, xgb_model=clf.get_booster())
+        updated.set_params(n_estimators=clf.n_estimators + add)
+        model.steps[-1] = (name, updated)
+        return f"continued boosting +{add} rounds ({clf.n_estimators + add} total)"
+    raise TypeError(f"No incremental update for {type(clf).__name__}")
+
+
+def current_model_path():
+    """Directory of the version MODEL_DIR/CURRENT names (as app.py resolves it), or None."""
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    registry.model_dir = MODEL_DIR
+    version = registry.current_pointer()
+    return os.path.join(MODEL_DIR, version) if version else None
+
+
+def retrain_incremental(csv_path, base_dir, version=None, since_row=None, activate=False,
+                        tolerance=0.01, min_rows=100, validation_fraction=0.2):
+    """Update the models in base_dir with rows added since the watermark and publish a version.
+
+    Returns the new summary, or None when there was nothing to publish.
+    """
+    from model_registry import ModelRegistry, load_model_file
+
+    started = time.perf_counter()
+    try:
+        with open(os.path.join(base_dir, SUMMARY_FILE), "r", encoding="utf-8") as f:
+            base_summary = json.load(f)
+    except (OSError, ValueError):
+        base_summary = {}
+    watermark = base_summary.get("watermark") or {}
+    if since_row is None:
+        if "rows" not in watermark:
+            raise ValueError(f"No watermark in {os.path.join(base_dir, SUMMARY_FILE)}; "
+                             "run a full train first or pass --since-row")
+        if watermark.get("data") and os.path.abspath(csv_path) != watermark["data"]:
+            print(f"[WARN] Watermark was taken on {watermark['data']}, reading {csv_path}")
+        since_row = int(watermark["rows"])
+
+    df, y_all = read_labeled(csv_path, skip_rows=since_row)
+    print(f"[INFO] {len(df)} new rows after row {since_row} of {csv_path}")
+    if df.empty:
+        return None
+
+    summary = {
+        "timestamp": datetime.now().isoformat(),
+        "mode": "incremental",
+        "parent": os.path.abspath(base_dir),
+        "data": os.path.abspath(csv_path),
+        "watermark": {"data": os.path.abspath(csv_path), "rows": since_row + int(len(df))},
+        "diseases": {},
+    }
+    staging = tempfile.mkdtemp(prefix="readmission-retrain-")
+    try:
+        updated_any = False
+        new_data = encode_by_disease(df, y_all, require_all=False)
+        for key, files in MODEL_FILES.items():
+            base_info = dict(base_summary.get("diseases", {}).get(key, {}))
+            path = next((os.path.join(base_dir, f) for f in files if os.path.exists(os.path.join(base_dir, f))), None)
+            if path is None:
+                raise FileNotFoundError(f"No {DISEASES[key]} model in {base_dir}")
+            artifact = os.path.join(staging, files[0])
+            shutil.copy2(path, artifact)
+            compact_path = os.path.join(base_dir, COMPACT_MODEL_FILES[key])
+            if os.path.exists(compact_path):
+                shutil.copy2(compact_path, staging)
+            info = dict(base_info, artifact=files[0], new_rows=0, update="unchanged")
+            summary["diseases"][key] = info
+
+            if key not in new_data:
+                continue
+            X, y = new_data[key]
+            info["new_rows"] = int(len(y))
+            if len(y) < min_rows or len(np.unique(y)) < 2:
+                print(f"[INFO] {DISEASES[key]}: {len(y)} new rows, below --min-rows or one class; unchanged")
+                continue
+
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X, y, test_size=validation_fraction, stratify=y, random_state=RANDOM_STATE
+            )
+            model = load_model_file([path])
+            seen = int(base_info.get("rows") or since_row)
+            rate = float(base_info.get("positive_rate", np.mean(y)))
+            before = test_metrics(model, X_val, y_val)
+            action = continue_training(model, X_fit, y_fit, seen, rate)
+            after = test_metrics(model, X_val, y_val)
+            info["validation"] = {"rows": int(len(y_val)), "before": before, "after": after}
+            print(f"[INFO] {DISEASES[key]}: {action}; held-out AUC "
+                  f"{before['roc_auc']:.4f} -> {after['roc_auc']:.4f}")
+
+            if after["roc_auc"] < before["roc_auc"] - tolerance:
+                info["update"] = f"rejected: {action}"
+                print(f"[WARN] {DISEASES[key]}: update rejected (AUC dropped by more than {tolerance})")
+                continue
+            save_artifact(model, artifact)
+            info.update(
+                update=action,
+                saved_model=type(model.steps[-1][1]).__name__,
+                rows=seen + int(len(y_fit)),
+                positive_rate=(rate * seen + float(np.sum(y_fit))) / (seen + len(y_fit)),
+            )
+            updated_any = True
+
+        if not updated_any:
+            print("[INFO] No model was updated; nothing published")
+            return None
+
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        with open(os.path.join(staging, SUMMARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        registry = ModelRegistry()
+        registry.model_dir = MODEL_DIR
+        version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+        registry.publish(version, [os.path.join(staging, f) for f in sorted(os.listdir(staging))],
+                         activate=activate)
+        summary["version"] = version
+        print(f"[INFO] Published model version {version} to {MODEL_DIR}"
+              + (" and made it current" if activate else ""))
+        return summary
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the readmission models from a patient CSV.")
+    parser.add_argument("data", nargs="?", default=os.path.join(BASE_DIR, "final_dataset_realistic.csv"))
+    parser.add_argument("-o", "--output-dir", default=os.path.join(BASE_DIR, "training_output"))
+    parser.add_argument("--final-model", default="RandomForest",
+                        help="model saved as the app artifact (default RandomForest)")
+    parser.add_argument("--cv", type=int, default=CV_FOLDS, help="cross-validation folds")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--n-iter", type=int, default=None,
+                        help="random search with this many parameter sets per model instead of the full grid")
+    incremental = parser.add_argument_group("incremental retraining")
+    incremental.add_argument("--incremental", action="store_true",
+                             help="update the current models with rows added since the watermark")
+    incremental.add_argument("--base", default=None,
+                             help="directory of the models to update (default: the current version in MODEL_DIR)")
+    incremental.add_argument("--since-row", type=int, default=None, help="override the watermark")
+    incremental.add_argument("--version", default=None, help="name of the published version (default: timestamp)")
+    incremental.add_argument("--activate", action="store_true", help="make the new version current")
+    incremental.add_argument("--tolerance", type=float, default=0.01,
+                             help="largest held-out ROC-AUC drop an update may cause")
+    incremental.add_argument("--min-rows", type=int, default=100,
+                             help="fewest new rows per disease worth an update")
+    args = parser.parse_args(argv)
+
+    if args.incremental:
+        base = args.base or current_model_path() or BASE_DIR
+        retrain_incremental(args.data, base, args.version, args.since_row, args.activate,
+                            args.tolerance, args.min_rows)
+        return 0
+
+    summary = train(args.data, args.output_dir, args.final_model, args.cv, args.jobs, args.n_iter)
+    print(f"[INFO] Training finished in {summary['seconds']}s; summary in "
+          f"{os.path.join(args.output_dir, SUMMARY_FILE)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())